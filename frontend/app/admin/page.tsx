@@ -2,6 +2,9 @@
 
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
+import { fetchAllPages, usePager } from '../utils/pagination';
+import { authHeaders, clearToken } from '../utils/auth';
+import { PageControls } from '../components/PageControls';
 
 // Mock Lists for Dropdowns
 const COUNTRIES = ["India", "USA", "UK", "France", "Germany", "Japan", "China", "Australia", "Canada", "Other"];
@@ -56,8 +59,7 @@ const FeedbackBoard = () => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetch('http://localhost:8000/api/feedback/analysis')
-      .then(res => res.json())
+    fetchAllPages('http://localhost:8000/api/feedback/analysis')
       .then(data => setItems(data))
       .catch(err => console.error(err))
       .finally(() => setLoading(false));
@@ -115,8 +117,7 @@ const FeedbackBoardGrid = () => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetch('http://localhost:8000/api/feedback/analysis')
-      .then(res => res.json())
+    fetchAllPages('http://localhost:8000/api/feedback/analysis')
       .then(data => setItems(data))
       .catch(err => console.error(err))
       .finally(() => setLoading(false));
@@ -191,11 +192,15 @@ export default function AdminPage() {
 
   // Gallery State
   const [galleries, setGalleries] = useState<any[]>([]);
+  const galleryPager = usePager(setGalleries);
+  // Every gallery, for the artifact form and filter dropdowns
+  const [galleryOptions, setGalleryOptions] = useState<any[]>([]);
   const [galleryData, setGalleryData] = useState({ name: '', floor_number: '', theme: '', average_visit_count: '0', total_artefacts: '0' });
   const [editingGalleryId, setEditingGalleryId] = useState<number | null>(null);
 
   // Artifact State
   const [artifacts, setArtifacts] = useState<any[]>([]);
+  const artifactPager = usePager(setArtifacts);
   const [artifactData, setArtifactData] = useState({
     gallery_id: '',
     historical_period: '',
@@ -222,6 +227,11 @@ export default function AdminPage() {
   const [visitors, setVisitors] = useState<any[]>([]);
   const [staffList, setStaffList] = useState<any[]>([]);
   const [finances, setFinances] = useState<any[]>([]);
+  const [tours, setTours] = useState<any[]>([]);
+  const visitorPager = usePager(setVisitors);
+  const staffPager = usePager(setStaffList);
+  const financePager = usePager(setFinances, () => ({ headers: authHeaders() }));
+  const tourPager = usePager(setTours);
   const [editingVisitorId, setEditingVisitorId] = useState<number | null>(null);
   const [editingStaffId, setEditingStaffId] = useState<number | null>(null);
   const [editingTransactionId, setEditingTransactionId] = useState<number | null>(null);
@@ -237,23 +247,12 @@ export default function AdminPage() {
     else if (tourSearch.type === 'Guide Name' && tourSearch.guide_id) url += `guide_id=${tourSearch.guide_id}`;
     else if (tourSearch.type === 'Status' && tourSearch.status) url += `status=${tourSearch.status}`;
 
-    fetch(url)
-      .then(res => res.json())
-      .then(setTours)
-      .catch(e => console.error(e));
+    tourPager.load(url).catch(e => console.error(e));
   };
 
-  // Wait, I need to add 'tours' state first.
-  const [tours, setTours] = useState<any[]>([]);
-
   const searchGalleries = () => {
     const term = encodeURIComponent(gallerySearch.name.trim());
-    fetch(`http://localhost:8000/api/galleries?name=${term}`)
-      .then(res => res.json())
-      .then(data => {
-        if (Array.isArray(data)) setGalleries(data);
-        else console.error("Invalid gallery data", data);
-      })
+    galleryPager.load(`http://localhost:8000/api/galleries?name=${term}`)
       .catch(e => console.error(e));
   };
 
@@ -263,10 +262,7 @@ export default function AdminPage() {
     else if (artifactSearch.type === 'Category' && artifactSearch.value) url += `category=${artifactSearch.value}`;
     else if (artifactSearch.type === 'Period' && artifactSearch.value) url += `historical_period=${artifactSearch.value}`;
 
-    fetch(url)
-      .then(res => res.json())
-      .then(setArtifacts)
-      .catch(e => console.error(e));
+    artifactPager.load(url).catch(e => console.error(e));
   };
 
   const searchVisitors = () => {
@@ -274,14 +270,14 @@ export default function AdminPage() {
     if (visitorSearch.name) url += `name=${visitorSearch.name}&`;
     if (visitorSearch.nationality) url += `nationality=${visitorSearch.nationality}`;
 
-    fetch(url).then(res => res.json()).then(setVisitors).catch(console.error);
+    visitorPager.load(url).catch(console.error);
   };
 
 const searchStaff = () => {
   let url = 'http://localhost:8000/api/staff?';
   if (staffSearch.name) url += `name=${encodeURIComponent(staffSearch.name)}`;
 
-  fetch(url).then(res => res.json()).then(setStaffList).catch(console.error);
+  staffPager.load(url).catch(console.error);
 };
 
   const searchFinance = () => {
@@ -290,7 +286,7 @@ const searchStaff = () => {
     if (financeSearch.endDate) url += `end_date=${financeSearch.endDate}&`;
     if (financeSearch.paymentMethod) url += `payment_method=${financeSearch.paymentMethod}`;
 
-    fetch(url).then(res => res.json()).then(setFinances).catch(console.error);
+    financePager.load(url).catch(console.error);
   };
 
   // Staff State
@@ -343,48 +339,22 @@ const [tourData, setTourData] = useState({
         .then(data => setGuides(data))
         .catch(err => console.error("Failed to load guides", err));
     } else if (activeTab === 'gallery') {
-      fetch('http://localhost:8000/api/galleries')
-        .then(res => {
-          if (!res.ok) throw new Error("Failed to fetch galleries");
-          return res.json();
-        })
-        .then(data => {
-          if (Array.isArray(data)) setGalleries(data);
-          else {
-            console.error("Galleries response is not an array:", data);
-            setGalleries([]);
-          }
-        })
+      galleryPager.load('http://localhost:8000/api/galleries')
         .catch(err => {
           console.error("Failed to load galleries", err);
           setGalleries([]);
         });
     } else if (activeTab === 'artifact') {
-      fetch('http://localhost:8000/api/artifacts')
-        .then(res => {
-          if (!res.ok) throw new Error("Failed to fetch artifacts");
-          return res.json();
-        })
-        .then(data => {
-          if (Array.isArray(data)) setArtifacts(data);
-          else {
-            console.error("Artifacts response is not an array:", data);
-            setArtifacts([]);
-          }
-        })
+      artifactPager.load('http://localhost:8000/api/artifacts')
         .catch(err => {
           console.error("Failed to load artifacts", err);
           setArtifacts([]);
         });
 
       // Also need galleries for dropdown
-      fetch('http://localhost:8000/api/galleries')
-        .then(res => {
-          if (!res.ok) return [];
-          return res.json();
-        })
+      fetchAllPages('http://localhost:8000/api/galleries')
         .then(data => {
-          if (Array.isArray(data)) setGalleries(data);
+          if (Array.isArray(data)) setGalleryOptions(data);
         })
         .catch(err => console.error("Failed to load galleries for dropdown", err));
     }
@@ -411,6 +381,7 @@ const [tourData, setTourData] = useState({
 
   const handleLogout = () => {
     localStorage.removeItem('user');
+    clearToken();
     router.push('/');
   };
 
@@ -509,7 +480,7 @@ const [tourData, setTourData] = useState({
 
       const res = await fetch(url, {
         method: method,
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify(payload)
       });
 
@@ -530,8 +501,8 @@ const [tourData, setTourData] = useState({
 
   const handleDeleteStaff = async (id: number) => {
     if (!confirm("Delete staff member?")) return;
-    await fetch(`http://localhost:8000/api/staff/${id}`, { method: 'DELETE' });
-    searchStaff();
+    await fetch(`http://localhost:8000/api/staff/${id}`, { method: 'DELETE', headers: authHeaders() });
+    staffPager.reload().catch(console.error);
   };
 
   const startEditStaff = (s: any) => {
@@ -577,7 +548,7 @@ const [tourData, setTourData] = useState({
 
       const res = await fetch(url, {
         method: method,
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify(payload)
       });
 
@@ -663,13 +634,13 @@ const validateTourForm = () => {
     };
 
     try {
-      const res = await fetch(url, { method, headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
+      const res = await fetch(url, { method, headers: authHeaders({ 'Content-Type': 'application/json' }), body: JSON.stringify(payload) });
       if (res.ok) {
         alert(editingGalleryId ? 'Gallery updated!' : 'Gallery created!');
         setGalleryData({ name: '', floor_number: '', theme: '', average_visit_count: '0', total_artefacts: '0' });
         setEditingGalleryId(null);
         // Refresh list
-        fetch('http://localhost:8000/api/galleries').then(r => r.json()).then(setGalleries);
+        galleryPager.reload().catch(console.error);
       } else {
         const err = await res.json();
         alert(`Error: ${err.detail}`);
@@ -680,9 +651,9 @@ const validateTourForm = () => {
   const handleDeleteGallery = async (id: number) => {
     if (!confirm("Are you sure?")) return;
     try {
-      const res = await fetch(`http://localhost:8000/api/galleries/${id}`, { method: 'DELETE' });
+      const res = await fetch(`http://localhost:8000/api/galleries/${id}`, { method: 'DELETE', headers: authHeaders() });
       if (res.ok) {
-        setGalleries(prev => prev.filter(g => g.gallery_id !== id));
+        galleryPager.reload().catch(console.error);
       }
     } catch (e) { console.error(e); alert("Failed"); }
   };
@@ -722,12 +693,12 @@ const validateTourForm = () => {
     };
 
     try {
-      const res = await fetch(url, { method, headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
+      const res = await fetch(url, { method, headers: authHeaders({ 'Content-Type': 'application/json' }), body: JSON.stringify(payload) });
       if (res.ok) {
         alert(editingArtifactId ? 'Artifact updated!' : 'Artifact created!');
         setArtifactData({ gallery_id: '', historical_period: '', category: '', material: '', condition_status: 'Excellent', audio_guide_id: '' });
         setEditingArtifactId(null);
-        fetch('http://localhost:8000/api/artifacts').then(r => r.json()).then(setArtifacts);
+        artifactPager.reload().catch(console.error);
       } else {
         const err = await res.json();
         alert(`Error: ${err.detail}`);
@@ -738,9 +709,9 @@ const validateTourForm = () => {
   const handleDeleteArtifact = async (id: number) => {
     if (!confirm("Are you sure?")) return;
     try {
-      const res = await fetch(`http://localhost:8000/api/artifacts/${id}`, { method: 'DELETE' });
+      const res = await fetch(`http://localhost:8000/api/artifacts/${id}`, { method: 'DELETE', headers: authHeaders() });
       if (res.ok) {
-        setArtifacts(prev => prev.filter(a => a.artifact_id !== id));
+        artifactPager.reload().catch(console.error);
       }
     } catch (e) { console.error(e); alert("Failed"); }
   };
@@ -772,7 +743,7 @@ const validateTourForm = () => {
 
       const res = await fetch('http://localhost:8000/api/tours', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify(payload)
       });
 
@@ -814,7 +785,7 @@ const validateTourForm = () => {
 
       const res = await fetch(url, {
         method: method,
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify(payload)
       });
 
@@ -1041,8 +1012,8 @@ const validateTourForm = () => {
               <button onClick={() => startEditVisitor(v)} className="text-blue-400 hover:text-blue-300">Edit</button>
               <button onClick={async () => {
                 if (!confirm("Delete this visitor?")) return;
-                await fetch(`http://localhost:8000/api/visitors/${v.visitor_id}`, { method: 'DELETE' });
-                searchVisitors();
+                await fetch(`http://localhost:8000/api/visitors/${v.visitor_id}`, { method: 'DELETE', headers: authHeaders() });
+                visitorPager.reload().catch(console.error);
               }} className="text-red-400 hover:text-red-300">Delete</button>
             </td>
           </tr>
@@ -1050,6 +1021,7 @@ const validateTourForm = () => {
       </tbody>
     </table>
   </div>
+  <PageControls pager={visitorPager} />
 </div>
 
               </>
@@ -1136,6 +1108,7 @@ const validateTourForm = () => {
       </tbody>
     </table>
   </div>
+  <PageControls pager={staffPager} />
 </div>
               </>
             ) : activeTab === 'finance' ? (
@@ -1227,8 +1200,8 @@ const validateTourForm = () => {
   <button onClick={() => startEditFinance(f)} className="text-blue-400 hover:text-blue-300">Edit</button>
   <button onClick={async () => {
     if (!confirm("Delete this transaction?")) return;
-    await fetch(`http://localhost:8000/api/finance/${f.transaction_id}`, { method: 'DELETE' });
-    searchFinance();
+    await fetch(`http://localhost:8000/api/finance/${f.transaction_id}`, { method: 'DELETE', headers: authHeaders() });
+    financePager.reload().catch(console.error);
   }} className="text-red-400 hover:text-red-300">Delete</button>
 </td>
                           </tr>
@@ -1236,6 +1209,7 @@ const validateTourForm = () => {
                       </tbody>
                     </table>
                   </div>
+                  <PageControls pager={financePager} />
                 </div>
               </>
             ) : activeTab === 'tours' ? (
@@ -1360,8 +1334,8 @@ const validateTourForm = () => {
               }} className="text-blue-400 hover:text-blue-300">Edit</button>
               <button onClick={async () => {
                 if (!confirm("Delete tour?")) return;
-                await fetch(`http://localhost:8000/api/tours/${t.tour_id}`, { method: 'DELETE' });
-                searchTours();
+                await fetch(`http://localhost:8000/api/tours/${t.tour_id}`, { method: 'DELETE', headers: authHeaders() });
+                tourPager.reload().catch(console.error);
               }} className="text-red-400 hover:text-red-300">Delete</button>
             </td>
           </tr>
@@ -1369,6 +1343,7 @@ const validateTourForm = () => {
       </tbody>
     </table>
   </div>
+  <PageControls pager={tourPager} />
 </div>
               </>
             ) : activeTab === 'gallery' ? (
@@ -1449,6 +1424,7 @@ const validateTourForm = () => {
                       </tbody>
                     </table>
                   </div>
+                  <PageControls pager={galleryPager} />
                 </div>
               </>
             ) : activeTab === 'artifact' ? (
@@ -1458,7 +1434,7 @@ const validateTourForm = () => {
                     <label className="block text-purple-200 text-xs font-bold uppercase tracking-wide mb-1">Select Gallery</label>
                     <select name="gallery_id" value={artifactData.gallery_id} onChange={handleArtifactChange} className="w-full px-3 py-2 rounded bg-purple-800/50 border border-purple-600 focus:outline-none focus:ring-2 focus:ring-purple-400" required>
                       <option value="">-- Select Gallery --</option>
-                      {galleries.map(g => <option key={g.gallery_id} value={g.gallery_id} className="bg-purple-900">{g.name}</option>)}
+                      {galleryOptions.map(g => <option key={g.gallery_id} value={g.gallery_id} className="bg-purple-900">{g.name}</option>)}
                     </select>
                   </div>
                   <div className="grid grid-cols-2 gap-3">
@@ -1517,7 +1493,7 @@ const validateTourForm = () => {
                         className="flex-1 bg-purple-800/50 rounded px-3 py-2 border border-purple-600"
                       >
                         <option value="">Select Gallery</option>
-                        {galleries.map(g => <option key={g.gallery_id} value={g.gallery_id}>{g.name}</option>)}
+                        {galleryOptions.map(g => <option key={g.gallery_id} value={g.gallery_id}>{g.name}</option>)}
                       </select>
                     ) : (
                       <input
@@ -1560,6 +1536,7 @@ const validateTourForm = () => {
                       </tbody>
                     </table>
                   </div>
+                  <PageControls pager={artifactPager} />
                 </div>
               </>
             ) : null}
@@ -2,6 +2,7 @@
 
 import { useState } from 'react';
 import { validateLogin } from '../utils/validation';
+import { saveToken } from '../utils/auth';
 import { SignupForm } from './SignupForm';
 
 interface LoginFormProps {
@@ -65,6 +66,7 @@ export function LoginForm({ onLoginSuccess, onClose }: LoginFormProps) {
       if (response.ok) {
         const userObj = data.user || data;
         localStorage.setItem('user', JSON.stringify(userObj));
+        saveToken(data.token);
         if (formData.role === 'visitor') {
           localStorage.setItem('visitor_user', JSON.stringify(userObj));
         }
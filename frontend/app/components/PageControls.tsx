@@ -0,0 +1,33 @@
+'use client';
+
+import type { Pager } from '../utils/pagination';
+
+interface PageControlsProps {
+  pager: Pager;
+}
+
+export function PageControls({ pager }: PageControlsProps) {
+  if (!pager.hasPrevious && !pager.hasNext) return null;
+
+  const go = (move: () => Promise<void>) => move().catch(console.error);
+
+  return (
+    <div className="flex items-center justify-between mt-3 text-sm text-purple-200">
+      <button
+        onClick={() => go(pager.previous)}
+        disabled={!pager.hasPrevious}
+        className="px-4 py-1 rounded bg-purple-800 hover:bg-purple-700 disabled:opacity-40 disabled:cursor-not-allowed"
+      >
+        ← Previous
+      </button>
+      <span>Page {pager.page}</span>
+      <button
+        onClick={() => go(pager.next)}
+        disabled={!pager.hasNext}
+        className="px-4 py-1 rounded bg-purple-800 hover:bg-purple-700 disabled:opacity-40 disabled:cursor-not-allowed"
+      >
+        Next →
+      </button>
+    </div>
+  );
+}
@@ -3,6 +3,8 @@
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
+import { fetchTotalCount } from '../utils/pagination';
+import { clearToken } from '../utils/auth';
 
 export default function GuidePage() {
   const [user, setUser] = useState<any>(null);
@@ -58,21 +60,18 @@ export default function GuidePage() {
         }
 
         // 2. Global Stats
-        const [visRes, artRes, galRes] = await Promise.all([
-          fetch('http://localhost:8000/api/visitors', { signal }),
-          fetch('http://localhost:8000/api/artifacts', { signal }),
-          fetch('http://localhost:8000/api/galleries', { signal })
+        // Only the counts are needed, not the rows
+        const [visitors, artifacts, galleries] = await Promise.all([
+          fetchTotalCount('http://localhost:8000/api/visitors', { signal }).catch(() => 0),
+          fetchTotalCount('http://localhost:8000/api/artifacts', { signal }).catch(() => 0),
+          fetchTotalCount('http://localhost:8000/api/galleries', { signal }).catch(() => 0)
         ]);
 
-        const visitors = visRes.ok ? await visRes.json() : [];
-        const artifacts = artRes.ok ? await artRes.json() : [];
-        const galleries = galRes.ok ? await galRes.json() : [];
-
         setStats({
           toursToday: toursCount,
-          visitors: Array.isArray(visitors) ? visitors.length : 0,
-          artifacts: Array.isArray(artifacts) ? artifacts.length : 0,
-          galleries: Array.isArray(galleries) ? galleries.length : 0
+          visitors,
+          artifacts,
+          galleries
         });
 
       } catch (error: any) {
@@ -93,6 +92,7 @@ export default function GuidePage() {
 
   const handleLogout = () => {
     localStorage.removeItem('user');
+    clearToken();
     router.push('/');
   };
 
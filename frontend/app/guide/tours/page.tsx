@@ -3,6 +3,7 @@
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
+import { authHeaders } from '../../utils/auth';
 
 export default function GuideToursPage() {
     const [tours, setTours] = useState<any[]>([]);
@@ -24,23 +25,20 @@ export default function GuideToursPage() {
                     return;
                 }
 
-                const user = JSON.parse(savedUser);
+                // Fetch tours; the session token identifies the guide
+                const toursRes = await fetch(
+                    'http://localhost:8000/api/tours/guide-view',
+                    { signal: controller.signal, headers: authHeaders() }
+                );
 
-                // Validate user object
-                if (!user.email) {
+                if (toursRes.status === 401 || toursRes.status === 403) {
                     if (isMounted) {
-                        setError('User email not found. Please log in again.');
-                        setLoading(false);
+                        setError('Your session has expired. Please log in again.');
+                        setTours([]);
                     }
                     return;
                 }
 
-                // Fetch tours
-                const toursRes = await fetch(
-                    `http://localhost:8000/api/tours/guide-view?email=${encodeURIComponent(user.email)}`,
-                    { signal: controller.signal }
-                );
-
                 if (!toursRes.ok) {
                     throw new Error(`Server error: ${toursRes.status}`);
                 }
@@ -5,6 +5,7 @@ import { useRouter } from 'next/navigation';
 import Link from 'next/link';
 import { SignupForm } from './components/SignupForm';
 import { LoginForm } from './components/LoginForm';
+import { clearToken } from './utils/auth';
 
 export default function Home() {
   const [showLogin, setShowLogin] = useState(false);
@@ -44,6 +45,7 @@ export default function Home() {
     setUser(null);
     localStorage.removeItem('user');
     localStorage.removeItem('visitor_user');
+    clearToken();
     setShowLogin(false);
     setShowSignup(false);
   };
@@ -0,0 +1,37 @@
+/**
+ * Session token helpers
+ *
+ * Login responses carry a signed session token. It is kept in localStorage
+ * next to the user object and sent as `Authorization: Bearer <token>` to the
+ * endpoints that require a role (admin writes, finance, the guide's tours).
+ */
+
+const TOKEN_KEY = 'token';
+
+/**
+ * Stores the token of a successful login response (if it has one)
+ *
+ * @param {string | undefined} token - Token from the login response
+ */
+export function saveToken(token?: string): void {
+  if (token) localStorage.setItem(TOKEN_KEY, token);
+  else localStorage.removeItem(TOKEN_KEY);
+}
+
+/**
+ * Forgets the stored token (on logout)
+ */
+export function clearToken(): void {
+  localStorage.removeItem(TOKEN_KEY);
+}
+
+/**
+ * Request headers with the session token added
+ *
+ * @param {Record<string, string>} headers - Other headers to send
+ * @returns {Record<string, string>} - `headers` plus Authorization when logged in
+ */
+export function authHeaders(headers: Record<string, string> = {}): Record<string, string> {
+  const token = localStorage.getItem(TOKEN_KEY);
+  return token ? { ...headers, Authorization: `Bearer ${token}` } : headers;
+}
@@ -0,0 +1,116 @@
+import { useState } from 'react';
+
+/**
+ * Helpers for the backend's paginated list endpoints
+ *
+ * List endpoints return one page of rows per request. When more rows follow,
+ * the response carries an X-Next-Cursor header to pass back as ?cursor=,
+ * and X-Total-Count is sent when the request asks for include_total=true.
+ */
+
+/**
+ * Appends a query parameter to a URL that may or may not already have some
+ */
+function withParam(url: string, name: string, value: string): string {
+  const separator = url.includes('?') ? (url.endsWith('?') || url.endsWith('&') ? '' : '&') : '?';
+  return `${url}${separator}${name}=${encodeURIComponent(value)}`;
+}
+
+/**
+ * Fetches one page of a paginated list endpoint
+ *
+ * @param {string} url - List endpoint URL, with or without query params
+ * @param {string | null} cursor - X-Next-Cursor of the previous page, or null for the first page
+ * @param {RequestInit} init - Optional fetch options (e.g. headers)
+ * @returns {Promise<{ rows: any[], nextCursor: string | null }>} - The page and the cursor of the next one
+ */
+export async function fetchPage(
+  url: string, cursor: string | null, init?: RequestInit
+): Promise<{ rows: any[]; nextCursor: string | null }> {
+  const res = await fetch(cursor ? withParam(url, 'cursor', cursor) : url, init);
+  if (!res.ok) throw new Error(`Server error: ${res.status}`);
+  const rows = await res.json();
+  if (!Array.isArray(rows)) throw new Error('Expected a list response');
+  return { rows, nextCursor: res.headers.get('X-Next-Cursor') };
+}
+
+export interface Pager {
+  load: (url: string) => Promise<void>;
+  next: () => Promise<void>;
+  previous: () => Promise<void>;
+  reload: () => Promise<void>;
+  page: number;
+  hasNext: boolean;
+  hasPrevious: boolean;
+}
+
+/**
+ * Page-at-a-time browsing of a list endpoint, for tables with next / previous controls
+ *
+ * Keeps the cursor of every page visited so far, so "previous" re-fetches the
+ * page before without the backend needing backward cursors.
+ *
+ * @param {(rows: any[]) => void} setRows - Receives the rows of the page shown
+ * @param {() => RequestInit} init - Optional fetch options, built per request (e.g. auth headers)
+ * @returns {Pager} - load(url) shows the first page of a new listing; next / previous / reload move around it
+ */
+export function usePager(setRows: (rows: any[]) => void, init?: () => RequestInit): Pager {
+  const [url, setUrl] = useState<string | null>(null);
+  const [cursors, setCursors] = useState<(string | null)[]>([null]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+
+  const show = async (pageUrl: string, stack: (string | null)[]) => {
+    const page = await fetchPage(pageUrl, stack[stack.length - 1], init?.());
+    setRows(page.rows);
+    setUrl(pageUrl);
+    setCursors(stack);
+    setNextCursor(page.nextCursor);
+  };
+
+  return {
+    load: (pageUrl) => show(pageUrl, [null]),
+    next: async () => { if (url && nextCursor) await show(url, [...cursors, nextCursor]); },
+    previous: async () => { if (url && cursors.length > 1) await show(url, cursors.slice(0, -1)); },
+    reload: async () => { if (url) await show(url, cursors); },
+    page: cursors.length,
+    hasNext: nextCursor !== null,
+    hasPrevious: cursors.length > 1,
+  };
+}
+
+/**
+ * Fetches every row of a paginated list endpoint
+ *
+ * Follows X-Next-Cursor until the last page. Only for small reference lists
+ * (e.g. a dropdown of galleries); tables should use usePager.
+ *
+ * @param {string} url - List endpoint URL, with or without query params
+ * @param {RequestInit} init - Optional fetch options (e.g. an abort signal)
+ * @returns {Promise<any[]>} - All rows, in the endpoint's order
+ */
+export async function fetchAllPages(url: string, init?: RequestInit): Promise<any[]> {
+  const rows: any[] = [];
+  let cursor: string | null = null;
+  do {
+    const res = await fetch(cursor ? withParam(url, 'cursor', cursor) : url, init);
+    if (!res.ok) throw new Error(`Server error: ${res.status}`);
+    const page = await res.json();
+    if (!Array.isArray(page)) throw new Error('Expected a list response');
+    rows.push(...page);
+    cursor = res.headers.get('X-Next-Cursor');
+  } while (cursor);
+  return rows;
+}
+
+/**
+ * Counts the rows of a list endpoint without downloading them
+ *
+ * @param {string} url - List endpoint URL, with or without query params
+ * @param {RequestInit} init - Optional fetch options (e.g. an abort signal)
+ * @returns {Promise<number>} - Number of rows matching the URL's filters
+ */
+export async function fetchTotalCount(url: string, init?: RequestInit): Promise<number> {
+  const res = await fetch(withParam(withParam(url, 'limit', '1'), 'include_total', 'true'), init);
+  if (!res.ok) throw new Error(`Server error: ${res.status}`);
+  return Number(res.headers.get('X-Total-Count') ?? 0);
+}
@@ -2,6 +2,7 @@
 
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
+import { clearToken } from '../utils/auth';
 
 interface Artifact {
     artifact_id: number;
@@ -60,6 +61,7 @@ export default function VisitorDashboard() {
     const handleLogout = () => {
         localStorage.removeItem('visitor_user');
         localStorage.removeItem('user');
+        clearToken();
         router.push('/');
     };
 
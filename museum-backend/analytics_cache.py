@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+import functools
+from collections import OrderedDict
+
+# Default lifetime of a cached dashboard result (seconds)
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+# Upper bound on cached results (and on per-key counters)
+ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "1024"))
+
+# Tags used for write-side invalidation: a write to a table drops every entry tagged with it
+VISITOR = "visitor"
+FINANCE = "finance"
+GALLERY = "gallery"
+ARTIFACT = "artifact"
+FEEDBACK = "feedback"
+
+
+class TTLCache:
+    """
+    Small in-process cache for analytics query results.
+    Entries expire after their TTL and can be dropped early by tag when the
+    underlying tables are written to. Tracks hit/miss counters per key.
+
+    Keys include client-chosen query params (e.g. date ranges), so both the
+    entries and the per-key counters are bounded by `max_entries` (least
+    recently used go first) and expired entries are swept once per TTL.
+    """
+
+    def __init__(self, default_ttl, max_entries):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags), least recently used first
+        self._lock = threading.Lock()
+        self._stats = OrderedDict()    # key -> {"hits", "misses", "invalidations"}
+        self._totals = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0, "expired": 0}
+        self._next_sweep = time.monotonic() + default_ttl
+
+    def _count(self, key, event):
+        self._totals[event] += 1
+        counter = self._stats.get(key)
+        if counter is None:
+            counter = self._stats[key] = {"hits": 0, "misses": 0, "invalidations": 0}
+            if len(self._stats) > self.max_entries:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(key)
+        counter[event] += 1
+
+    def _sweep(self, now):
+        """Drop expired entries. Caller holds the lock."""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.default_ttl
+        for key in [k for k, (expires_at, _, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+            self._totals["expired"] += 1
+
+    def get(self, key):
+        """Returns (hit, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._count(key, "hits")
+                return True, entry[1]
+            self._entries.pop(key, None)
+            self._count(key, "misses")
+            return False, None
+
+    def set(self, key, value, tags=(), ttl=None):
+        now = time.monotonic()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._sweep(now)
+            self._entries[key] = (expires_at, value, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._totals["evictions"] += 1
+
+    def invalidate(self, *tags):
+        tags = set(tags)
+        with self._lock:
+            for key in [k for k, (_, _, t) in self._entries.items() if t & tags]:
+                del self._entries[key]
+                self._count(key, "invalidations")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = self._totals["hits"]
+            misses = self._totals["misses"]
+            return {
+                "default_ttl": self.default_ttl,
+                "max_entries": self.max_entries,
+                "entries": len(self._entries),
+                **self._totals,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+                "keys": {k: dict(v) for k, v in self._stats.items()},
+            }
+
+
+analytics_cache = TTLCache(ANALYTICS_CACHE_TTL, ANALYTICS_CACHE_MAX_ENTRIES)
+
+
+def cached(key, tags, ttl=None):
+    """
+    Cache the result of an async analytics handler under `key`.
+    Query parameters (e.g. a date range) become part of the cache key.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            params = {k: v for k, v in kwargs.items() if v is not None}
+            cache_key = key if not params else f"{key}:{sorted(params.items())}"
+            hit, value = analytics_cache.get(cache_key)
+            if hit:
+                return value
+            value = await fn(*args, **kwargs)
+            analytics_cache.set(cache_key, value, tags, ttl)
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidate(*tags):
+    analytics_cache.invalidate(*tags)
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException
-from database import get_conn
+from async_database import get_async_conn
+from analytics_cache import cached, VISITOR, ARTIFACT
 
 router = APIRouter(tags=["Analytics"])
 
 @router.get("/api/analytics/artifact-status", status_code=200)
-def get_artifact_status_analytics():
+@cached("artifact_status", tags=(ARTIFACT,))
+async def get_artifact_status_analytics():
     """
     Returns the distribution of artifacts based on their condition status.
     Example Output:
@@ -13,49 +15,46 @@ def get_artifact_status_analytics():
         {"condition_status": "Needs Repair", "count": 15}
     ]
     """
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            SELECT condition_status, COUNT(*) as count 
-            FROM artifact_information 
-            GROUP BY condition_status
-        """)
-        rows = cur.fetchall()
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("""
+                SELECT condition_status, COUNT(*) as count 
+                FROM artifact_information 
+                GROUP BY condition_status
+            """)
+            rows = await cur.fetchall()
         
-        # Ensure consistent output format
-        # If using RealDictCursor, rows is already a list of dicts.
-        # If using standard cursor, we might need to map it. 
-        # Based on previous files, RealDictCursor is likely used.
-        return rows
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+            # The async pool uses dict_row, so rows is already a list of dicts
+            # (same shape RealDictCursor gave us before).
+            return rows
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
 
 @router.get("/api/analytics/ticket-sales", status_code=200)
-def get_ticket_sales_analytics():
+@cached("ticket_sales", tags=(VISITOR,))
+async def get_ticket_sales_analytics():
     """
     Returns the total count of tickets sold for each ticket type (Standard, Student, VIP).
     """
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        # Assuming 'revenue_finance' table handles ticket sales as per finance routes
-        # OR 'visitor' table has ticket_type? Let's check visitor_routes or similar.
-        # Based on previous context, visitor table has ticket_type.
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            # Assuming 'revenue_finance' table handles ticket sales as per finance routes
+            # OR 'visitor' table has ticket_type? Let's check visitor_routes or similar.
+            # Based on previous context, visitor table has ticket_type.
         
-        cur.execute("""
-            SELECT ticket_type, COUNT(*) as count 
-            FROM visitor
-            WHERE ticket_type IN ('Standard', 'Student', 'VIP')
-            GROUP BY ticket_type
-        """)
-        rows = cur.fetchall()
-        return rows
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+            await cur.execute("""
+                SELECT ticket_type, COUNT(*) as count 
+                FROM visitor
+                WHERE ticket_type IN ('Standard', 'Student', 'VIP')
+                GROUP BY ticket_type
+            """)
+            rows = await cur.fetchall()
+            return rows
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
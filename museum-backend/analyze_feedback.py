@@ -1,24 +1,28 @@
 import os
 import json
+import hashlib
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
 from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-import firebase_admin
-from firebase_admin import credentials, firestore
+from async_database import open_async_pool, close_async_pool
+from feedback_cache import feedback_cache
+from feedback_classifier import feedback_classifier
+from firebase_client import get_db
+from feedback_worker import FEEDBACK_BATCH_SIZE, FEEDBACK_MAX_RETRIES, FEEDBACK_RETRY_BASE_SECONDS, FEEDBACK_RETRY_MAX_SECONDS
 
 # Load environment variables
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
-# Initialize Firebase
-if not firebase_admin._apps:
-    cred = credentials.Certificate("firebase_key.json")
-    firebase_admin.initialize_app(cred)
-
-db = firestore.client()
+# Firestore (firebase_client.get_db) and the Gemini SDK are imported and
+# initialized on first use, so importing this module stays cheap.
 
 # --- PROMPT DEFINITION ---
-PROMPT_TEMPLATE = """
+PROMPT_INSTRUCTIONS = """
 {
   "Role": "You are an expert AI system specializing in analyzing museum visitor feedback to improve operations and visitor experience.",
   "Direction": "Analyze the provided visitor feedback text and extract key insights. You must categorize the feedback, determine the sentiment, and identify if it is actionable. If actionable, provide specific steps.",
@@ -57,71 +61,346 @@ PROMPT_TEMPLATE = """
     }
   ]
 }
+"""
 
-INPUT_FEEDBACK:
-"{feedback_text}"
+# Feedback texts are sent as a list, even a single one: one Output object per input
+BATCH_PROMPT_TEMPLATE = PROMPT_INSTRUCTIONS + """
+INPUT_FEEDBACK_LIST (a JSON array of feedback texts):
+{feedback_list}
+
+Analyze every entry of INPUT_FEEDBACK_LIST independently. Return a JSON array containing
+exactly one Output object per entry, in the same order as the input.
 """
 
-def analyze_feedback(feedback_text):
-    client = genai.Client(api_key=GEMINI_API_KEY)
-    
-    # Construct prompt
-    prompt = PROMPT_TEMPLATE.replace("{feedback_text}", feedback_text)
-    
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
+# Part of every cache key: editing the prompt or switching model invalidates cached analyses
+PROMPT_VERSION = hashlib.sha256(f"{GEMINI_MODEL}\n{PROMPT_INSTRUCTIONS}".encode("utf-8")).hexdigest()[:16]
+
+_client = None
+
+def get_client():
+    """One shared Gemini client per process (it keeps its HTTP connections alive), created on first use."""
+    global _client
+    if _client is None:
+        from google import genai
+        _client = genai.Client(api_key=GEMINI_API_KEY)
+    return _client
+
+def json_response_config():
+    from google.genai import types
+    return types.GenerateContentConfig(response_mime_type="application/json")
+
+async def analyze_feedback_batch(feedback_texts):
+    """
+    Analyze several feedback texts with a single (non-blocking) model call.
+    Returns one analysis dict per text, in input order. Raises on API errors or a
+    malformed response, so the caller can retry. This is the only analysis path:
+    the worker, the backfill and one-off scripts all go through it.
+    Texts the local classifier is sure about, texts already in the feedback cache
+    and texts repeated within the batch are not sent.
+    """
+    keys = [feedback_cache.key(PROMPT_VERSION, text) for text in feedback_texts]
+    analyses = {}
+    for key, text in zip(keys, feedback_texts):
+        if key not in analyses:
+            local = feedback_classifier.try_local(text)
+            if local is not None:
+                analyses[key] = local
+    remaining = [key for key in keys if key not in analyses]
+    if remaining:
+        analyses.update(await feedback_cache.get_many(remaining))
+
+    pending = {}  # key -> text, unique and in input order
+    for key, text in zip(keys, feedback_texts):
+        if key not in analyses:
+            pending.setdefault(key, text)
+
+    if pending:
+        texts = list(pending.values())
+        prompt = BATCH_PROMPT_TEMPLATE.replace("{feedback_list}", json.dumps(texts))
+        response = await get_client().aio.models.generate_content(
+            model=GEMINI_MODEL,
             contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json"
-            )
+            config=json_response_config()
         )
-        
-        # Parse JSON response
-        return json.loads(response.text)
-        
-    except Exception as e:
-        print(f"Error analyzing feedback: {e}")
-        return {
-            "sentiment": "neutral",
-            "category": "general",
-            "actionable": False,
-            "error": str(e)
-        }
-
-def get_feedbacks():
-    docs = db.collection("museum_feedback").stream()
-    feedbacks = []
-    for doc in docs:
-        data = doc.to_dict()
-        data["doc_id"] = doc.id
-        # Only process if not already analyzed or if you want to re-analyze
-        if "ai_analysis" not in data: 
-            feedbacks.append(data)
-    return feedbacks
-
-def analyze_and_store():
-    print("Fetching feedbacks...")
-    feedbacks = get_feedbacks()
-    print(f"Found {len(feedbacks)} unanalyzed feedbacks.")
-
-    for fb in feedbacks:
-        if not fb.get("processed"):
-            fb["processed"] = True
-            text = fb.get("feedback_text", "")
-            if not text:
+
+        results = json.loads(response.text)
+        if not isinstance(results, list) or len(results) != len(texts) \
+                or not all(isinstance(r, dict) for r in results):
+            raise ValueError(f"Expected a JSON array of {len(texts)} analyses from the model")
+        fresh = dict(zip(pending, results))
+        await feedback_cache.set_many(fresh.items())
+        analyses.update(fresh)
+
+    return [dict(analyses[key]) for key in keys]
+
+# Denormalized next to ai_analysis so the store can filter and sort on it (see firestore.indexes.json)
+PRIORITY_RANKS = {"high": 3, "medium": 2, "low": 1}
+
+def analysis_fields(analysis):
+    """
+    Firestore fields to write for a finished analysis: the analysis itself plus
+    top-level copies of what /api/feedback/analysis filters and orders by.
+    """
+    priority = (analysis.get("priority") or "").lower()
+    return {
+        "ai_analysis": analysis,
+        "processed": True,
+        "actionable": bool(analysis.get("actionable")),
+        "category": analysis.get("category") or "general",
+        "priority_rank": PRIORITY_RANKS.get(priority, 0),
+    }
+
+# Per-day feedback counters: one document per UTC day, keyed "YYYY-MM-DD"
+DAILY_STATS_COLLECTION = "feedback_daily_stats"
+COUNTED_VALUES = {
+    "sentiment": ("positive", "negative", "neutral", "mixed"),
+    "category": ("audio", "content", "staff", "general"),
+    "priority": ("high", "medium", "low", "none"),
+}
+
+def counted_value(analysis, dimension):
+    """The bucket an analysis is counted under for `dimension`; unexpected model values become "other"."""
+    value = str(analysis.get(dimension) or ("none" if dimension == "priority" else "")).lower()
+    return value if value in COUNTED_VALUES[dimension] else "other"
+
+def add_daily_counts(db, batch, day, analyses):
+    """
+    Add the sentiment / category / priority counts of `analyses` to the stats
+    document of `day`, as part of `batch` (a WriteBatch or Transaction), so
+    counters move atomically with the analyses themselves.
+    """
+    from google.cloud.firestore import Increment
+
+    analyses = list(analyses)
+    if not analyses:
+        return
+    counts = {}
+    for analysis in analyses:
+        for dimension in COUNTED_VALUES:
+            value = counted_value(analysis, dimension)
+            counts.setdefault(dimension, {})
+            counts[dimension][value] = counts[dimension].get(value, 0) + 1
+
+    update = {
+        "date": day.isoformat(),
+        "total": Increment(len(analyses)),
+        "actionable": Increment(sum(1 for a in analyses if a.get("actionable"))),
+    }
+    for dimension, values in counts.items():
+        update[dimension] = {value: Increment(n) for value, n in values.items()}
+    batch.set(db.collection(DAILY_STATS_COLLECTION).document(day.isoformat()), update, merge=True)
+
+# A transaction rather than a WriteBatch, because only a transaction can read
+# `processed` and write in one atomic step. Each doc costs one update plus at most
+# one counter write (when it is the only doc of its day), so 250 docs always fit
+# in Firestore's 500 writes per commit.
+MAX_TRANSACTION_DOCS = 250
+
+def feedback_day(data):
+    """The (UTC) day a feedback was submitted, which is the day its analysis is counted under."""
+    timestamp = data.get("timestamp")
+    return timestamp.date() if isinstance(timestamp, datetime) else datetime.utcnow().date()
+
+def save_analyses(collection, results):
+    """
+    Store [(doc_id, analysis)] and add them to the daily counters of the days the
+    feedback was submitted. Each chunk runs in a Firestore transaction that reads
+    the docs first and skips any already processed, so when the worker and a
+    backfill race on the same feedback it is stored and counted once.
+    Returns the number of feedback docs written.
+    """
+    from google.cloud import firestore
+
+    db = get_db()
+
+    @firestore.transactional
+    def apply(transaction, chunk):
+        refs = {doc_id: db.collection(collection).document(doc_id) for doc_id, _ in chunk}
+        snapshots = {snapshot.id: snapshot for snapshot in transaction.get_all(list(refs.values()))}
+        by_day = {}
+        for doc_id, analysis in chunk:
+            snapshot = snapshots.pop(doc_id, None)  # pop: a doc repeated in `chunk` is written once
+            if snapshot is None or not snapshot.exists:
+                continue
+            data = snapshot.to_dict()
+            if data.get("processed"):
                 continue
-                
-            print(f"Analyzing: {text[:50]}...")
-            analysis = analyze_feedback(text)
-            print(f"Result: {analysis}")
-            
-            db.collection("museum_feedback") \
-            .document(fb["doc_id"]) \
-            .update({
-                "ai_analysis": analysis
-            })
-            print("Updated Firestore.")
+            transaction.update(refs[doc_id], analysis_fields(analysis))
+            by_day.setdefault(feedback_day(data), []).append(analysis)
+        for day, analyses in by_day.items():
+            add_daily_counts(db, transaction, day, analyses)
+        return sum(len(analyses) for analyses in by_day.values())
+
+    results = list(results)
+    written = 0
+    for start in range(0, len(results), MAX_TRANSACTION_DOCS):
+        written += apply(db.transaction(), results[start:start + MAX_TRANSACTION_DOCS])
+    return written
+
+def denormalize_existing(collection="visitor_feedback"):
+    """One-off: add the top-level analysis fields to feedback analyzed before they existed."""
+    db = get_db()
+    updated = 0
+    batch = db.batch()
+    for doc in db.collection(collection).where("processed", "==", True).stream():
+        data = doc.to_dict()
+        if "priority_rank" in data or not isinstance(data.get("ai_analysis"), dict):
+            continue
+        batch.update(doc.reference, analysis_fields(data["ai_analysis"]))
+        updated += 1
+        if updated % 500 == 0:
+            batch.commit()
+            batch = db.batch()
+    batch.commit()
+    print(f"Denormalized {updated} analyzed feedback(s).")
+
+# --- BACKFILL ---
+# Analyzes feedback the API did not (queue full, worker down, model errors) or that
+# predates the analysis pipeline, in whichever store FEEDBACK_STORE selects:
+#
+#   python analyze_feedback.py                     # resume from the last checkpoint
+#   python analyze_feedback.py --rate 2 --concurrency 4
+#   python analyze_feedback.py --restart           # rescan from the start (retries failures)
+#   python analyze_feedback.py --denormalize       # see denormalize_existing()
+
+FEEDBACK_COLLECTION = "visitor_feedback"
+BACKFILL_PAGE_SIZE = 450      # docs fetched (and checkpointed) at a time
+BACKFILL_CHECKPOINT = ".analyze_feedback_checkpoint.json"
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart. rate is calls per second; None or 0 disables it."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+def load_checkpoint(path, store_name):
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return checkpoint if checkpoint.get("store") == store_name else {}
+
+def save_checkpoint(path, checkpoint):
+    checkpoint["updated_at"] = datetime.utcnow().isoformat()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+async def analyze_with_retry(texts):
+    for attempt in range(FEEDBACK_MAX_RETRIES + 1):
+        try:
+            return await analyze_feedback_batch(texts)
+        except Exception as e:
+            if attempt == FEEDBACK_MAX_RETRIES:
+                raise
+            delay = random.uniform(0, min(FEEDBACK_RETRY_MAX_SECONDS, FEEDBACK_RETRY_BASE_SECONDS * 2 ** attempt))
+            print(f"Analysis failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+async def analyze_page(docs, batch_size, concurrency, limiter):
+    """
+    Analyze one page of (id, feedback_text) with at most `concurrency` model calls
+    in flight. Returns ([(id, analysis)], failed).
+    """
+    items = [(doc_id, text) for doc_id, text in docs if (text or "").strip()]
+    chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(chunk):
+        async with semaphore:
+            await limiter.wait()
+            try:
+                analyses = await analyze_with_retry([text for _, text in chunk])
+            except Exception as e:
+                print(f"Giving up on {len(chunk)} feedback(s) ({chunk[0][0]}...): {e}")
+                return [], len(chunk)
+            return [(doc_id, analysis) for (doc_id, _), analysis in zip(chunk, analyses)], 0
+
+    results = []
+    failed = 0
+    for chunk_results, chunk_failed in await asyncio.gather(*(run(chunk) for chunk in chunks)):
+        results.extend(chunk_results)
+        failed += chunk_failed
+    return results, failed
+
+async def backfill(store, concurrency=4, batch_size=FEEDBACK_BATCH_SIZE, rate=None,
+                   checkpoint_path=BACKFILL_CHECKPOINT, restart=False, limit=None):
+    """
+    Analyze every unprocessed feedback in `store` (a feedback_store.FeedbackStore),
+    page by page in id order. After each page is committed its last id is
+    checkpointed, so an interrupted run resumes where it stopped. Feedback that
+    fails stays unprocessed and is retried by a --restart run.
+    """
+    from feedback_store import PostgresFeedbackStore
+
+    checkpoint = {} if restart else load_checkpoint(checkpoint_path, store.name)
+    checkpoint.setdefault("store", store.name)
+    checkpoint.setdefault("analyzed", 0)
+    checkpoint.setdefault("failed", 0)
+    if checkpoint.get("last_doc_id"):
+        print(f"Resuming after {checkpoint['last_doc_id']} ({checkpoint['analyzed']} analyzed so far)")
+
+    limiter = RateLimiter(rate)
+    seen = 0
+    started = time.monotonic()
+    needs_pool = feedback_cache.persistent or isinstance(store, PostgresFeedbackStore)
+    if needs_pool:
+        await open_async_pool()
+    try:
+        while limit is None or seen < limit:
+            page_size = BACKFILL_PAGE_SIZE if limit is None else min(BACKFILL_PAGE_SIZE, limit - seen)
+            docs = await store.unprocessed(checkpoint.get("last_doc_id"), page_size)
+            if not docs:
+                break
+
+            results, failed = await analyze_page(docs, batch_size, concurrency, limiter)
+            await store.save_analyses(results)
+
+            seen += len(docs)
+            checkpoint["last_doc_id"] = docs[-1][0]
+            checkpoint["analyzed"] += len(results)
+            checkpoint["failed"] += failed
+            save_checkpoint(checkpoint_path, checkpoint)
+            elapsed = time.monotonic() - started
+            print(f"{seen} scanned, {checkpoint['analyzed']} analyzed, {checkpoint['failed']} failed "
+                  f"({seen / elapsed:.1f} docs/s)")
+    finally:
+        if needs_pool:
+            await close_async_pool()
+
+    print(f"Backfill done: {seen} feedback(s) scanned this run. Classifier: {feedback_classifier.stats()}")
 
 if __name__ == "__main__":
-    analyze_and_store()
+    parser = argparse.ArgumentParser(description="Analyze unprocessed visitor feedback in bulk.")
+    parser.add_argument("--collection", default=FEEDBACK_COLLECTION, help="Firestore collection (FEEDBACK_STORE=firestore)")
+    parser.add_argument("--concurrency", type=int, default=4, help="model calls in flight at once")
+    parser.add_argument("--batch-size", type=int, default=FEEDBACK_BATCH_SIZE, help="feedback texts per model call")
+    parser.add_argument("--rate", type=float, default=None, help="max model calls per second")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many feedback docs")
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT, help="checkpoint file for resuming")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and rescan from the start")
+    parser.add_argument("--denormalize", action="store_true", help="only add filter fields to already analyzed feedback")
+    args = parser.parse_args()
+
+    if args.denormalize:
+        denormalize_existing(args.collection)
+    else:
+        from feedback_store import FEEDBACK_STORE, FirestoreFeedbackStore, create_feedback_store
+
+        store = FirestoreFeedbackStore(args.collection) if FEEDBACK_STORE == "firestore" else create_feedback_store()
+        asyncio.run(backfill(store, args.concurrency, args.batch_size, args.rate,
+                             args.checkpoint, args.restart, args.limit))
@@ -1,11 +1,24 @@
-import random
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import hashlib
+import json
+import os
+import time
+import psycopg
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional
-from database import get_conn
+from async_database import get_async_conn
+from analytics_cache import invalidate, ARTIFACT
+from id_allocator import next_id
+from enrichment_rules import enrichment_rules
+from pagination import Keyset, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_page_query, select_columns, set_page_headers
+from session_tokens import ADMIN_ONLY
 
 router = APIRouter(tags=["Artifact"])
 
+# How often the enriched feed re-reads the artefact_media version stamp (seconds)
+ENRICHED_RECHECK_SECONDS = float(os.getenv("ENRICHED_RECHECK_SECONDS", "5"))
+
 # --- Pydantic Schema ---
 class ArtifactBase(BaseModel):
     gallery_id: int = Field(..., description="ID of the gallery")
@@ -30,181 +43,266 @@ class ArtifactUpdate(ArtifactBase):
 class ArtifactResponse(ArtifactBase):
     artifact_id: int
 
+# --- Pagination ---
+ARTIFACT_COLUMNS = {
+    "artifact_id", "gallery_id", "historical_period", "category",
+    "material", "condition_status", "audio_guide_id",
+}
+ARTIFACT_KEYSET = Keyset("artifact_id")
+
+
+def artifact_filters(gallery_id, category, historical_period):
+    """WHERE conditions of the artifact listing."""
+    conditions = []
+    params = []
+    if gallery_id:
+        conditions.append("gallery_id = %s")
+        params.append(gallery_id)
+    if category:
+        conditions.append("category ILIKE %s")
+        params.append(f"%{category}%")
+    if historical_period:
+        conditions.append("historical_period ILIKE %s")
+        params.append(f"%{historical_period}%")
+    return conditions, params
+
 # --- Routes ---
 
 @router.get("/api/artifacts", status_code=200)
-def get_artifacts(
+async def get_artifacts(
+    response: Response,
     gallery_id: Optional[int] = None,
     category: Optional[str] = None,
-    historical_period: Optional[str] = None
+    historical_period: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
 ):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        query = "SELECT * FROM artifact_information"
-        conditions = []
-        params = []
-        
-        if gallery_id:
-            conditions.append("gallery_id = %s")
-            params.append(gallery_id)
-        if category:
-            conditions.append("category ILIKE %s")
-            params.append(f"%{category}%")
-        if historical_period:
-            conditions.append("historical_period ILIKE %s")
-            params.append(f"%{historical_period}%")
-            
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-            
-        query += " ORDER BY artifact_id ASC"
-            
-        cur.execute(query, tuple(params))
-        rows = cur.fetchall()
-        return rows
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-
-@router.post("/api/artifacts", status_code=201)
-def create_artifact(artifact: ArtifactCreate):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        # Check if gallery exists
-        cur.execute("SELECT gallery_id FROM gallery WHERE gallery_id = %s", (artifact.gallery_id,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=400, detail="Invalid Gallery ID")
-
-        artifact_id = random.randint(1000, 9999)
-        cur.execute("""
-            INSERT INTO artifact_information (artifact_id, gallery_id, historical_period, category, material, condition_status, audio_guide_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING artifact_id
-        """, (artifact_id, artifact.gallery_id, artifact.historical_period, artifact.category, artifact.material, artifact.condition_status, artifact.audio_guide_id))
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            conditions, params = artifact_filters(gallery_id, category, historical_period)
+            page = build_page_query(
+                "artifact_information", conditions, params, ARTIFACT_KEYSET,
+                select_columns(fields, ARTIFACT_COLUMNS, ARTIFACT_KEYSET), limit, cursor
+            )
+            await cur.execute(page.query, page.params)
+            rows = await cur.fetchall()
+            await set_page_headers(response, cur, page, rows, include_total)
+            return rows
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
+
+@router.post("/api/artifacts", status_code=201, dependencies=ADMIN_ONLY)
+async def create_artifact(artifact: ArtifactCreate):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            # Check if gallery exists
+            await cur.execute("SELECT gallery_id FROM gallery WHERE gallery_id = %s", (artifact.gallery_id,))
+            if not await cur.fetchone():
+                raise HTTPException(status_code=400, detail="Invalid Gallery ID")
+
+            artifact_id = await next_id(cur, "artifact")
+            await cur.execute("""
+                INSERT INTO artifact_information (artifact_id, gallery_id, historical_period, category, material, condition_status, audio_guide_id)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING artifact_id
+            """, (artifact_id, artifact.gallery_id, artifact.historical_period, artifact.category, artifact.material, artifact.condition_status, artifact.audio_guide_id))
         
-        new_id = cur.fetchone()['artifact_id']
-        conn.commit()
-        return {"message": "Artifact created", "artifact_id": new_id}
-    except Exception as e:
-        conn.rollback()
-        if "foreign key" in str(e).lower():
-             raise HTTPException(status_code=400, detail="Foreign Key Error: Check Gallery ID.")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-
-@router.put("/api/artifacts/{artifact_id}")
-def update_artifact(artifact_id: int, artifact: ArtifactUpdate):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            UPDATE artifact_information 
-            SET gallery_id=%s, historical_period=%s, category=%s, material=%s, condition_status=%s, audio_guide_id=%s
-            WHERE artifact_id=%s
-        """, (artifact.gallery_id, artifact.historical_period, artifact.category, artifact.material, artifact.condition_status, artifact.audio_guide_id, artifact_id))
+            new_id = (await cur.fetchone())['artifact_id']
+            await conn.commit()
+            invalidate(ARTIFACT)
+            return {"message": "Artifact created", "artifact_id": new_id}
+        except Exception as e:
+            await conn.rollback()
+            if "foreign key" in str(e).lower():
+                 raise HTTPException(status_code=400, detail="Foreign Key Error: Check Gallery ID.")
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
+
+@router.put("/api/artifacts/{artifact_id}", dependencies=ADMIN_ONLY)
+async def update_artifact(artifact_id: int, artifact: ArtifactUpdate):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("""
+                UPDATE artifact_information 
+                SET gallery_id=%s, historical_period=%s, category=%s, material=%s, condition_status=%s, audio_guide_id=%s
+                WHERE artifact_id=%s
+            """, (artifact.gallery_id, artifact.historical_period, artifact.category, artifact.material, artifact.condition_status, artifact.audio_guide_id, artifact_id))
         
-        if cur.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Artifact not found")
+            if cur.rowcount == 0:
+                raise HTTPException(status_code=404, detail="Artifact not found")
             
-        conn.commit()
-        return {"message": "Artifact updated successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-
-@router.delete("/api/artifacts/{artifact_id}")
-def delete_artifact(artifact_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("DELETE FROM artifact_information WHERE artifact_id = %s", (artifact_id,))
-        if cur.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Artifact not found")
-        conn.commit()
-        return {"message": "Artifact deleted successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+            await conn.commit()
+            invalidate(ARTIFACT)
+            return {"message": "Artifact updated successfully"}
+        except HTTPException:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
 
-@router.get("/api/artifacts/enriched", status_code=200)
-def get_enriched_artifacts():
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        # Fetch ONLY from artefact_media as requested
-        query = "SELECT * FROM artefact_media ORDER BY artifact_id, media_type"
-        cur.execute(query)
-        rows = cur.fetchall()
+@router.delete("/api/artifacts/{artifact_id}", dependencies=ADMIN_ONLY)
+async def delete_artifact(artifact_id: int):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("DELETE FROM artifact_information WHERE artifact_id = %s", (artifact_id,))
+            if cur.rowcount == 0:
+                raise HTTPException(status_code=404, detail="Artifact not found")
+            await conn.commit()
+            invalidate(ARTIFACT)
+            return {"message": "Artifact deleted successfully"}
+        except HTTPException:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
+
+def build_enriched_artifacts(rows):
+    """Turns artefact_media rows (one per media file) into one enriched document per artifact."""
+    artifacts_map = {}
+
+    for row in rows:
+        aid = row['artifact_id']
+    
+        # Fix Google Cloud Storage URLs to be public accessible
+        url = row['media_url']
+        if url and "storage.cloud.google.com" in url:
+            url = url.replace("storage.cloud.google.com", "storage.googleapis.com")
+
+        if aid not in artifacts_map:
+            name = row['artifact_name']
+            # Determine Gallery Name and Content dynamically
+            gallery_name = "General Exhibition"
+            desc = row['artifact_description'] or ""
         
-        artifacts_map = {}
+            # Curator rules (artifact_enrichment_rules.json) inject gallery and long description
+            rule = enrichment_rules.match(name)
+            if rule:
+                gallery_name = rule["gallery_name"]
+                desc = rule["description"]
         
-        for row in rows:
-            aid = row['artifact_id']
-            
-            # Fix Google Cloud Storage URLs to be public accessible
-            url = row['media_url']
-            if url and "storage.cloud.google.com" in url:
-                url = url.replace("storage.cloud.google.com", "storage.googleapis.com")
-
-            if aid not in artifacts_map:
-                name = row['artifact_name']
-                # Determine Gallery Name and Content dynamically
-                gallery_name = "General Exhibition"
-                desc = row['artifact_description'] or ""
-                
-                # Check for Specific Artifacts to inject User-Requested Content
-                if "Vase" in name:
-                    gallery_name = "Imperial Ceramics Gallery"
-                    desc = "This elegant Song Dynasty Meiping vase exemplifies masterful ceramic artistry with its slender form and delicate incised floral patterns, showcasing the refinement of Yaozhou ware. The sharp, vigorous lines carved into the surface create dynamic, lifelike scrolling vines, demonstrating high technical skill and aesthetic balance. Its sophisticated design and pristine condition make it a significant piece reflecting imperial beauty and classical Chinese ceramic tradition."
-                elif "Book" in name or "Kells" in name:
-                    gallery_name = "Medieval Manuscripts Hall"
-                    desc = "Book of Kells is a famous illuminated manuscript at Trinity College Library, Dublin: it's an early medieval gospel book (c. 800 AD) on vellum, renowned for its stunning, intricate Celtic knotwork, vibrant illustrations (like the famous Chi Rho page), and complex decorative initials, showcasing incredible artistry and devotion, a testament to early Irish monastic culture, with its pages offering a glimpse into early Christian iconography and intricate calligraphy, making it a treasure of Western art and literature."
-                elif "Sword" in name or "Weapon" in name:
-                    gallery_name = "Royal Armory"
-                    desc = "This is a striking weapon on display is the personal sword of Tipu Sultan, the 18th-century ruler of Mysore. This exceptional sword features a watered steel blade, ornamented with fine floral motifs and inscriptions in gold that include Quranic verses and the name of its owner and his capital city, Srirangapatnam. The hilt, known as a Delhishahi hilt, is also heavily damascened in gold with creeper and floral designs and finished with a circular disc pommel and a small knuckle-guard. The weapon is housed in a wooden sheath covered in rich maroon velvet, showcasing it not just as a tool of war, but as a significant artifact of royal power, artistry, and a symbol of resistance against the British in Indian history."
-                elif "Textile" in name:
-                    gallery_name = "Cultural Textiles Exhibit"
-                    desc = "The embroidered Indian Chakla is a decorative, often square, textile from regions like Gujarat and Rajasthan, traditionally used for special occasions like weddings, as a wall hanging, for wrapping gifts (rumal), or as a small decorative cloth, featuring vibrant hand-embroidery, mirror work (Shisha), and colorful threads, reflecting the rich traditions of communities like the Rabari or Ahir."
-                
-                artifacts_map[aid] = {
-                    "artifact_id": aid,
-                    "name": name, 
-                    "gallery_name": gallery_name,
-                    "historical_period": "Various", 
-                    "category": "Artifact",
-                    "material": "Mixed Media",
-                    "condition_status": "Displayed",
-                    "description": desc,
-                    "image_url": None,
-                    "audio_url": None
-                }
-            
-            if row['media_type'] == 'image':
-                artifacts_map[aid]['image_url'] = url
-            elif row['media_type'] == 'audio':
-                artifacts_map[aid]['audio_url'] = url
+            artifacts_map[aid] = {
+                "artifact_id": aid,
+                "name": name, 
+                "gallery_name": gallery_name,
+                "historical_period": "Various", 
+                "category": "Artifact",
+                "material": "Mixed Media",
+                "condition_status": "Displayed",
+                "description": desc,
+                "image_url": None,
+                "audio_url": None
+            }
+    
+        if row['media_type'] == 'image':
+            artifacts_map[aid]['image_url'] = url
+        elif row['media_type'] == 'audio':
+            artifacts_map[aid]['audio_url'] = url
+
+    return list(artifacts_map.values())
+
+
+class EnrichedDocument:
+    """The serialized /api/artifacts/enriched payload plus the data/rules versions it was built from."""
+
+    def __init__(self, version, rules_version, body, checked_at):
+        self.version = version
+        self.rules_version = rules_version
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self.checked_at = checked_at
+
+
+_enriched_doc = None
+_enriched_lock = asyncio.Lock()
+
+
+async def _artefact_media_version(cur):
+    """Current artefact_media version stamp (migrations/0005_artefact_media_version.sql), or None if not installed."""
+    try:
+        await cur.execute("SELECT version FROM content_version WHERE name = 'artefact_media'")
+        row = await cur.fetchone()
+        return row['version'] if row else None
+    except psycopg.errors.UndefinedTable:
+        await cur.connection.rollback()
+        return None
 
-        return list(artifacts_map.values())
 
+async def get_enriched_document():
+    """
+    Returns the cached enriched document, rebuilding it only when artefact_media or the
+    enrichment rules changed. Both are re-checked at most every ENRICHED_RECHECK_SECONDS.
+    """
+    global _enriched_doc
+    doc = _enriched_doc
+    if doc and time.monotonic() - doc.checked_at < ENRICHED_RECHECK_SECONDS:
+        return doc
+
+    async with _enriched_lock:
+        doc = _enriched_doc
+        if doc and time.monotonic() - doc.checked_at < ENRICHED_RECHECK_SECONDS:
+            return doc
+
+        # os.stat (and a reload when the file changed) is file I/O: keep it off the event loop
+        rules_version = await asyncio.to_thread(enrichment_rules.refresh)
+        async with get_async_conn() as conn:
+            cur = conn.cursor()
+            try:
+                version = await _artefact_media_version(cur)
+                if doc and version is not None and version == doc.version and rules_version == doc.rules_version:
+                    doc.checked_at = time.monotonic()
+                    return doc
+
+                # Fetch ONLY from artefact_media as requested
+                await cur.execute("SELECT * FROM artefact_media ORDER BY artifact_id, media_type")
+                rows = await cur.fetchall()
+            finally:
+                await cur.close()
+
+        body = json.dumps(build_enriched_artifacts(rows)).encode("utf-8")
+        _enriched_doc = EnrichedDocument(version, rules_version, body, time.monotonic())
+        return _enriched_doc
+
+
+def etag_matches(if_none_match, etag):
+    """
+    If-None-Match check (RFC 9110 weak comparison): true for `*` or when any
+    listed validator, with or without its W/ prefix, equals `etag`.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+@router.get("/api/artifacts/enriched", status_code=200)
+async def get_enriched_artifacts(request: Request):
+    try:
+        doc = await get_enriched_document()
     except Exception as e:
         print(f"Error fetching enriched artifacts: {e}") 
         return []
-    finally:
-        cur.close()
-        conn.close()
+
+    headers = {"ETag": doc.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), doc.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=doc.body, media_type="application/json", headers=headers)
@@ -0,0 +1,58 @@
+import os
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from database import DB_URL, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, DB_POOL_IDLE_TIMEOUT
+
+# Async counterpart of database.pool, used by the `async def` route handlers.
+# Rows come back as plain dicts (dict_row), matching what RealDictCursor returns.
+async_pool = AsyncConnectionPool(
+    DB_URL,
+    min_size=DB_POOL_MIN,
+    max_size=DB_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    max_idle=DB_POOL_IDLE_TIMEOUT,
+    kwargs={"row_factory": dict_row},
+    check=AsyncConnectionPool.check_connection,
+    open=False,
+)
+
+# Streaming exports (export.py) hold their connection for as long as the client takes to read the
+# download, so they borrow from this small pool of their own and can never starve the API handlers.
+EXPORT_POOL_MAX = int(os.getenv("EXPORT_POOL_MAX", "2"))
+
+export_pool = AsyncConnectionPool(
+    DB_URL,
+    min_size=1,
+    max_size=EXPORT_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    max_idle=DB_POOL_IDLE_TIMEOUT,
+    kwargs={"row_factory": dict_row},
+    check=AsyncConnectionPool.check_connection,
+    open=False,
+)
+
+
+async def open_async_pool():
+    await async_pool.open()
+    await export_pool.open()
+
+
+async def close_async_pool():
+    await export_pool.close()
+    await async_pool.close()
+
+
+def get_async_conn():
+    """
+    Borrow a connection from the async pool.
+    Use as `async with get_async_conn() as conn:`; the connection is returned on exit.
+    """
+    return async_pool.connection()
+
+
+def async_pool_stats():
+    return async_pool.get_stats()
+
+
+def export_pool_stats():
+    return export_pool.get_stats()
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, status, HTTPException
-from auth_schemas import SignupRequest, LoginRequest, SignupResponse, LoginResponse
+from fastapi import APIRouter, status, HTTPException, Depends
+from auth_schemas import SignupRequest, LoginRequest, SignupResponse, LoginResponse, SessionResponse
 from db_sec import signup_user, login_user
+from password_workers import PasswordPoolBusy
+from session_tokens import get_current_session
 
 # Create router for authentication endpoints
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 
 @router.post("/signup", response_model=SignupResponse, status_code=status.HTTP_201_CREATED)
-def signup(request: SignupRequest):
+async def signup(request: SignupRequest):
     """
     Register a new user account.
     
@@ -28,7 +30,10 @@ def signup(request: SignupRequest):
         )
     
     # Call database function to signup user
-    result = signup_user(request.name, request.email, request.role, request.password)
+    try:
+        result = await signup_user(request.name, request.email, request.role, request.password)
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     
     if not result['success']:
         raise HTTPException(
@@ -44,7 +49,7 @@ def signup(request: SignupRequest):
 
 
 @router.post("/login", response_model=LoginResponse, status_code=status.HTTP_200_OK)
-def login(request: LoginRequest):
+async def login(request: LoginRequest):
     """
     Authenticate a user and return user details.
     
@@ -53,7 +58,7 @@ def login(request: LoginRequest):
     - **password**: User's password
     
     Returns:
-    - **200 OK**: Login successful, returns user information
+    - **200 OK**: Login successful, returns user information and a signed session token
     - **401 Unauthorized**: Invalid email, role, or password
     """
     # Validate role
@@ -64,7 +69,10 @@ def login(request: LoginRequest):
         )
     
     # Call database function to login user
-    result = login_user(request.email, request.role, request.password)
+    try:
+        result = await login_user(request.email, request.role, request.password)
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     
     if not result['success']:
         raise HTTPException(
@@ -75,5 +83,22 @@ def login(request: LoginRequest):
     return LoginResponse(
         success=result['success'],
         message=result['message'],
-        user=result['user']
+        user=result['user'],
+        token=result['token']
+    )
+
+
+@router.get("/me", response_model=SessionResponse, status_code=status.HTTP_200_OK)
+async def me(session: dict = Depends(get_current_session)):
+    """
+    Return the identity carried by the bearer token.
+    
+    Verified from the token signature alone; no database round trip.
+    """
+    return SessionResponse(
+        id=int(session['sub']),
+        role=session['role'],
+        email=session.get('email'),
+        staff_id=session.get('staff_id'),
+        expires_at=session['exp']
     )
@@ -46,6 +46,7 @@ class UserResponse(BaseModel):
     name: str
     email: str
     role: str
+    staff_id: Optional[int] = None
 
 
 class SignupResponse(BaseModel):
@@ -60,3 +61,14 @@ class LoginResponse(BaseModel):
     success: bool
     message: str
     user: Optional[UserResponse] = None
+    token: Optional[str] = None
+    token_type: str = "bearer"
+
+
+class SessionResponse(BaseModel):
+    """Schema for the claims of a verified session token"""
+    id: int
+    role: str
+    email: Optional[str] = None
+    staff_id: Optional[int] = None
+    expires_at: int
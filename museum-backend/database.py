@@ -1,11 +1,272 @@
 import os
+import threading
+import time
+from collections import deque
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
 load_dotenv()
 DB_URL = os.getenv("DATABASE_URL")
 
+# Pool sizing / housekeeping (override via .env).
+# DB_POOL_MIN/MAX size the async pool the API uses (async_database.py); this sync
+# pool only serves the CLIs (migrate, rollups, tour_roster, plan_check), so it has
+# its own small cap and the two together stay near DB_POOL_MAX connections.
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+DB_SYNC_POOL_MAX = int(os.getenv("DB_SYNC_POOL_MAX", "2"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))          # seconds to wait for a free connection
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))  # close idle connections above min after this
+DB_POOL_CHECK_AFTER = float(os.getenv("DB_POOL_CHECK_AFTER", "30"))    # ping connections idle longer than this
+
+
+class PoolExhausted(Exception):
+    """Raised when no connection becomes available within DB_POOL_TIMEOUT."""
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a psycopg2 connection.
+    Behaves like the real connection, except close() hands it back to the pool,
+    so existing `cur.close(); conn.close()` handler code keeps working unchanged.
+    `with get_conn() as conn:` commits on success and rolls back on an exception,
+    like psycopg2's own `with conn:`, then returns the connection to the pool.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._raw.commit()
+            else:
+                self._raw.rollback()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._raw is not None:
+            self._pool.putconn(self._raw)
+            self._raw = None
+
+
+class ConnectionPool:
+    """
+    Process-wide, thread-safe psycopg2 connection pool.
+
+    - Keeps between `minconn` and `maxconn` connections open; the first `minconn`
+      are opened on first use, not at import, so importing never needs a database
+    - Pings connections that have been idle a while before handing them out
+    - Closes idle connections above `minconn` after `idle_timeout` seconds
+    - Tracks usage/exhaustion counters (see stats())
+    """
+
+    def __init__(self, dsn, minconn, maxconn, timeout, idle_timeout, check_after):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+
+        self._idle = deque()  # (conn, last_used)
+        self._in_use = 0
+        self._prefilled = False
+        self._cond = threading.Condition()
+        self._metrics = {
+            "checkouts": 0,
+            "waits": 0,
+            "exhausted": 0,
+            "created": 0,
+            "discarded": 0,
+            "reaped": 0,
+            "max_in_use": 0,
+        }
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, cursor_factory=RealDictCursor)
+        with self._cond:
+            self._metrics["created"] += 1
+        return conn
+
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._metrics["discarded"] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _reap_idle(self):
+        """Close connections above minconn that have sat idle past idle_timeout. Caller holds the lock."""
+        now = time.monotonic()
+        total = len(self._idle) + self._in_use
+        # Oldest connections sit at the left of the deque
+        while self._idle and total > self.minconn and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._metrics["reaped"] += 1
+            self._discard(conn)
+            total -= 1
+
+    def _prefill(self):
+        """Open connections up to minconn, once. Failures are left for getconn() to report."""
+        with self._cond:
+            if self._prefilled:
+                return
+            self._prefilled = True
+            missing = max(self.minconn - len(self._idle) - self._in_use, 0)
+            # Reserve the slots first so concurrent checkouts never push the pool past maxconn
+            self._in_use += missing
+        for opened in range(missing):
+            try:
+                conn = self._connect()
+            except psycopg2.Error:
+                # The database is unreachable: give back the remaining slots and stop trying
+                with self._cond:
+                    self._in_use -= missing - opened
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._in_use -= 1
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def _reserve(self, deadline):
+        """
+        Wait for a slot and reserve it. Returns (conn, last_used) for a reused idle
+        connection, or (None, None) when the caller should open a new one.
+        """
+        with self._cond:
+            self._reap_idle()
+            waited = False
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    self._in_use += 1
+                    return conn, last_used
+                if len(self._idle) + self._in_use < self.maxconn:
+                    self._in_use += 1
+                    return None, None
+
+                if not waited:
+                    self._metrics["waits"] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics["exhausted"] += 1
+                    raise PoolExhausted(
+                        f"No database connection available within {self.timeout}s (max {self.maxconn})"
+                    )
+                self._cond.wait(remaining)
+
+    def _release_slot(self, conn=None):
+        with self._cond:
+            self._in_use -= 1
+            if conn is not None:
+                self._metrics["discarded"] += 1
+            self._cond.notify()
+        if conn is not None:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        if not self._prefilled:
+            self._prefill()
+        while True:
+            conn, last_used = self._reserve(deadline)
+            # The slot is reserved, so the health ping and the connect handshake run
+            # outside the lock: a slow or dead connection only delays this caller
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+            elif not self._is_healthy(conn, last_used):
+                self._release_slot(conn)
+                continue
+            break
+
+        with self._cond:
+            self._metrics["checkouts"] += 1
+            self._metrics["max_in_use"] = max(self._metrics["max_in_use"], self._in_use)
+        return PooledConnection(self, conn)
+
+    def putconn(self, conn):
+        # Never hand a connection with an open/aborted transaction to the next caller
+        healthy = not conn.closed
+        if healthy and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._reap_idle()
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                **self._metrics,
+            }
+
+    def closeall(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                conn.close()
+
+
+pool = ConnectionPool(
+    DB_URL,
+    minconn=min(DB_POOL_MIN, DB_SYNC_POOL_MAX),
+    maxconn=DB_SYNC_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    idle_timeout=DB_POOL_IDLE_TIMEOUT,
+    check_after=DB_POOL_CHECK_AFTER,
+)
+
+
 def get_conn():
-    return psycopg2.connect(DB_URL, cursor_factory=RealDictCursor)
+    """Check a connection out of the shared pool. conn.close() returns it."""
+    return pool.getconn()
+
 
+def pool_stats():
+    return pool.stats()
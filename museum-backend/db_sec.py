@@ -1,31 +1,109 @@
+import asyncio
 import os
+import statistics
+import time
 import bcrypt
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
+import psycopg
+from async_database import get_async_conn
+from password_workers import password_pool, PasswordPoolBusy
+from session_tokens import issue_token
 
-load_dotenv()
-DB_URL = os.getenv("DATABASE_URL")
+# bcrypt cost factor for new hashes. An integer, or "auto" to benchmark the host
+# once and pick the cost closest to BCRYPT_TARGET_MS per hash.
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS", "12")
+BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
 
+# staff_id is resolved at login once so it can travel in the session token
+LOGIN_QUERY = """
+    SELECT a.id, a."Name", a."Email", a."Role", a."Password_hash", s.staff_id
+    FROM "Authentication" a
+    LEFT JOIN staff s ON s.email = a."Email"
+    WHERE a."Email" = %s AND a."Role" = %s
+    LIMIT 1
+"""
 
-def get_conn():
-    """Establish database connection"""
-    return psycopg2.connect(DB_URL, cursor_factory=RealDictCursor)
+_target_rounds = None
+# Strong references to in-flight rehash tasks so they are not garbage collected
+_rehash_tasks = set()
 
 
 # ==================== PASSWORD HASHING ====================
 
-def hash_password(password):
+def benchmark_bcrypt_cost(target_ms=BCRYPT_TARGET_MS, samples=3):
+    """
+    Pick the bcrypt cost whose hash time on this host is closest to target_ms.
+    Each cost is timed directly (median of `samples` hashes), starting at the
+    minimum and stopping once a cost overshoots the target.
+
+    Returns:
+        tuple: (rounds, {rounds: measured_ms})
+    """
+    measured = {}
+    for rounds in range(BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS + 1):
+        salt = bcrypt.gensalt(rounds=rounds)
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            bcrypt.hashpw(b"benchmark-password", salt)
+            timings.append((time.perf_counter() - started) * 1000)
+        measured[rounds] = statistics.median(timings)
+        if measured[rounds] >= target_ms:
+            break
+    rounds = min(measured, key=lambda r: abs(measured[r] - target_ms))
+    return rounds, measured
+
+
+def init_target_rounds():
+    """
+    Resolve the bcrypt cost once per process. Called from main.py's lifespan in a
+    thread, so BCRYPT_ROUNDS=auto never benchmarks on the event loop or inside a
+    request. For the same cost on every worker and host, pin BCRYPT_ROUNDS to the
+    value `python db_sec.py` recommends.
+    """
+    global _target_rounds
+    if _target_rounds is None:
+        if BCRYPT_ROUNDS.lower() == "auto":
+            _target_rounds, _ = benchmark_bcrypt_cost()
+            print(f"BCRYPT_ROUNDS=auto: using cost {_target_rounds} on this host")
+        else:
+            _target_rounds = int(BCRYPT_ROUNDS)
+    return _target_rounds
+
+
+def get_target_rounds():
+    """The bcrypt cost new hashes should use."""
+    return _target_rounds if _target_rounds is not None else init_target_rounds()
+
+
+def hash_cost(hashed_password):
+    """Cost factor stored in a bcrypt hash ("$2b$12$..." -> 12), or None if unparseable."""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password):
+    # Upgrade only: workers or hosts that settle on different costs never rewrite
+    # each other's hashes back and forth
+    cost = hash_cost(hashed_password)
+    return cost is not None and cost < get_target_rounds()
+
+
+def hash_password(password, rounds=None):
     """
     Hash a plain text password using bcrypt.
     
     Args:
         password (str): Plain text password
+        rounds (int): bcrypt cost factor, defaults to get_target_rounds()
     
     Returns:
         str: Hashed password (salt + hash combined)
     """
-    salt = bcrypt.gensalt(rounds=12)
+    salt = bcrypt.gensalt(rounds=rounds or get_target_rounds())
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     print(hashed)
     return hashed.decode('utf-8')
@@ -46,9 +124,48 @@ def verify_password(password, hashed_password):
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 
+async def hash_password_async(password):
+    """hash_password() run on the dedicated password worker pool."""
+    # Resolve the cost here so process-pool workers hash with the parent's target
+    return await password_pool.run(hash_password, password, get_target_rounds())
+
+
+async def verify_password_async(password, hashed_password):
+    """verify_password() run on the dedicated password worker pool."""
+    return await password_pool.run(verify_password, password, hashed_password)
+
+
+async def rehash_password(user_id, password, old_hash):
+    """
+    Re-hash a just-verified password at the current target cost and store it.
+    The UPDATE only applies if the stored hash is still the one we verified against.
+    """
+    try:
+        new_hash = await hash_password_async(password)
+        async with get_async_conn() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(
+                'UPDATE "Authentication" SET "Password_hash" = %s WHERE id = %s AND "Password_hash" = %s',
+                (new_hash, user_id, old_hash)
+            )
+            await conn.commit()
+            await cursor.close()
+    except Exception as e:
+        print(f"Password rehash failed for user {user_id}: {e}")
+
+
+def schedule_rehash_if_needed(user_id, password, stored_hash):
+    """After a successful login, upgrade the stored hash in the background if its cost is below target."""
+    if not needs_rehash(stored_hash):
+        return
+    task = asyncio.create_task(rehash_password(user_id, password, stored_hash))
+    _rehash_tasks.add(task)
+    task.add_done_callback(_rehash_tasks.discard)
+
+
 # ==================== USER SIGNUP ====================
 
-def signup_user(name, email, role, password):
+async def signup_user(name, email, role, password):
     """
     Register a new user in the Authentication table with bcrypt hashed password.
     
@@ -62,37 +179,45 @@ def signup_user(name, email, role, password):
         dict: {'success': bool, 'message': str, 'user_id': int or None}
     """
     try:
-        conn = get_conn()
-        cursor = conn.cursor()
-        
-        # Check if email already exists
-        check_query = "SELECT id FROM \"Authentication\" WHERE \"Email\" = %s"
-        cursor.execute(check_query, (email,))
-        
-        if cursor.fetchone():
-            cursor.close()
-            conn.close()
+        async with get_async_conn() as conn:
+            cursor = conn.cursor()
+            # Check if email already exists
+            check_query = "SELECT id FROM \"Authentication\" WHERE \"Email\" = %s"
+            await cursor.execute(check_query, (email,))
+            exists = await cursor.fetchone()
+            await cursor.close()
+
+        if exists:
             return {
                 'success': False,
                 'message': 'Email already exists. Please use a different email.',
                 'user_id': None
             }
         
-        # Hash password before storing
-        hashed_password = hash_password(password)
+        # Hash password before storing (on the password pool, without holding a DB connection)
+        hashed_password = await hash_password_async(password)
         
-        # Insert new user into Authentication table with hashed password
-        insert_query = """
-            INSERT INTO \"Authentication\" (\"Name\", \"Email\", \"Role\", \"Password_hash\")
-            VALUES (%s, %s, %s, %s)
-            RETURNING id
-        """
-        cursor.execute(insert_query, (name, email, role, hashed_password))
-        user_id = cursor.fetchone()['id']
-        conn.commit()
-        
-        cursor.close()
-        conn.close()
+        async with get_async_conn() as conn:
+            cursor = conn.cursor()
+            try:
+                # Insert new user into Authentication table with hashed password
+                insert_query = """
+                    INSERT INTO \"Authentication\" (\"Name\", \"Email\", \"Role\", \"Password_hash\")
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING id
+                """
+                await cursor.execute(insert_query, (name, email, role, hashed_password))
+                user_id = (await cursor.fetchone())['id']
+                await conn.commit()
+            except psycopg.IntegrityError:
+                await conn.rollback()
+                return {
+                    'success': False,
+                    'message': 'Email already exists or invalid role. login in',
+                    'user_id': None
+                }
+            finally:
+                await cursor.close()
         
         return {
             'success': True,
@@ -100,15 +225,8 @@ def signup_user(name, email, role, password):
             'user_id': user_id
         }
     
-    except psycopg2.IntegrityError as e:
-        conn.rollback()
-        cursor.close()
-        conn.close()
-        return {
-            'success': False,
-            'message': 'Email already exists or invalid role. login in',
-            'user_id': None
-        }
+    except PasswordPoolBusy:
+        raise
     
     except Exception as e:
         return {
@@ -181,18 +299,13 @@ def signup_user(name, email, role, password):
 #             'message': f'Login failed: {str(e)}',
 #             'user': None
 #         }
-def login_user(email, role, password):
+async def login_user(email, role, password):
     try:
-        conn = get_conn()
-        cursor = conn.cursor()
-
-        query = """
-            SELECT id, "Name", "Email", "Role", "Password_hash"
-            FROM "Authentication"
-            WHERE "Email" = %s AND "Role" = %s
-        """
-        cursor.execute(query, (email, role))
-        user = cursor.fetchone()
+        async with get_async_conn() as conn:
+            cursor = conn.cursor()
+            await cursor.execute(LOGIN_QUERY, (email, role))
+            user = await cursor.fetchone()
+            await cursor.close()
 
         if not user:
             return {
@@ -202,7 +315,8 @@ def login_user(email, role, password):
                 'user': None
             }
 
-        if verify_password(password, user['Password_hash']):
+        if await verify_password_async(password, user['Password_hash']):
+            schedule_rehash_if_needed(user['id'], password, user['Password_hash'])
             return {
                 'success': True,
                 'message': 'Login successful!',
@@ -210,8 +324,10 @@ def login_user(email, role, password):
                     'id': user['id'],
                     'name': user['Name'],
                     'email': user['Email'],
-                    'role': user['Role']
-                }
+                    'role': user['Role'],
+                    'staff_id': user['staff_id']
+                },
+                'token': issue_token(user['id'], user['Role'], user['Email'], user['staff_id'])
             }
         else:
             return {
@@ -220,6 +336,9 @@ def login_user(email, role, password):
                 'user': None
             }
 
+    except PasswordPoolBusy:
+        raise
+
     except Exception as e:
         return {
             'success': False,
@@ -227,9 +346,16 @@ def login_user(email, role, password):
             'user': None
         }
 
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark bcrypt cost factors on this host")
+    parser.add_argument("--target-ms", type=float, default=BCRYPT_TARGET_MS, help="Desired time per hash")
+    args = parser.parse_args()
+
+    rounds, measured = benchmark_bcrypt_cost(args.target_ms)
+    for r, ms in measured.items():
+        marker = "  <-- closest to target" if r == rounds else ""
+        print(f"cost {r:2d}: {ms:8.1f} ms{marker}")
+    print(f"\nSet BCRYPT_ROUNDS={rounds} in .env (or BCRYPT_ROUNDS=auto to pick at startup).")
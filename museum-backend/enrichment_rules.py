@@ -0,0 +1,90 @@
+"""
+Curator-maintained rules that map artifact names to a gallery and long description
+for the visitor feed (/api/artifacts/enriched).
+
+Rules live in artifact_enrichment_rules.json (override with ENRICHMENT_RULES_PATH):
+
+    {"rules": [{"keywords": ["Vase"], "gallery_name": "...", "description": "..."}, ...]}
+
+A name matches a rule if it contains any of the rule's keywords (case-sensitive
+substring). When several rules match, the one listed first wins. All keywords are
+compiled into one regex, so matching a name is a single scan no matter how many
+rules exist. The file is reloaded automatically when its mtime changes.
+"""
+import json
+import os
+import re
+import threading
+
+ENRICHMENT_RULES_PATH = os.getenv(
+    "ENRICHMENT_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifact_enrichment_rules.json"),
+)
+
+
+class EnrichmentRules:
+    def __init__(self, path):
+        self.path = path
+        self.version = 0  # bumped on every (re)load, lets callers invalidate derived caches
+        self._mtime = None
+        self._rules = []
+        self._pattern = None
+        self._keyword_rule = {}  # keyword -> index of the first rule listing it
+        self._lock = threading.Lock()
+
+    def _load(self, mtime):
+        with open(self.path, encoding="utf-8") as f:
+            rules = json.load(f)["rules"]
+
+        keyword_rule = {}
+        for index, rule in enumerate(rules):
+            for keyword in rule["keywords"]:
+                keyword_rule.setdefault(keyword, index)
+        # A keyword that contains another ("Bookcase" contains "Book") implies that one matched too,
+        # so it inherits the better priority of the two
+        keyword_rule = {
+            k: min(i for other, i in keyword_rule.items() if other in k)
+            for k in keyword_rule
+        }
+
+        # Zero-width lookahead finds a keyword at every start position (overlaps included);
+        # longest alternatives first so the most specific keyword at a position wins
+        keywords = sorted(keyword_rule, key=len, reverse=True)
+        pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in keywords) + "))") if keywords else None
+
+        self._rules = rules
+        self._keyword_rule = keyword_rule
+        self._pattern = pattern
+        self._mtime = mtime
+        self.version += 1
+
+    def refresh(self):
+        """Reload the rules file if it changed on disk. Returns the current version."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return self.version  # keep the last good rules if the file is temporarily missing
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        self._load(mtime)
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"Error loading enrichment rules from {self.path}: {e}")
+        return self.version
+
+    def match(self, name):
+        """Returns the highest-priority rule whose keyword occurs in `name`, or None."""
+        if not name or self._pattern is None:
+            return None
+        best = None
+        for m in self._pattern.finditer(name):
+            index = self._keyword_rule[m.group(1)]
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        return self._rules[best] if best is not None else None
+
+
+enrichment_rules = EnrichmentRules(ENRICHMENT_RULES_PATH)
@@ -0,0 +1,117 @@
+"""
+Streaming exports (NDJSON / CSV) for large listings.
+
+Rows are read through a server-side (named) cursor in batches of EXPORT_ITERSIZE
+and written to the client as they arrive, so worker memory stays flat no matter
+how many rows the export covers.
+
+The cursor's connection comes from async_database.export_pool, not the API pool,
+and is held until the download finishes, so a slow reader only ever ties up an
+export connection. When all of them are busy the export is refused with 503, and a
+download still running after EXPORT_MAX_SECONDS is cut off and its connection
+returned.
+
+Settings (.env):
+- EXPORT_ITERSIZE: rows fetched per round trip (and per chunk sent)
+- EXPORT_POOL_MAX: concurrent exports per worker (async_database.py)
+- EXPORT_MAX_SECONDS: longest an export may take, slow clients included
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+from datetime import date
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from psycopg_pool import PoolTimeout
+from async_database import export_pool
+
+EXPORT_ITERSIZE = int(os.getenv("EXPORT_ITERSIZE", "2000"))
+EXPORT_MAX_SECONDS = float(os.getenv("EXPORT_MAX_SECONDS", "600"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def _stream_rows(cursor_name, query, params, fmt):
+    async with export_pool.connection() as conn:
+        async with conn.cursor(name=cursor_name) as cur:
+            cur.itersize = EXPORT_ITERSIZE
+            await cur.execute(query, params)
+
+            buffer = io.StringIO()
+            writer = None
+            if fmt == "csv":
+                writer = csv.writer(buffer)
+                writer.writerow([col.name for col in cur.description])
+            # First chunk as soon as the query runs (export_response waits for it)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+            pending = 0
+            async for row in cur:
+                if writer:
+                    writer.writerow(row.values())
+                else:
+                    buffer.write(json.dumps(row, default=str))
+                    buffer.write("\n")
+                pending += 1
+                # Flush once per fetched batch
+                if pending >= EXPORT_ITERSIZE:
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate()
+                    pending = 0
+
+            if buffer.tell():
+                yield buffer.getvalue().encode("utf-8")
+
+
+async def _resume(first, rows):
+    """Yields the chunk export_response already read, then the rest; always closes `rows`."""
+    try:
+        yield first
+        async for chunk in rows:
+            yield chunk
+    finally:
+        await rows.aclose()
+
+
+class _TimedStreamingResponse(StreamingResponse):
+    """StreamingResponse that drops the download after EXPORT_MAX_SECONDS and closes its body iterator."""
+
+    async def __call__(self, scope, receive, send):
+        try:
+            # A client that stops reading blocks send() indefinitely; wait_for bounds that too
+            await asyncio.wait_for(super().__call__(scope, receive, send), EXPORT_MAX_SECONDS)
+        finally:
+            await self.body_iterator.aclose()
+
+
+async def export_response(name, query, params, fmt):
+    """Builds a StreamingResponse that downloads `query` as <name>-<today>.<fmt>."""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of {list(EXPORT_FORMATS)}")
+
+    # Take the connection and run the query before answering, so a busy pool or a
+    # failing query is a proper error status instead of a truncated download
+    rows = _stream_rows(f"{name}_export", query, params, fmt)
+    try:
+        first = await rows.__anext__()
+    except PoolTimeout:
+        await rows.aclose()
+        raise HTTPException(status_code=503, detail="Too many exports in progress, try again shortly")
+    except Exception as e:
+        await rows.aclose()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    filename = f"{name}-{date.today().isoformat()}.{fmt}"
+    return _TimedStreamingResponse(
+        _resume(first, rows),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
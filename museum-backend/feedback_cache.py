@@ -0,0 +1,140 @@
+"""
+Cache of AI feedback analyses keyed by a hash of the normalized feedback text.
+
+Identical (or trivially different: case, spacing, trailing punctuation) feedback
+gets the same analysis, so repeats are answered from here instead of costing a
+Gemini call. Two tiers:
+
+- memory: per-process LRU of FEEDBACK_CACHE_SIZE entries (always on)
+- persistent: the feedback_analysis_cache table (migrations/0008), shared by all
+  workers and kept across restarts. Enable with FEEDBACK_CACHE_PERSISTENT=true.
+
+Keys also include the caller's prompt/model version, so changing the prompt
+never serves analyses produced by the old one.
+"""
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from psycopg.types.json import Jsonb
+from async_database import get_async_conn
+
+FEEDBACK_CACHE_SIZE = int(os.getenv("FEEDBACK_CACHE_SIZE", "10000"))
+FEEDBACK_CACHE_PERSISTENT = os.getenv("FEEDBACK_CACHE_PERSISTENT", "false").lower() in ("1", "true", "yes")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _WHITESPACE.sub(" ", text).strip().rstrip(".!?,;: ")
+
+
+class FeedbackAnalysisCache:
+    def __init__(self, max_size, persistent=False):
+        self.max_size = max_size
+        self.persistent = persistent
+        self._entries = OrderedDict()  # key -> analysis, least recently used first
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "persistent_hits": 0, "misses": 0, "evictions": 0, "persistent_errors": 0}
+
+    @staticmethod
+    def key(version, text):
+        return hashlib.sha256(f"{version}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Memory tier only. Returns the cached analysis or None."""
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return dict(analysis)
+
+    def set(self, key, analysis):
+        with self._lock:
+            self._entries[key] = dict(analysis)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    async def get_many(self, keys):
+        """Looks keys up in memory, then (if enabled) in the persistent tier. Returns {key: analysis}."""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = dict(self._entries[key])
+                    self._stats["hits"] += 1
+                else:
+                    missing.append(key)
+
+        if missing and self.persistent:
+            try:
+                async with get_async_conn() as conn:
+                    cur = conn.cursor()
+                    await cur.execute(
+                        "SELECT content_hash, analysis FROM feedback_analysis_cache WHERE content_hash = ANY(%s)",
+                        (missing,),
+                    )
+                    rows = await cur.fetchall()
+                    await cur.close()
+            except Exception as e:
+                rows = []
+                self._stats["persistent_errors"] += 1
+                print(f"Feedback cache lookup failed, falling back to the model: {e}")
+            for row in rows:
+                self.set(row["content_hash"], row["analysis"])
+                found[row["content_hash"]] = dict(row["analysis"])
+            self._stats["persistent_hits"] += len(rows)
+
+        with self._lock:
+            self._stats["misses"] += len(set(missing) - set(found))
+        return found
+
+    async def set_many(self, items):
+        """Stores (key, analysis) pairs in memory and, if enabled, in the persistent tier."""
+        items = list(items)
+        for key, analysis in items:
+            self.set(key, analysis)
+        if not items or not self.persistent:
+            return
+        try:
+            async with get_async_conn() as conn:
+                cur = conn.cursor()
+                await cur.executemany(
+                    "INSERT INTO feedback_analysis_cache (content_hash, analysis) VALUES (%s, %s) "
+                    "ON CONFLICT (content_hash) DO NOTHING",
+                    [(key, Jsonb(analysis)) for key, analysis in items],
+                )
+                await conn.commit()
+                await cur.close()
+        except Exception as e:
+            self._stats["persistent_errors"] += 1
+            print(f"Error saving feedback analyses to the persistent cache: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = self._stats["hits"] + self._stats["persistent_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                "max_size": self.max_size,
+                "entries": len(self._entries),
+                "persistent": self.persistent,
+                "hit_ratio": round(hits / lookups, 4) if lookups else None,
+                **self._stats,
+            }
+
+
+feedback_cache = FeedbackAnalysisCache(FEEDBACK_CACHE_SIZE, FEEDBACK_CACHE_PERSISTENT)
@@ -0,0 +1,188 @@
+"""
+Local, rule-based first pass over visitor feedback.
+
+Scores the text against small sentiment and category lexicons (the categories
+of the Gemini prompt: audio, content, staff, general). Feedback that is clearly
+positive, with nothing to act on, is answered here and never reaches the model;
+anything negative, mixed, negated, phrased as a request or a question is
+escalated, because only the model writes actionable_steps.
+
+Pure Python with no network or database access, so it can be run and tested
+offline:
+
+    python feedback_classifier.py feedback.txt   # one feedback per line; prints the offload ratio
+
+Settings (.env):
+- FEEDBACK_LOCAL_CLASSIFIER: set to false to send everything to the model
+- FEEDBACK_LOCAL_MIN_CONFIDENCE: minimum confidence to answer locally (default 0.75)
+"""
+import os
+import re
+import sys
+import threading
+
+FEEDBACK_LOCAL_CLASSIFIER = os.getenv("FEEDBACK_LOCAL_CLASSIFIER", "true").lower() in ("1", "true", "yes")
+FEEDBACK_LOCAL_MIN_CONFIDENCE = float(os.getenv("FEEDBACK_LOCAL_MIN_CONFIDENCE", "0.75"))
+
+POSITIVE_TERMS = [
+    "love", "loved", "lovely", "amazing", "awesome", "great", "excellent", "wonderful",
+    "fantastic", "beautiful", "brilliant", "enjoyed", "enjoyable", "impressive", "fascinating",
+    "informative", "interesting", "friendly", "helpful", "perfect", "stunning", "superb",
+    "incredible", "breathtaking", "well organized", "well organised", "highly recommend",
+    "must see", "favourite", "favorite", "best", "good", "nice", "clean", "thank you", "thanks",
+]
+
+NEGATIVE_TERMS = [
+    "rude", "bad", "terrible", "awful", "horrible", "poor", "worst", "boring", "dirty",
+    "broken", "crowded", "slow", "fast", "expensive", "overpriced", "confusing", "confused",
+    "difficult", "disappointed", "disappointing", "unhelpful", "noisy", "loud", "hate", "hated",
+    "waited", "queue", "lost", "missing", "closed", "not working", "problem", "issue",
+    "complaint", "uncomfortable", "unclear", "hard to hear", "hard to find", "smell", "unsafe",
+]
+
+# Anything that asks for a change (or flips the sentiment) needs the model's judgement
+ESCALATION_TERMS = [
+    "not", "no", "never", "don't", "didn't", "doesn't", "wasn't", "weren't", "isn't", "aren't",
+    "couldn't", "can't", "cannot", "hardly", "but", "however", "although", "though", "except",
+    "should", "could", "would", "please", "need", "needs", "must", "fix", "improve", "wish",
+    "too", "more", "lack", "less", "only",
+]
+
+CATEGORY_TERMS = {
+    "audio": [
+        "audio", "audio guide", "headphone", "headphones", "headset", "volume", "sound",
+        "hear", "listen", "narration", "commentary", "speaker", "recording",
+    ],
+    "staff": [
+        "staff", "tour guide", "our guide", "the guide", "guard", "guards", "employee", "employees",
+        "receptionist", "attendant", "attendants", "security", "docent", "volunteer", "volunteers",
+        "cashier", "manager", "people at",
+    ],
+    "content": [
+        "exhibit", "exhibits", "exhibition", "exhibitions", "gallery", "galleries", "artifact",
+        "artifacts", "artefact", "artefacts", "collection", "collections", "display", "displays",
+        "painting", "paintings", "sculpture", "sculptures", "dinosaur", "dinosaurs", "fossil",
+        "fossils", "vase", "history", "statue", "statues", "installation",
+    ],
+}
+
+# Visit metadata appended by the frontend, e.g. "[Visited Artifacts: Ancient Vase]"
+_METADATA = re.compile(r"\[[^\]]*\]")
+
+
+def _terms_pattern(terms):
+    # Longest first, so "audio guide" wins over "audio" at the same position
+    ordered = sorted(set(terms), key=len, reverse=True)
+    return re.compile(r"(?<![\w'])(" + "|".join(re.escape(t) for t in ordered) + r")(?![\w'])")
+
+
+class Classification:
+    """Result of the local pass. `local` is True when it is confident enough to skip the model."""
+
+    def __init__(self, sentiment, category, confidence, local, reason):
+        self.sentiment = sentiment
+        self.category = category
+        self.confidence = confidence
+        self.local = local
+        self.reason = reason
+
+    def analysis(self):
+        """The same shape the model returns for non-actionable feedback."""
+        return {
+            "sentiment": self.sentiment,
+            "category": self.category,
+            "actionable": False,
+            "priority": None,
+            "actionable_steps": None,
+            "analyzed_by": "local-rules",
+            "confidence": self.confidence,
+        }
+
+
+class FeedbackPreClassifier:
+    def __init__(self, min_confidence=FEEDBACK_LOCAL_MIN_CONFIDENCE, enabled=FEEDBACK_LOCAL_CLASSIFIER):
+        self.min_confidence = min_confidence
+        self.enabled = enabled
+        self._positive = _terms_pattern(POSITIVE_TERMS)
+        self._negative = _terms_pattern(NEGATIVE_TERMS)
+        self._escalation = _terms_pattern(ESCALATION_TERMS)
+        self._categories = {name: _terms_pattern(terms) for name, terms in CATEGORY_TERMS.items()}
+        self._lock = threading.Lock()
+        self._stats = {"seen": 0, "offloaded": 0, "escalated": {}}
+
+    def category(self, text):
+        """Best-matching category, "general" when nothing matches, None when two categories tie."""
+        scores = {name: len(pattern.findall(text)) for name, pattern in self._categories.items()}
+        best = max(scores.values())
+        if best == 0:
+            return "general"
+        winners = [name for name, score in scores.items() if score == best]
+        return winners[0] if len(winners) == 1 else None
+
+    def classify(self, text):
+        text = _METADATA.sub(" ", text or "").casefold()
+        positive = len(self._positive.findall(text))
+        negative = len(self._negative.findall(text))
+        category = self.category(text)
+
+        if negative:
+            return Classification("negative", category, 0.0, False, "negative terms")
+        if self._escalation.search(text):
+            return Classification("mixed", category, 0.0, False, "request, contrast or negation")
+        if "?" in text:
+            return Classification("neutral", category, 0.0, False, "question")
+        if not positive:
+            return Classification("neutral", category, 0.0, False, "no sentiment terms")
+        if category is None:
+            return Classification("positive", category, 0.0, False, "ambiguous category")
+
+        confidence = round(min(0.99, 0.6 + 0.15 * positive), 2)
+        local = confidence >= self.min_confidence
+        return Classification("positive", category, confidence, local, None if local else "low confidence")
+
+    def try_local(self, text):
+        """Returns an analysis dict when the feedback can be handled without the model, else None."""
+        if not self.enabled:
+            return None
+        result = self.classify(text)
+        self._record(result)
+        return result.analysis() if result.local else None
+
+    def _record(self, result):
+        with self._lock:
+            self._stats["seen"] += 1
+            if result.local:
+                self._stats["offloaded"] += 1
+            else:
+                escalated = self._stats["escalated"]
+                escalated[result.reason] = escalated.get(result.reason, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            seen = self._stats["seen"]
+            return {
+                "enabled": self.enabled,
+                "min_confidence": self.min_confidence,
+                "seen": seen,
+                "offloaded": self._stats["offloaded"],
+                "offload_ratio": round(self._stats["offloaded"] / seen, 4) if seen else None,
+                "escalated": dict(self._stats["escalated"]),
+            }
+
+
+feedback_classifier = FeedbackPreClassifier()
+
+
+if __name__ == "__main__":
+    source = open(sys.argv[1], encoding="utf-8") if len(sys.argv) > 1 else sys.stdin
+    with source:
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            result = feedback_classifier.classify(line)
+            feedback_classifier._record(result)
+            decision = "local" if result.local else f"model ({result.reason})"
+            print(f"{decision:<40} {result.sentiment:<9} {result.category or '-':<8} {line[:60]}")
+    stats = feedback_classifier.stats()
+    print(f"Offloaded {stats['offloaded']} of {stats['seen']} feedback(s) (ratio {stats['offload_ratio']})")
@@ -1,108 +1,165 @@
+import asyncio
 import os
 from pydantic import BaseModel, Field
-from datetime import datetime
-import firebase_admin
-from firebase_admin import firestore, credentials, initialize_app
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from typing import Optional
-from analyze_feedback import analyze_feedback
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Optional
+from analyze_feedback import analyze_feedback_batch, get_client, COUNTED_VALUES
+from analytics_cache import analytics_cache, cached, invalidate, FEEDBACK
+import firebase_client
+from feedback_worker import FeedbackAnalysisWorker
+from feedback_store import feedback_store, FirestoreFeedbackStore
+from pagination import NEXT_CURSOR_HEADER, MAX_PAGE_SIZE
+from session_tokens import ADMIN_ONLY
 
 router = APIRouter(tags=["Feedback"])
 
-def get_db():
-    if not firebase_admin._apps:
-        cred_path = "firebase_key.json"
-        
-        # Check if we are running from root or museum-backend
-        if not os.path.exists(cred_path):
-             # Try going into museum-backend if current dir is root
-             if os.path.exists(os.path.join("museum-backend", cred_path)):
-                 cred_path = os.path.join("museum-backend", cred_path)
-             else:
-                 # Fallback/Error if not found
-                 raise HTTPException(status_code=500, detail="Firebase credentials file (firebase_key.json) not found.")
-
-        cred = credentials.Certificate(cred_path)
-        initialize_app(cred)
-        
-    return firestore.client()
+# First pages of /api/feedback/analysis are cached this long (seconds); new analyses drop them early
+FEEDBACK_ANALYSIS_CACHE_TTL = float(os.getenv("FEEDBACK_ANALYSIS_CACHE_TTL", "15"))
+FEEDBACK_PAGE_SIZE = int(os.getenv("FEEDBACK_PAGE_SIZE", "50"))
+FEEDBACK_TRENDS_MAX_DAYS = int(os.getenv("FEEDBACK_TRENDS_MAX_DAYS", "366"))
+MAX_BULK_FEEDBACK = int(os.getenv("MAX_BULK_FEEDBACK", "1000"))
+
+async def warm_up_gemini(timeout=firebase_client.FIREBASE_INIT_TIMEOUT):
+    """Create the Gemini client off the event loop; logs instead of raising."""
+    try:
+        await asyncio.wait_for(asyncio.to_thread(get_client), timeout)
+    except asyncio.TimeoutError:
+        print(f"Gemini client warm-up did not finish within {timeout}s; it will complete on first use.")
+    except Exception as e:
+        print(f"Gemini client warm-up failed, it will retry on first use: {e}")
+
+async def warm_up_feedback_clients():
+    """
+    Started by main.py's lifespan: creates the Gemini client and, when feedback
+    lives in Firestore, the Firestore client, concurrently in the background.
+    """
+    warm_ups = [warm_up_gemini()]
+    if isinstance(feedback_store, FirestoreFeedbackStore):
+        warm_ups.append(firebase_client.warm_up())
+    await asyncio.gather(*warm_ups)
 
 class FeedbackCreate(BaseModel):
     visitor_id: str
     feedback_text: str
     rating: int = Field(..., ge=1, le=5)
 
-def process_feedback_background(doc_id: str, text: str):
-    """
-    Background task to analyze feedback using Gemini and update Firestore.
-    """
-    try:
-        print(f"Starting background analysis for feedback {doc_id}...")
-        analysis = analyze_feedback(text)
-        db = get_db()
-        db.collection("visitor_feedback").document(doc_id).update({
-            "ai_analysis": analysis,
-            "processed": True
-        })
-        print(f"Background analysis completed for {doc_id}: {analysis}")
-    except Exception as e:
-        print(f"Error in background analysis for {doc_id}: {e}")
+async def process_feedback_background(results):
+    """Stores AI analyses for a list of (feedback_id, analysis), together with the daily counters."""
+    await feedback_store.save_analyses(results)
+    invalidate(FEEDBACK)
+    print(f"Stored AI analysis for {len(results)} feedback(s)")
+
+# Analyses run on this worker, not on the request path (started in main.py's lifespan)
+analysis_worker = FeedbackAnalysisWorker(analyze=analyze_feedback_batch, store=process_feedback_background)
+
+def queue_for_analysis(feedback_id, feedback_text):
+    # If the queue is full the feedback stays unprocessed (in either store) for the backfill CLI
+    if not analysis_worker.submit(feedback_id, feedback_text):
+        print(f"Analysis queue full, feedback {feedback_id} left for backfill (python analyze_feedback.py)")
+        return False
+    return True
 
 @router.post("/api/feedback", status_code=201)
-def submit_feedback(feedback: FeedbackCreate, background_tasks: BackgroundTasks):
+async def submit_feedback(feedback: FeedbackCreate):
     try:
-        db = get_db()
-        # Add a new document with auto-generated ID
-        new_feedback = {
-            "visitor_id": feedback.visitor_id,
-            "feedback_text": feedback.feedback_text,
-            "rating": feedback.rating,
-            "timestamp": datetime.utcnow(),
-            "processed": False  # Flag for AI analysis script
-        }
-        update_time, doc_ref = db.collection("visitor_feedback").add(new_feedback)
-        
-        # Trigger background analysis immediately
-        background_tasks.add_task(process_feedback_background, doc_ref.id, feedback.feedback_text)
-        
+        feedback_id = await feedback_store.add(feedback.model_dump())
+        queue_for_analysis(feedback_id, feedback.feedback_text)
         return {"message": "Feedback submitted successfully"}
     except Exception as e:
         print(f"Error submitting feedback: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/api/feedback/bulk", status_code=201, dependencies=ADMIN_ONLY)
+async def submit_feedback_bulk(feedbacks: List[FeedbackCreate]):
+    """Stores many submissions in one write (e.g. imported survey results) and queues them for analysis."""
+    if not feedbacks:
+        raise HTTPException(status_code=400, detail="No feedback given")
+    if len(feedbacks) > MAX_BULK_FEEDBACK:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_FEEDBACK} feedbacks per request")
+    try:
+        added = await feedback_store.add_many([feedback.model_dump() for feedback in feedbacks])
+    except Exception as e:
+        print(f"Error submitting feedback: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    queued = sum(queue_for_analysis(feedback_id, text) for feedback_id, text in added)
+    return {"message": f"{len(added)} feedback(s) submitted successfully", "queued": queued}
+
 @router.get("/api/feedback/analysis")
-def get_feedback_analysis():
+async def get_feedback_analysis(
+    response: Response,
+    actionable: bool = True,
+    priority: Optional[str] = Query(None, pattern="^(high|medium|low)$"),
+    category: Optional[str] = None,
+    limit: int = Query(FEEDBACK_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
     """
-    Fetches actionable feedback insights from Firestore.
+    Fetches analyzed feedback insights from the feedback store, actionable items by default,
+    highest priority first. Paginated: pass the X-Next-Cursor header back as ?cursor=.
     """
+    # Only first pages are cached: that is what the admin page loads, and it keeps the key space small
+    cache_key = f"feedback_analysis:{actionable}:{priority}:{category}:{limit}"
     try:
-        db = get_db()
-        docs = db.collection("visitor_feedback").stream()
-        actionable_feedbacks = []
-        
-        for doc in docs:
-            data = doc.to_dict()
-            ai_analysis = data.get("ai_analysis")
-            
-            if ai_analysis and isinstance(ai_analysis, dict):
-                 # We focus on actionable items as requested
-                 if ai_analysis.get("actionable"):
-                     item = {
-                         "id": doc.id,
-                         "text": data.get("feedback_text", ""),
-                         "sentiment": ai_analysis.get("sentiment", "neutral"),
-                         "category": ai_analysis.get("category", "general"),
-                         "priority": (ai_analysis.get("priority") or "low").lower(),
-                         "steps": ai_analysis.get("actionable_steps", [])
-                     }
-                     actionable_feedbacks.append(item)
-        
-        # Sort by priority: High > Medium > Low
-        priority_map = {"high": 3, "medium": 2, "low": 1}
-        actionable_feedbacks.sort(key=lambda x: priority_map.get(x["priority"], 0), reverse=True)
-        
-        return actionable_feedbacks
-        
+        if not cursor:
+            hit, page = analytics_cache.get(cache_key)
+            if not hit:
+                page = await feedback_store.page_analyses(actionable, priority, category, limit, cursor)
+                analytics_cache.set(cache_key, page, tags=(FEEDBACK,), ttl=FEEDBACK_ANALYSIS_CACHE_TTL)
+        else:
+            page = await feedback_store.page_analyses(actionable, priority, category, limit, cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching feedback: {e}")
         return []
+
+    items, next_cursor = page
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+
+def empty_day(day):
+    return {
+        "date": day.isoformat(),
+        "total": 0,
+        "actionable": 0,
+        **{dimension: {value: 0 for value in values} for dimension, values in COUNTED_VALUES.items()},
+    }
+
+async def read_daily_stats(start_date, end_date):
+    stats = await feedback_store.daily_stats(start_date, end_date)
+
+    days = []
+    day = start_date
+    while day <= end_date:
+        row = empty_day(day)
+        stored = stats.get(day.isoformat(), {})
+        row["total"] = stored.get("total", 0)
+        row["actionable"] = stored.get("actionable", 0)
+        for dimension in COUNTED_VALUES:
+            row[dimension].update(stored.get(dimension, {}))
+        days.append(row)
+        day += timedelta(days=1)
+    return days
+
+@router.get("/api/feedback/trends")
+@cached("feedback_trends", tags=(FEEDBACK,))
+async def get_feedback_trends(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    Daily feedback counts by sentiment, category and priority (default: the last 30 days).
+    Reads pre-aggregated per-day counters, so cost depends on the range, not on
+    how much feedback exists. Days without feedback are returned with zero counts.
+    """
+    end_date = end_date or datetime.utcnow().date()
+    start_date = start_date or end_date - timedelta(days=29)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if (end_date - start_date).days >= FEEDBACK_TRENDS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {FEEDBACK_TRENDS_MAX_DAYS} days")
+    try:
+        return await read_daily_stats(start_date, end_date)
+    except Exception as e:
+        print(f"Error fetching feedback trends: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,360 @@
+"""
+Storage backends for visitor feedback and its AI analyses.
+
+feedback_routes talks to `feedback_store` only, so feedback can live either in
+Firestore (the original `visitor_feedback` collection) or in Postgres next to
+the rest of the data (migrations/0009_visitor_feedback.sql), where writes and
+analysis reads are local queries instead of remote gRPC round trips.
+
+Settings (.env):
+- FEEDBACK_STORE: "firestore" (default) or "postgres"
+
+Every backend implements the abstract async methods of FeedbackStore. Feedback
+ids are strings (Firestore document ids, or the Postgres feedback_id as text).
+Feedback the analysis worker could not take (full queue, failed analysis) stays
+unprocessed in either backend until the analyze_feedback.py backfill picks it up.
+"""
+import base64
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from psycopg.types.json import Jsonb
+from async_database import get_async_conn
+from analyze_feedback import (
+    save_analyses, counted_value,
+    PRIORITY_RANKS, COUNTED_VALUES, DAILY_STATS_COLLECTION,
+)
+from firebase_client import get_db
+from pagination import Keyset, encode_cursor, decode_cursor
+
+FEEDBACK_STORE = os.getenv("FEEDBACK_STORE", "firestore").lower()
+
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def feedback_item(feedback_id, text, ai_analysis):
+    """One entry of the /api/feedback/analysis response."""
+    ai_analysis = ai_analysis or {}
+    return {
+        "id": feedback_id,
+        "text": text or "",
+        "sentiment": ai_analysis.get("sentiment", "neutral"),
+        "category": ai_analysis.get("category", "general"),
+        "priority": (ai_analysis.get("priority") or "low").lower(),
+        "steps": ai_analysis.get("actionable_steps", [])
+    }
+
+
+class FeedbackStore(ABC):
+    # Identifies the backend (and its source) in backfill checkpoints
+    name = None
+
+    @abstractmethod
+    async def add(self, feedback):
+        """Store one submission ({visitor_id, feedback_text, rating}). Returns its id."""
+
+    @abstractmethod
+    async def add_many(self, feedbacks):
+        """Store many submissions at once. Returns [(id, feedback_text)]."""
+
+    @abstractmethod
+    async def unprocessed(self, after, limit):
+        """The next `limit` not yet analyzed submissions after id `after` (None: from the start), in id order. Returns [(id, feedback_text)]."""
+
+    @abstractmethod
+    async def save_analyses(self, results):
+        """Store [(id, analysis)] and bump the daily counters, atomically. Already processed ids are skipped."""
+
+    @abstractmethod
+    async def page_analyses(self, actionable, priority, category, limit, cursor):
+        """One page of analyzed feedback, highest priority then newest first. Returns (items, next_cursor)."""
+
+    @abstractmethod
+    async def daily_stats(self, start_date, end_date):
+        """{"YYYY-MM-DD": {"total", "actionable", "sentiment": {...}, "category": {...}, "priority": {...}}}"""
+
+
+class FirestoreFeedbackStore(FeedbackStore):
+    def __init__(self, collection="visitor_feedback"):
+        self.collection = collection
+        self.name = f"firestore:{collection}"
+
+    @staticmethod
+    def new_document(feedback):
+        return {
+            "visitor_id": feedback["visitor_id"],
+            "feedback_text": feedback["feedback_text"],
+            "rating": feedback["rating"],
+            "timestamp": datetime.utcnow(),
+            "processed": False  # Flag for AI analysis script
+        }
+
+    async def add(self, feedback):
+        db = await run_in_threadpool(get_db)
+        update_time, doc_ref = await run_in_threadpool(db.collection(self.collection).add, self.new_document(feedback))
+        return doc_ref.id
+
+    def _add_many(self, feedbacks):
+        db = get_db()
+        added = []
+        for start in range(0, len(feedbacks), FIRESTORE_BATCH_LIMIT):
+            batch = db.batch()
+            for feedback in feedbacks[start:start + FIRESTORE_BATCH_LIMIT]:
+                doc_ref = db.collection(self.collection).document()
+                batch.set(doc_ref, self.new_document(feedback))
+                added.append((doc_ref.id, feedback["feedback_text"]))
+            batch.commit()
+        return added
+
+    async def add_many(self, feedbacks):
+        return await run_in_threadpool(self._add_many, list(feedbacks))
+
+    def _unprocessed(self, after, limit):
+        from google.cloud.firestore_v1 import FieldFilter
+        from google.cloud.firestore_v1.field_path import FieldPath
+
+        query = get_db().collection(self.collection) \
+            .where(filter=FieldFilter("processed", "==", False)) \
+            .order_by(FieldPath.document_id())
+        if after:
+            query = query.start_after([after])
+        return [(doc.id, doc.to_dict().get("feedback_text")) for doc in query.limit(limit).stream()]
+
+    async def unprocessed(self, after, limit):
+        return await run_in_threadpool(self._unprocessed, after, limit)
+
+    async def save_analyses(self, results):
+        # Counted under each feedback's submission day, like the backfill does
+        await run_in_threadpool(save_analyses, self.collection, list(results))
+
+    @staticmethod
+    def encode_cursor(data, doc_id):
+        values = [data.get("priority_rank", 0), data["timestamp"].isoformat(), doc_id]
+        return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            rank, timestamp, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return rank, datetime.fromisoformat(timestamp), doc_id
+        except (ValueError, TypeError, UnicodeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    def _page_analyses(self, actionable, priority, category, limit, cursor):
+        # Filtered and ordered by Firestore itself; needs the composite indexes in firestore.indexes.json
+        from google.cloud.firestore import Query as FirestoreQuery
+        from google.cloud.firestore_v1 import FieldFilter
+        from google.cloud.firestore_v1.field_path import FieldPath
+
+        db = get_db()
+        query = db.collection(self.collection).where(filter=FieldFilter("actionable", "==", actionable))
+        if priority:
+            query = query.where(filter=FieldFilter("priority_rank", "==", PRIORITY_RANKS[priority]))
+        if category:
+            query = query.where(filter=FieldFilter("category", "==", category))
+        query = query.order_by("priority_rank", direction=FirestoreQuery.DESCENDING) \
+                     .order_by("timestamp", direction=FirestoreQuery.DESCENDING) \
+                     .order_by(FieldPath.document_id(), direction=FirestoreQuery.DESCENDING)
+        if cursor:
+            query = query.start_after(list(self.decode_cursor(cursor)))
+
+        items = []
+        next_cursor = None
+        for doc in query.limit(limit).stream():
+            data = doc.to_dict()
+            items.append(feedback_item(doc.id, data.get("feedback_text"), data.get("ai_analysis")))
+            next_cursor = self.encode_cursor(data, doc.id)
+        return items, next_cursor if len(items) == limit else None
+
+    async def page_analyses(self, actionable, priority, category, limit, cursor):
+        return await run_in_threadpool(self._page_analyses, actionable, priority, category, limit, cursor)
+
+    def _daily_stats(self, start_date, end_date):
+        from google.cloud.firestore_v1 import FieldFilter
+
+        docs = get_db().collection(DAILY_STATS_COLLECTION) \
+            .where(filter=FieldFilter("date", ">=", start_date.isoformat())) \
+            .where(filter=FieldFilter("date", "<=", end_date.isoformat())) \
+            .order_by("date") \
+            .stream()
+        return {doc.id: doc.to_dict() for doc in docs}
+
+    async def daily_stats(self, start_date, end_date):
+        return await run_in_threadpool(self._daily_stats, start_date, end_date)
+
+
+class PostgresFeedbackStore(FeedbackStore):
+    name = "postgres:visitor_feedback"
+    keyset = Keyset("priority_rank", "submitted_at", "feedback_id", descending=True)
+
+    async def add(self, feedback):
+        async with get_async_conn() as conn:
+            cur = conn.cursor()
+            try:
+                await cur.execute("""
+                    INSERT INTO visitor_feedback (visitor_id, feedback_text, rating)
+                    VALUES (%s, %s, %s)
+                    RETURNING feedback_id
+                """, (feedback["visitor_id"], feedback["feedback_text"], feedback["rating"]))
+                feedback_id = (await cur.fetchone())["feedback_id"]
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            finally:
+                await cur.close()
+        return str(feedback_id)
+
+    async def add_many(self, feedbacks):
+        feedbacks = list(feedbacks)
+        async with get_async_conn() as conn:
+            cur = conn.cursor()
+            try:
+                # One round trip for the whole batch
+                await cur.execute("""
+                    INSERT INTO visitor_feedback (visitor_id, feedback_text, rating)
+                    SELECT * FROM unnest(%s::varchar[], %s::text[], %s::smallint[])
+                    RETURNING feedback_id, feedback_text
+                """, (
+                    [f["visitor_id"] for f in feedbacks],
+                    [f["feedback_text"] for f in feedbacks],
+                    [f["rating"] for f in feedbacks],
+                ))
+                rows = await cur.fetchall()
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            finally:
+                await cur.close()
+        return [(str(row["feedback_id"]), row["feedback_text"]) for row in rows]
+
+    async def unprocessed(self, after, limit):
+        async with get_async_conn() as conn:
+            cur = conn.cursor()
+            try:
+                # Served by idx_visitor_feedback_unprocessed
+                await cur.execute("""
+                    SELECT feedback_id, feedback_text
+                    FROM visitor_feedback
+                    WHERE NOT processed AND feedback_id > %s
+                    ORDER BY feedback_id
+                    LIMIT %s
+                """, (int(after) if after else 0, limit))
+                rows = await cur.fetchall()
+            finally:
+                await cur.close()
+        return [(str(row["feedback_id"]), row["feedback_text"]) for row in rows]
+
+    async def save_analyses(self, results):
+        results = list(results)
+        async with get_async_conn() as conn:
+            cur = conn.cursor()
+            try:
+                # NOT processed: an analysis stored twice is only counted once
+                await cur.execute("""
+                    UPDATE visitor_feedback f
+                    SET ai_analysis = u.analysis, processed = TRUE, analyzed_at = CURRENT_TIMESTAMP
+                    FROM unnest(%s::bigint[], %s::jsonb[]) AS u(feedback_id, analysis)
+                    WHERE f.feedback_id = u.feedback_id AND NOT f.processed
+                    RETURNING (f.submitted_at AT TIME ZONE 'UTC')::date AS day, f.ai_analysis
+                """, ([int(feedback_id) for feedback_id, _ in results], [Jsonb(a) for _, a in results]))
+                updated = await cur.fetchall()
+
+                counts = {}
+                for row in updated:
+                    analysis = row["ai_analysis"]
+                    bucket = (
+                        row["day"],
+                        counted_value(analysis, "sentiment"),
+                        counted_value(analysis, "category"),
+                        counted_value(analysis, "priority"),
+                        bool(analysis.get("actionable")),
+                    )
+                    counts[bucket] = counts.get(bucket, 0) + 1
+                if counts:
+                    await cur.executemany("""
+                        INSERT INTO feedback_daily_counts (day, sentiment, category, priority, actionable, feedback_count)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (day, sentiment, category, priority, actionable)
+                        DO UPDATE SET feedback_count = feedback_daily_counts.feedback_count + EXCLUDED.feedback_count
+                    """, [(*bucket, n) for bucket, n in counts.items()])
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            finally:
+                await cur.close()
+
+    async def page_analyses(self, actionable, priority, category, limit, cursor):
+        # Expressions match idx_visitor_feedback_actionable_priority / idx_visitor_feedback_analysis
+        conditions = ["processed", "(ai_analysis->'actionable' = 'true'::jsonb) = %s"]
+        params = [actionable]
+        if priority:
+            conditions.append("feedback_priority_rank(ai_analysis) = %s")
+            params.append(PRIORITY_RANKS[priority])
+        if category:
+            conditions.append("ai_analysis @> %s")
+            params.append(Jsonb({"category": category}))
+        if cursor:
+            conditions.append("(feedback_priority_rank(ai_analysis), submitted_at, feedback_id) < (%s, %s, %s)")
+            params.extend(decode_cursor(cursor, self.keyset))
+        params.append(limit)
+
+        async with get_async_conn() as conn:
+            cur = conn.cursor()
+            try:
+                await cur.execute(f"""
+                    SELECT feedback_id, feedback_text, ai_analysis,
+                           feedback_priority_rank(ai_analysis) AS priority_rank, submitted_at
+                    FROM visitor_feedback
+                    WHERE {" AND ".join(conditions)}
+                    ORDER BY feedback_priority_rank(ai_analysis) DESC, submitted_at DESC, feedback_id DESC
+                    LIMIT %s
+                """, tuple(params))
+                rows = await cur.fetchall()
+            finally:
+                await cur.close()
+
+        items = [feedback_item(str(row["feedback_id"]), row["feedback_text"], row["ai_analysis"]) for row in rows]
+        next_cursor = encode_cursor(rows[-1], self.keyset) if rows and len(rows) == limit else None
+        return items, next_cursor
+
+    async def daily_stats(self, start_date, end_date):
+        async with get_async_conn() as conn:
+            cur = conn.cursor()
+            try:
+                await cur.execute("""
+                    SELECT day, sentiment, category, priority, actionable, feedback_count
+                    FROM feedback_daily_counts
+                    WHERE day BETWEEN %s AND %s
+                """, (start_date, end_date))
+                rows = await cur.fetchall()
+            finally:
+                await cur.close()
+
+        stats = {}
+        for row in rows:
+            day = stats.setdefault(row["day"].isoformat(), {"total": 0, "actionable": 0})
+            n = row["feedback_count"]
+            day["total"] += n
+            if row["actionable"]:
+                day["actionable"] += n
+            for dimension in COUNTED_VALUES:
+                counts = day.setdefault(dimension, {})
+                counts[row[dimension]] = counts.get(row[dimension], 0) + n
+        return stats
+
+
+def create_feedback_store(kind=FEEDBACK_STORE):
+    if kind == "postgres":
+        return PostgresFeedbackStore()
+    if kind == "firestore":
+        return FirestoreFeedbackStore()
+    raise ValueError(f"Unknown FEEDBACK_STORE {kind!r}; expected 'firestore' or 'postgres'")
+
+
+feedback_store = create_feedback_store()
@@ -0,0 +1,186 @@
+"""
+Background worker for AI feedback analysis.
+
+POST /api/feedback only enqueues the new document; the model call happens here,
+off the request path. Queued feedback is micro-batched (up to FEEDBACK_BATCH_SIZE
+texts, waiting at most FEEDBACK_BATCH_WAIT_MS for a batch to fill) so one model
+request covers several submissions. Failed calls are retried with exponential
+backoff. A batch whose response cannot be parsed is split and retried item by item;
+feedback that still fails stays unprocessed for the backfill CLI.
+
+The queue is bounded. When it is full, new feedback is stored but not queued and
+stays unprocessed for the backfill CLI (analyze_feedback.py) to pick up,
+so a traffic spike can never pile up unbounded work in the web process.
+
+Settings (.env):
+- FEEDBACK_QUEUE_MAX: max feedback waiting for analysis (default 1000)
+- FEEDBACK_BATCH_SIZE: max texts per model call (default 8)
+- FEEDBACK_BATCH_WAIT_MS: how long to wait for a batch to fill (default 250)
+- FEEDBACK_CONCURRENCY: model calls in flight at once (default 2)
+- FEEDBACK_MAX_RETRIES / FEEDBACK_RETRY_BASE_SECONDS: retry policy (default 4 / 1.0)
+- FEEDBACK_DRAIN_SECONDS: how long shutdown waits for the queue to drain (default 10)
+"""
+import asyncio
+import os
+import random
+import time
+
+FEEDBACK_QUEUE_MAX = int(os.getenv("FEEDBACK_QUEUE_MAX", "1000"))
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "8"))
+FEEDBACK_BATCH_WAIT_MS = float(os.getenv("FEEDBACK_BATCH_WAIT_MS", "250"))
+FEEDBACK_CONCURRENCY = int(os.getenv("FEEDBACK_CONCURRENCY", "2"))
+FEEDBACK_MAX_RETRIES = int(os.getenv("FEEDBACK_MAX_RETRIES", "4"))
+FEEDBACK_RETRY_BASE_SECONDS = float(os.getenv("FEEDBACK_RETRY_BASE_SECONDS", "1.0"))
+FEEDBACK_RETRY_MAX_SECONDS = 30.0
+FEEDBACK_DRAIN_SECONDS = float(os.getenv("FEEDBACK_DRAIN_SECONDS", "10"))
+
+
+class FeedbackAnalysisWorker:
+    """
+    `analyze(texts)` is an async callable returning one analysis per text;
+    `store(results)` is an async callable persisting a list of (doc_id, analysis).
+    """
+
+    def __init__(self, analyze, store, batch_size=FEEDBACK_BATCH_SIZE, batch_wait_ms=FEEDBACK_BATCH_WAIT_MS,
+                 max_queue=FEEDBACK_QUEUE_MAX, concurrency=FEEDBACK_CONCURRENCY,
+                 max_retries=FEEDBACK_MAX_RETRIES, retry_base=FEEDBACK_RETRY_BASE_SECONDS):
+        self.analyze = analyze
+        self.store = store
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self.max_queue = max_queue
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        # Created in start() so the queue belongs to the server's event loop
+        self._queue = None
+        self._tasks = []
+        self._metrics = {
+            "enqueued": 0,
+            "dropped": 0,
+            "batches": 0,
+            "analyzed": 0,
+            "failed": 0,
+            "retries": 0,
+            "model_calls": 0,
+            "max_queue_depth": 0,
+            "model_seconds": 0.0,
+            "latency_seconds": 0.0,
+        }
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self, timeout=FEEDBACK_DRAIN_SECONDS):
+        """Give queued feedback up to `timeout` seconds to finish, then cancel the workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Feedback worker stopping with {self._queue.qsize()} feedback(s) unanalyzed; "
+                  "run analyze_feedback.py to backfill them.")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, doc_id, text):
+        """Queue one feedback for analysis. Returns False if it was not queued (worker stopped or queue full)."""
+        if self._queue is None:
+            self._metrics["dropped"] += 1
+            return False
+        try:
+            self._queue.put_nowait((doc_id, text, time.monotonic()))
+        except asyncio.QueueFull:
+            self._metrics["dropped"] += 1
+            return False
+        self._metrics["enqueued"] += 1
+        self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._queue.qsize())
+        return True
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._process(batch)
+            except Exception as e:
+                print(f"Error in feedback analysis worker: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _analyze_with_retry(self, texts):
+        attempt = 0
+        while True:
+            try:
+                return await self.analyze(texts)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                # Full jitter keeps concurrent workers from retrying in lockstep after a 429
+                delay = random.uniform(0, min(FEEDBACK_RETRY_MAX_SECONDS, self.retry_base * 2 ** attempt))
+                print(f"Feedback analysis failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                self._metrics["retries"] += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _process(self, batch):
+        started = time.monotonic()
+        try:
+            analyses = await self._analyze_with_retry([text for _, text, _ in batch])
+        except Exception as e:
+            analyses = None
+            error = e
+        # Includes retries and backoff, i.e. the time the batch really spent waiting on the model
+        self._metrics["model_calls"] += 1
+        self._metrics["model_seconds"] += time.monotonic() - started
+
+        if analyses is None:
+            if len(batch) > 1 and isinstance(error, ValueError):
+                # One odd entry can spoil a whole batch response: fall back to one call per item
+                for item in batch:
+                    await self._process([item])
+            else:
+                self._metrics["failed"] += len(batch)
+                print(f"Giving up on analysis of feedback {[doc_id for doc_id, _, _ in batch]}: {error}")
+            return
+
+        await self.store([(doc_id, analysis) for (doc_id, _, _), analysis in zip(batch, analyses)])
+
+        finished = time.monotonic()
+        self._metrics["batches"] += 1
+        self._metrics["analyzed"] += len(batch)
+        self._metrics["latency_seconds"] += sum(finished - enqueued for _, _, enqueued in batch)
+
+    def stats(self):
+        m = self._metrics
+        analyzed = m["analyzed"]
+        return {
+            "running": bool(self._tasks),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "avg_batch_size": round(analyzed / m["batches"], 2) if m["batches"] else None,
+            "avg_model_call_ms": round(m["model_seconds"] / m["model_calls"] * 1000, 2) if m["model_calls"] else None,
+            "avg_latency_ms": round(m["latency_seconds"] / analyzed * 1000, 2) if analyzed else None,
+            **{k: v for k, v in m.items() if not k.endswith("_seconds")},
+        }
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field, validator
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Response
+from pydantic import BaseModel, Field, ValidationError, validator
 from datetime import date, datetime, time
-from typing import Optional
-from database import get_conn
-import random
+from typing import Any, List, Optional
+from async_database import get_async_conn
+from analytics_cache import invalidate, FINANCE
+from rollups import apply_revenue_delta
+from id_allocator import next_id, reserve_ids
+from export import export_response
+from pagination import Keyset, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_page_query, select_columns, set_page_headers
+import os
+from session_tokens import ADMIN_ONLY
 
 router = APIRouter(tags=["Finance"])
 
+# Upper bound on rows accepted by one POST /api/finance/bulk call
+MAX_BULK_TRANSACTIONS = int(os.getenv("MAX_BULK_TRANSACTIONS", "10000"))
+
 # --- Pydantic Schema ---
 class FinanceCreate(BaseModel):
     visitor_id: int = Field(..., description="ID of the visitor")
@@ -39,131 +49,268 @@ class FinanceCreate(BaseModel):
              raise ValueError("Counter ID must start with 'C'")
         return v
 
+# --- Pagination ---
+FINANCE_COLUMNS = {
+    "transaction_id", "visitor_id", "ticket_type", "amount", "payment_method",
+    "discount_applied", "counter_id", "transaction_date", "transaction_time",
+}
+FINANCE_KEYSET = Keyset("transaction_date", "transaction_time", "transaction_id", descending=True)
+
+def finance_filters(start_date, end_date, payment_method):
+    """WHERE conditions shared by the finance listing and its export."""
+    conditions = []
+    params = []
+
+    if start_date:
+        conditions.append("transaction_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("transaction_date <= %s")
+        params.append(end_date)
+    if payment_method:
+        conditions.append("payment_method = %s")
+        params.append(payment_method)
+    return conditions, params
+
 # --- Routes ---
-@router.post("/api/finance", status_code=201)
-def create_transaction(finance: FinanceCreate):
-    conn = get_conn()
-    cur = conn.cursor()
+@router.post("/api/finance", status_code=201, dependencies=ADMIN_ONLY)
+async def create_transaction(finance: FinanceCreate):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
     
-    transaction_id = random.randint(1000, 9999)
-    current_date = date.today()
-    current_time = datetime.now().time()
+        current_date = date.today()
+        current_time = datetime.now().time()
 
-    try:
-        # Check if visitor exists (Foreign Key constraint usually handles this, but good to check)
-        cur.execute("SELECT visitor_id FROM visitor WHERE visitor_id = %s", (finance.visitor_id,))
-        if not cur.fetchone():
-             raise HTTPException(status_code=400, detail=f"Visitor ID {finance.visitor_id} does not exist.")
-
-        cur.execute("""
-            INSERT INTO revenue_finance (
-                transaction_id, visitor_id, ticket_type, amount, payment_method, 
-                discount_applied, counter_id, transaction_date, transaction_time
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s
-            ) RETURNING transaction_id;
-        """, (
-            transaction_id,
-            finance.visitor_id,
-            finance.ticket_type,
-            finance.amount,
-            finance.payment_method,
-            finance.discount_applied,
-            finance.counter_id,
-            current_date,
-            current_time
-        ))
+        try:
+            # Check if visitor exists (Foreign Key constraint usually handles this, but good to check)
+            await cur.execute("SELECT visitor_id FROM visitor WHERE visitor_id = %s", (finance.visitor_id,))
+            if not await cur.fetchone():
+                 raise HTTPException(status_code=400, detail=f"Visitor ID {finance.visitor_id} does not exist.")
+
+            transaction_id = await next_id(cur, "transaction")
+            await cur.execute("""
+                INSERT INTO revenue_finance (
+                    transaction_id, visitor_id, ticket_type, amount, payment_method, 
+                    discount_applied, counter_id, transaction_date, transaction_time
+                ) VALUES (
+                    %s, %s, %s, %s, %s, %s, %s, %s, %s
+                ) RETURNING transaction_id;
+            """, (
+                transaction_id,
+                finance.visitor_id,
+                finance.ticket_type,
+                finance.amount,
+                finance.payment_method,
+                finance.discount_applied,
+                finance.counter_id,
+                current_date,
+                current_time
+            ))
         
-        new_id = cur.fetchone()['transaction_id']
-        conn.commit()
-        return {"message": "Transaction recorded successfully", "transaction_id": new_id}
+            new_id = (await cur.fetchone())['transaction_id']
+            await apply_revenue_delta(cur, current_date, finance.ticket_type, finance.payment_method, finance.amount, 1)
+            await conn.commit()
+            invalidate(FINANCE)
+            return {"message": "Transaction recorded successfully", "transaction_id": new_id}
         
-    except Exception as e:
-        conn.rollback()
-        if "foreign key constraint" in str(e).lower():
-             raise HTTPException(status_code=400, detail="Invalid Visitor ID.")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-
-@router.get("/api/finance", status_code=200)
-def get_finance(
+        except Exception as e:
+            await conn.rollback()
+            if "foreign key constraint" in str(e).lower():
+                 raise HTTPException(status_code=400, detail="Invalid Visitor ID.")
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
+
+def validate_bulk_records(records):
+    """Splits raw bulk records into ([(index, FinanceCreate)], [error]). CPU-bound; runs off the event loop."""
+    errors = []
+    valid = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append({"index": index, "error": "Record must be a JSON object"})
+            continue
+        try:
+            valid.append((index, FinanceCreate(**record)))
+        except ValidationError as e:
+            errors.append({"index": index, "error": "; ".join(err["msg"] for err in e.errors())})
+    return valid, errors
+
+@router.post("/api/finance/bulk", status_code=201, dependencies=ADMIN_ONLY)
+async def create_transactions_bulk(records: List[Any]):
+    """
+    Batch ingestion for counter end-of-day sync.
+
+    Each record has the FinanceCreate shape. Records are validated individually; invalid
+    ones (not an object, bad fields or unknown visitor_id) are reported in `errors` by
+    their index and skipped, the rest are written with a single COPY in one transaction.
+    """
+    if len(records) > MAX_BULK_TRANSACTIONS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_TRANSACTIONS} records per request")
+
+    valid, errors = await asyncio.to_thread(validate_bulk_records, records)
+
+    if not valid:
+        return {"message": "No transactions recorded", "inserted": 0, "transaction_ids": [], "errors": errors}
+
+    current_date = date.today()
+    current_time = datetime.now().time()
+
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            # One set-based lookup for every referenced visitor
+            visitor_ids = list({finance.visitor_id for _, finance in valid})
+            await cur.execute("SELECT visitor_id FROM visitor WHERE visitor_id = ANY(%s)", (visitor_ids,))
+            known = {row['visitor_id'] for row in await cur.fetchall()}
+
+            to_insert = []
+            for index, finance in valid:
+                if finance.visitor_id in known:
+                    to_insert.append(finance)
+                else:
+                    errors.append({"index": index, "error": f"Visitor ID {finance.visitor_id} does not exist."})
+
+            if not to_insert:
+                errors.sort(key=lambda err: err["index"])
+                return {"message": "No transactions recorded", "inserted": 0, "transaction_ids": [], "errors": errors}
+
+            transaction_ids = await reserve_ids(cur, "transaction", len(to_insert))
+
+            async with cur.copy("""
+                COPY revenue_finance (
+                    transaction_id, visitor_id, ticket_type, amount, payment_method,
+                    discount_applied, counter_id, transaction_date, transaction_time
+                ) FROM STDIN
+            """) as copy:
+                for transaction_id, finance in zip(transaction_ids, to_insert):
+                    await copy.write_row((
+                        transaction_id, finance.visitor_id, finance.ticket_type, finance.amount,
+                        finance.payment_method, finance.discount_applied, finance.counter_id,
+                        current_date, current_time
+                    ))
+
+            # Fold the batch into the revenue rollup, one upsert per bucket
+            buckets = {}
+            for finance in to_insert:
+                key = (finance.ticket_type, finance.payment_method)
+                amount, count = buckets.get(key, (0, 0))
+                buckets[key] = (amount + finance.amount, count + 1)
+            for (ticket_type, payment_method), (amount, count) in buckets.items():
+                await apply_revenue_delta(cur, current_date, ticket_type, payment_method, amount, count)
+
+            await conn.commit()
+            invalidate(FINANCE)
+            errors.sort(key=lambda err: err["index"])
+            return {
+                "message": "Transactions recorded successfully",
+                "inserted": len(transaction_ids),
+                "transaction_ids": transaction_ids,
+                "errors": errors
+            }
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
+
+@router.get("/api/finance", status_code=200, dependencies=ADMIN_ONLY)
+async def get_finance(
+    response: Response,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    payment_method: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
+):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            conditions, params = finance_filters(start_date, end_date, payment_method)
+            page = build_page_query(
+                "revenue_finance", conditions, params, FINANCE_KEYSET,
+                select_columns(fields, FINANCE_COLUMNS, FINANCE_KEYSET), limit, cursor
+            )
+            await cur.execute(page.query, page.params)
+            rows = await cur.fetchall()
+            await set_page_headers(response, cur, page, rows, include_total)
+            return rows
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
+
+@router.get("/api/finance/export", status_code=200, dependencies=ADMIN_ONLY)
+async def export_finance(
+    format: str = "ndjson",
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     payment_method: Optional[str] = None
 ):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        query = "SELECT * FROM revenue_finance"
-        conditions = []
-        params = []
-        
-        if start_date:
-            conditions.append("transaction_date >= %s")
-            params.append(start_date)
-        if end_date:
-            conditions.append("transaction_date <= %s")
-            params.append(end_date)
-        if payment_method:
-            conditions.append("payment_method = %s")
-            params.append(payment_method)
-                
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        query += " ORDER BY transaction_date DESC, transaction_time DESC"
-            
-        cur.execute(query, tuple(params))
-        rows = cur.fetchall()
-        return rows
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-
-@router.put("/api/finance/{transaction_id}", status_code=200)
-def update_transaction(transaction_id: int, finance: FinanceCreate):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT transaction_id FROM revenue_finance WHERE transaction_id = %s", (transaction_id,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Transaction not found")
-
-        cur.execute("""
-            UPDATE revenue_finance 
-            SET ticket_type=%s, amount=%s, payment_method=%s, 
-                discount_applied=%s, counter_id=%s
-            WHERE transaction_id=%s
-        """, (
-            finance.ticket_type, finance.amount, finance.payment_method, 
-            finance.discount_applied, finance.counter_id, transaction_id
-        ))
-        conn.commit()
-        return {"message": "Transaction updated successfully"}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-
-@router.delete("/api/finance/{transaction_id}", status_code=200)
-def delete_transaction(transaction_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("DELETE FROM revenue_finance WHERE transaction_id = %s RETURNING transaction_id", (transaction_id,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Transaction not found")
-        conn.commit()
-        return {"message": "Transaction deleted successfully"}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+    """Streams every matching transaction as NDJSON or CSV (same filters as GET /api/finance)."""
+    conditions, params = finance_filters(start_date, end_date, payment_method)
+    query = "SELECT * FROM revenue_finance"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {FINANCE_KEYSET.order_by()}"
+    return await export_response("finance", query, tuple(params), format)
+
+@router.put("/api/finance/{transaction_id}", status_code=200, dependencies=ADMIN_ONLY)
+async def update_transaction(transaction_id: int, finance: FinanceCreate):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("""
+                SELECT transaction_date, ticket_type, payment_method, amount
+                FROM revenue_finance WHERE transaction_id = %s
+                FOR UPDATE
+            """, (transaction_id,))
+            old = await cur.fetchone()
+            if not old:
+                raise HTTPException(status_code=404, detail="Transaction not found")
+
+            await cur.execute("""
+                UPDATE revenue_finance 
+                SET ticket_type=%s, amount=%s, payment_method=%s, 
+                    discount_applied=%s, counter_id=%s
+                WHERE transaction_id=%s
+            """, (
+                finance.ticket_type, finance.amount, finance.payment_method, 
+                finance.discount_applied, finance.counter_id, transaction_id
+            ))
+            # Move the transaction out of its old rollup bucket and into the new one
+            await apply_revenue_delta(cur, old['transaction_date'], old['ticket_type'], old['payment_method'], -old['amount'], -1)
+            await apply_revenue_delta(cur, old['transaction_date'], finance.ticket_type, finance.payment_method, finance.amount, 1)
+            await conn.commit()
+            invalidate(FINANCE)
+            return {"message": "Transaction updated successfully"}
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
+
+@router.delete("/api/finance/{transaction_id}", status_code=200, dependencies=ADMIN_ONLY)
+async def delete_transaction(transaction_id: int):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("""
+                DELETE FROM revenue_finance WHERE transaction_id = %s
+                RETURNING transaction_date, ticket_type, payment_method, amount
+            """, (transaction_id,))
+            deleted = await cur.fetchone()
+            if not deleted:
+                raise HTTPException(status_code=404, detail="Transaction not found")
+            await apply_revenue_delta(cur, deleted['transaction_date'], deleted['ticket_type'], deleted['payment_method'], -deleted['amount'], -1)
+            await conn.commit()
+            invalidate(FINANCE)
+            return {"message": "Transaction deleted successfully"}
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
@@ -0,0 +1,68 @@
+"""
+Lazily initialized Firestore client.
+
+firebase_admin and the Firestore/gRPC stack are slow to import and initialize,
+so nothing happens at import time: the SDK is imported and the app initialized
+on the first get_db() call, or ahead of time by the background warm-up that
+main.py's lifespan hook starts (bounded by FIREBASE_INIT_TIMEOUT). A missing key
+file therefore only breaks the feedback endpoints, not the whole API.
+
+Settings (.env):
+- FIREBASE_KEY_PATH: service account key (default firebase_key.json, looked up in
+  the working directory, museum-backend/ and next to this file)
+- FIREBASE_INIT_TIMEOUT: seconds the startup warm-up may take (default 10); the
+  Gemini client, warmed up alongside by feedback_routes, gets the same bound
+"""
+import asyncio
+import os
+import threading
+
+FIREBASE_KEY_PATH = os.getenv("FIREBASE_KEY_PATH", "firebase_key.json")
+FIREBASE_INIT_TIMEOUT = float(os.getenv("FIREBASE_INIT_TIMEOUT", "10"))
+
+_db = None
+_lock = threading.Lock()
+
+
+class FirebaseUnavailable(Exception):
+    """Raised when Firestore cannot be initialized (e.g. the key file is missing)."""
+
+
+def find_key_file():
+    candidates = [
+        FIREBASE_KEY_PATH,
+        os.path.join("museum-backend", FIREBASE_KEY_PATH),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), FIREBASE_KEY_PATH),
+    ]
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def get_db():
+    """The process-wide Firestore client, created on first use."""
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                import firebase_admin
+                from firebase_admin import credentials, firestore
+
+                if not firebase_admin._apps:
+                    key_path = find_key_file()
+                    if key_path is None:
+                        raise FirebaseUnavailable(f"Firebase credentials file ({FIREBASE_KEY_PATH}) not found.")
+                    firebase_admin.initialize_app(credentials.Certificate(key_path))
+                _db = firestore.client()
+    return _db
+
+
+async def warm_up(timeout=FIREBASE_INIT_TIMEOUT):
+    """Initialize Firestore off the event loop; logs instead of raising, so startup never fails on it."""
+    try:
+        await asyncio.wait_for(asyncio.to_thread(get_db), timeout)
+    except asyncio.TimeoutError:
+        print(f"Firestore warm-up did not finish within {timeout}s; it will complete on first use.")
+    except Exception as e:
+        print(f"Firestore warm-up failed, feedback endpoints will retry on first use: {e}")
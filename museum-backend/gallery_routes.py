@@ -1,8 +1,11 @@
-import random
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional
-from database import get_conn
+from async_database import get_async_conn
+from analytics_cache import invalidate, GALLERY
+from id_allocator import next_id
+from pagination import Keyset, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_page_query, select_columns, set_page_headers
+from session_tokens import ADMIN_ONLY
 
 router = APIRouter(tags=["Gallery"])
 
@@ -29,94 +32,108 @@ class GalleryUpdate(GalleryBase):
 class GalleryResponse(GalleryBase):
     gallery_id: int
 
+# --- Pagination ---
+GALLERY_COLUMNS = {"gallery_id", "name", "floor_number", "theme", "average_visit_count", "total_artefacts"}
+GALLERY_KEYSET = Keyset("gallery_id")
+
 # --- Routes ---
 
 @router.get("/api/galleries", status_code=200)
-def get_galleries(name: Optional[str] = None):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        query = "SELECT * FROM gallery"
-        params = []
+async def get_galleries(
+    response: Response,
+    name: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
+):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            conditions = []
+            params = []
         
-        if name:
-            query += " WHERE name ILIKE %s"
-            params.append(f"%{name}%")
-            
-        query += " ORDER BY gallery_id ASC"
+            if name:
+                conditions.append("name ILIKE %s")
+                params.append(f"%{name}%")
         
-        cur.execute(query, tuple(params))
-        rows = cur.fetchall()
-        # Convert to list of dicts if using tuple cursor, or directly return if DictCursor
-        return rows
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+            page = build_page_query(
+                "gallery", conditions, params, GALLERY_KEYSET,
+                select_columns(fields, GALLERY_COLUMNS, GALLERY_KEYSET), limit, cursor
+            )
+            await cur.execute(page.query, page.params)
+            rows = await cur.fetchall()
+            await set_page_headers(response, cur, page, rows, include_total)
+            return rows
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
 
-@router.post("/api/galleries", status_code=201)
-def create_gallery(gallery: GalleryCreate):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        gallery_id = random.randint(1000, 9999)
-        cur.execute("""
-            INSERT INTO gallery (gallery_id, name, floor_number, theme, average_visit_count, total_artefacts)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING gallery_id
-        """, (gallery_id, gallery.name, gallery.floor_number, gallery.theme, gallery.average_visit_count, gallery.total_artefacts))
+@router.post("/api/galleries", status_code=201, dependencies=ADMIN_ONLY)
+async def create_gallery(gallery: GalleryCreate):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            gallery_id = await next_id(cur, "gallery")
+            await cur.execute("""
+                INSERT INTO gallery (gallery_id, name, floor_number, theme, average_visit_count, total_artefacts)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING gallery_id
+            """, (gallery_id, gallery.name, gallery.floor_number, gallery.theme, gallery.average_visit_count, gallery.total_artefacts))
         
-        new_id = cur.fetchone()['gallery_id']
-        conn.commit()
-        return {"message": "Gallery created", "gallery_id": new_id}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+            new_id = (await cur.fetchone())['gallery_id']
+            await conn.commit()
+            invalidate(GALLERY)
+            return {"message": "Gallery created", "gallery_id": new_id}
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
 
-@router.put("/api/galleries/{gallery_id}")
-def update_gallery(gallery_id: int, gallery: GalleryUpdate):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            UPDATE gallery 
-            SET name=%s, floor_number=%s, theme=%s, average_visit_count=%s, total_artefacts=%s
-            WHERE gallery_id=%s
-        """, (gallery.name, gallery.floor_number, gallery.theme, gallery.average_visit_count, gallery.total_artefacts, gallery_id))
+@router.put("/api/galleries/{gallery_id}", dependencies=ADMIN_ONLY)
+async def update_gallery(gallery_id: int, gallery: GalleryUpdate):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("""
+                UPDATE gallery 
+                SET name=%s, floor_number=%s, theme=%s, average_visit_count=%s, total_artefacts=%s
+                WHERE gallery_id=%s
+            """, (gallery.name, gallery.floor_number, gallery.theme, gallery.average_visit_count, gallery.total_artefacts, gallery_id))
         
-        if cur.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Gallery not found")
+            if cur.rowcount == 0:
+                raise HTTPException(status_code=404, detail="Gallery not found")
             
-        conn.commit()
-        return {"message": "Gallery updated successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+            await conn.commit()
+            invalidate(GALLERY)
+            return {"message": "Gallery updated successfully"}
+        except HTTPException:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
 
-@router.delete("/api/galleries/{gallery_id}")
-def delete_gallery(gallery_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("DELETE FROM gallery WHERE gallery_id = %s", (gallery_id,))
-        if cur.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Gallery not found")
-        conn.commit()
-        return {"message": "Gallery deleted successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+@router.delete("/api/galleries/{gallery_id}", dependencies=ADMIN_ONLY)
+async def delete_gallery(gallery_id: int):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("DELETE FROM gallery WHERE gallery_id = %s", (gallery_id,))
+            if cur.rowcount == 0:
+                raise HTTPException(status_code=404, detail="Gallery not found")
+            await conn.commit()
+            invalidate(GALLERY)
+            return {"message": "Gallery deleted successfully"}
+        except HTTPException:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
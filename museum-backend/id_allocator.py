@@ -0,0 +1,35 @@
+"""
+Central primary-key allocation backed by Postgres sequences (migrations/0003_id_sequences.sql).
+
+Sequences never hand out the same value twice, so creates cost one nextval()
+no matter how full a table gets, instead of retrying random ids on collision.
+"""
+
+# entity -> sequence name
+SEQUENCES = {
+    "transaction": "revenue_finance_id_seq",
+    "staff": "staff_id_seq",
+    "gallery": "gallery_id_seq",
+    "artifact": "artifact_id_seq",
+    "tour": "tour_id_seq",
+}
+
+
+async def next_id(cur, entity):
+    """Allocate one id for `entity` (e.g. "staff")."""
+    await cur.execute("SELECT nextval(%s) AS id", (SEQUENCES[entity],))
+    return (await cur.fetchone())['id']
+
+
+async def reserve_ids(cur, entity, count):
+    """
+    Reserve a block of `count` ids in one round trip, for bulk inserts.
+    Ids are unique but not guaranteed contiguous under concurrent use.
+    """
+    if count <= 0:
+        return []
+    await cur.execute(
+        "SELECT nextval(%s) AS id FROM generate_series(1, %s)",
+        (SEQUENCES[entity], count)
+    )
+    return [row['id'] for row in await cur.fetchall()]
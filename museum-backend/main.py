@@ -1,6 +1,15 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import get_conn
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional
+from async_database import get_async_conn, open_async_pool, close_async_pool
+from database import pool as db_pool
+from password_workers import password_pool
+from db_sec import init_target_rounds
+from session_tokens import require_session_secret
+from analytics_cache import cached, VISITOR, FINANCE, GALLERY, ARTIFACT
 from auth_routes import router as auth_router
 from visitor_routes import router as visitor_router
 from staff_routes import router as staff_router
@@ -9,7 +18,23 @@ from tour_routes import router as tour_router
 from gallery_routes import router as gallery_router
 from artifact_routes import router as artifact_router
 
-app = FastAPI(title="Museum Analytics API")
+@asynccontextmanager
+async def lifespan(app):
+    require_session_secret()
+    await open_async_pool()
+    # bcrypt cost (benchmarked when BCRYPT_ROUNDS=auto) is fixed before serving, off the loop
+    await asyncio.to_thread(init_target_rounds)
+    await analysis_worker.start()
+    # Firebase / Gemini init runs in the background: requests are served meanwhile
+    warm_up = asyncio.create_task(warm_up_feedback_clients())
+    yield
+    warm_up.cancel()
+    await analysis_worker.stop()
+    await close_async_pool()
+    db_pool.closeall()
+    password_pool.shutdown()
+
+app = FastAPI(title="Museum Analytics API", lifespan=lifespan)
 
 # Configure CORS for frontend communication (MUST be added first)
 app.add_middleware(
@@ -18,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],  # pagination headers (see pagination.py)
 )
 
 # Include authentication routes
@@ -30,124 +56,172 @@ app.include_router(gallery_router)
 app.include_router(artifact_router)
 from analytics_routes import router as analytics_router
 app.include_router(analytics_router)
-from feedback_routes import router as feedback_router
+from feedback_routes import router as feedback_router, analysis_worker, warm_up_feedback_clients
 app.include_router(feedback_router)
+from metrics_routes import router as metrics_router
+app.include_router(metrics_router)
+from search_routes import router as search_router
+app.include_router(search_router)
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the MuseumGuide API!"}
+def date_range_filter(column, start_date, end_date):
+    """Builds an optional `WHERE column BETWEEN ...` clause for the rollup-backed endpoints."""
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append(f"{column} >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append(f"{column} <= %s")
+        params.append(end_date)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, tuple(params)
+
+
+# Endpoints 1, 3, 4 and 5 read the pre-aggregated rollup tables (migrations/0002_analytics_rollups.sql / rollups.py),
+# so their cost depends on the requested date range rather than on the size of visitor / revenue_finance.
+
+async def undated_visitors(cur):
+    """
+    Visitors without an entry_timestamp. The rollup cannot hold them, so the unfiltered
+    endpoints add them back as the NULL day / hour the original COUNT(*) queries returned.
+    """
+    await cur.execute("SELECT COUNT(*) AS total_visitors FROM visitor WHERE entry_timestamp IS NULL")
+    return (await cur.fetchone())["total_visitors"]
+
 # 1️⃣ Total visitors per day
 @app.get("/api/visitors_per_day")
-def visitors_per_day():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT DATE(entry_timestamp) AS visit_date, COUNT(*) AS total_visitors
-        FROM visitor
-        GROUP BY visit_date
-        ORDER BY visit_date;
-    """)
-    data = cur.fetchall()
-    cur.close(); conn.close()
+@cached("visitors_per_day", tags=(VISITOR,))
+async def visitors_per_day(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    where, params = date_range_filter("visit_date", start_date, end_date)
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        await cur.execute(f"""
+            SELECT visit_date, SUM(total_visitors) AS total_visitors
+            FROM visitor_hourly_rollup{where}
+            GROUP BY visit_date
+            ORDER BY visit_date;
+        """, params)
+        data = await cur.fetchall()
+        undated = 0 if params else await undated_visitors(cur)
+        await cur.close()
+    if undated:
+        data.append({"visit_date": None, "total_visitors": undated})  # NULLs sort last
     return data
 
 
 # 2️⃣ Visitors by ticket type
 @app.get("/api/visitors_by_ticket")
-def visitors_by_ticket():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT ticket_type, COUNT(*) AS total_visitors
-        FROM visitor
-        GROUP BY ticket_type;
-    """)
-    data = cur.fetchall()
-    cur.close(); conn.close()
+@cached("visitors_by_ticket", tags=(VISITOR,))
+async def visitors_by_ticket():
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        await cur.execute("""
+            SELECT ticket_type, COUNT(*) AS total_visitors
+            FROM visitor
+            GROUP BY ticket_type;
+        """)
+        data = await cur.fetchall()
+        await cur.close()
     return data
 
 
 # 3️⃣ Peak visitor hours
 @app.get("/api/visitors_by_hour")
-def visitors_by_hour():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT EXTRACT(HOUR FROM entry_timestamp) AS hour_of_day, COUNT(*) AS total_visitors
-        FROM visitor
-        GROUP BY hour_of_day
-        ORDER BY total_visitors DESC;
-    """)
-    data = cur.fetchall()
-    cur.close(); conn.close()
+@cached("visitors_by_hour", tags=(VISITOR,))
+async def visitors_by_hour(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    where, params = date_range_filter("visit_date", start_date, end_date)
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        await cur.execute(f"""
+            SELECT hour_of_day, SUM(total_visitors) AS total_visitors
+            FROM visitor_hourly_rollup{where}
+            GROUP BY hour_of_day
+            ORDER BY total_visitors DESC;
+        """, params)
+        data = await cur.fetchall()
+        undated = 0 if params else await undated_visitors(cur)
+        await cur.close()
+    if undated:
+        data.append({"hour_of_day": None, "total_visitors": undated})
+        data.sort(key=lambda row: row["total_visitors"], reverse=True)
     return data
 
 
 # 4️⃣ Revenue by ticket type
 @app.get("/api/revenue_by_ticket")
-def revenue_by_ticket():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT ticket_type, SUM(amount) AS revenue
-        FROM revenue_finance
-        GROUP BY ticket_type;
-    """)
-    data = cur.fetchall()
-    cur.close(); conn.close()
+@cached("revenue_by_ticket", tags=(FINANCE,))
+async def revenue_by_ticket(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    where, params = date_range_filter("transaction_date", start_date, end_date)
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        await cur.execute(f"""
+            SELECT ticket_type, SUM(revenue) AS revenue
+            FROM revenue_daily_rollup{where}
+            GROUP BY ticket_type
+            HAVING SUM(num_transactions) > 0;
+        """, params)
+        data = await cur.fetchall()
+        await cur.close()
     return data
 
 
 # 5️⃣ Payment method popularity
 @app.get("/api/payment_methods")
-def payment_methods():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT payment_method, COUNT(*) AS num_transactions
-        FROM revenue_finance
-        GROUP BY payment_method;
-    """)
-    data = cur.fetchall()
-    cur.close(); conn.close()
+@cached("payment_methods", tags=(FINANCE,))
+async def payment_methods(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    where, params = date_range_filter("transaction_date", start_date, end_date)
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        await cur.execute(f"""
+            SELECT payment_method, SUM(num_transactions) AS num_transactions
+            FROM revenue_daily_rollup{where}
+            GROUP BY payment_method
+            HAVING SUM(num_transactions) > 0;
+        """, params)
+        data = await cur.fetchall()
+        await cur.close()
     return data
 
 
 # 6️⃣ Gallery & artifact condition
 @app.get("/api/gallery_condition")
-def gallery_condition():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT g.name AS gallery_name, a.condition_status, COUNT(*) AS count
-        FROM gallery g
-        JOIN artifact_information a ON g.gallery_id = a.gallery_id
-        GROUP BY g.name, a.condition_status
-        ORDER BY g.name;
-    """)
-    data = cur.fetchall()
-    cur.close(); conn.close()
+@cached("gallery_condition", tags=(GALLERY, ARTIFACT))
+async def gallery_condition():
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        await cur.execute("""
+            SELECT g.name AS gallery_name, a.condition_status, COUNT(*) AS count
+            FROM gallery g
+            JOIN artifact_information a ON g.gallery_id = a.gallery_id
+            GROUP BY g.name, a.condition_status
+            ORDER BY g.name;
+        """)
+        data = await cur.fetchall()
+        await cur.close()
     return data
 
 # 7️⃣ Top 5 Most Visited Galleries
 @app.get("/api/top_galleries")
-def top_galleries():
+@cached("top_galleries", tags=(GALLERY,))
+async def top_galleries():
     """
     Returns the top 5 galleries by average visit count.
     Useful for identifying the most popular sections of the museum.
     """
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT 
-            name AS gallery_name, 
-            average_visit_count
-        FROM gallery
-        ORDER BY average_visit_count DESC
-        LIMIT 5;
-    """)
-    data = cur.fetchall()
-    cur.close()
-    conn.close()
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        await cur.execute("""
+            SELECT 
+                name AS gallery_name, 
+                average_visit_count
+            FROM gallery
+            ORDER BY average_visit_count DESC
+            LIMIT 5;
+        """)
+        data = await cur.fetchall()
+        await cur.close()
     return data
 
@@ -0,0 +1,62 @@
+from fastapi import APIRouter
+from database import pool_stats
+from async_database import async_pool_stats, export_pool_stats
+from analytics_cache import analytics_cache
+from password_workers import password_pool
+from feedback_routes import analysis_worker
+from feedback_cache import feedback_cache
+from feedback_classifier import feedback_classifier
+
+router = APIRouter(prefix="/api/metrics", tags=["Metrics"])
+
+
+@router.get("/db-pool", status_code=200)
+def get_db_pool_metrics():
+    """
+    Returns connection pool usage counters.
+    `exhausted` counts checkouts that timed out waiting for a free connection,
+    `waits` counts checkouts that had to wait at all.
+    """
+    return pool_stats()
+
+
+@router.get("/async-db-pool", status_code=200)
+def get_async_db_pool_metrics():
+    """Returns psycopg_pool counters for the async pool (requests_waiting, requests_errors, ...)."""
+    return async_pool_stats()
+
+
+@router.get("/export-db-pool", status_code=200)
+def get_export_db_pool_metrics():
+    """Returns psycopg_pool counters for the small pool that streaming exports borrow from."""
+    return export_pool_stats()
+
+
+@router.get("/analytics-cache", status_code=200)
+def get_analytics_cache_metrics():
+    """Returns hit/miss/invalidation counters for the dashboard result cache, overall and per endpoint."""
+    return analytics_cache.stats()
+
+
+@router.get("/password-pool", status_code=200)
+def get_password_pool_metrics():
+    """Returns bcrypt worker pool counters: pending/queue_depth, rejected jobs and average latency."""
+    return password_pool.stats()
+
+
+@router.get("/feedback-worker", status_code=200)
+def get_feedback_worker_metrics():
+    """Returns AI feedback analysis counters: queue_depth, dropped submissions, batch sizes, retries and latency."""
+    return analysis_worker.stats()
+
+
+@router.get("/feedback-cache", status_code=200)
+def get_feedback_cache_metrics():
+    """Returns feedback analysis cache counters: memory / persistent hits, misses and evictions."""
+    return feedback_cache.stats()
+
+
+@router.get("/feedback-classifier", status_code=200)
+def get_feedback_classifier_metrics():
+    """Returns how much feedback the local pre-classifier answered without the model (offload_ratio)."""
+    return feedback_classifier.stats()
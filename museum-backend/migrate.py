@@ -0,0 +1,211 @@
+"""
+Versioned schema migrations.
+
+Migrations are the numbered files in migrations/ (`NNNN_description.sql`).
+Each pending file runs in its own transaction and is recorded in the
+schema_migrations table together with a checksum of its contents, so a
+migration is applied exactly once and later edits to an applied file are
+reported instead of silently ignored.
+
+Every migration is written to be idempotent (IF NOT EXISTS / ON CONFLICT),
+so a database that was set up by running the .sql files by hand can simply
+be migrated: files it already has are re-applied harmlessly and recorded.
+
+A file whose first line is `-- migrate: no-transaction` runs outside a
+transaction instead, one statement at a time (split on `;` at line ends), for
+statements Postgres refuses inside one such as CREATE INDEX CONCURRENTLY. A
+concurrent build that failed part-way leaves an INVALID index behind, which
+IF NOT EXISTS would then skip, so such leftovers are dropped before each retry.
+
+Usage:
+    python migrate.py                # apply all pending migrations
+    python migrate.py status         # list applied / pending migrations
+    python migrate.py up --to 0004   # apply pending migrations up to a version
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+from database import get_conn
+
+MIGRATIONS_DIR = os.getenv(
+    "MIGRATIONS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations"),
+)
+
+MIGRATION_FILE = re.compile(r"^(\d{4})_([A-Za-z0-9_]+)\.sql$")
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+STATEMENT_END = re.compile(r";\s*$", re.MULTILINE)
+CONCURRENT_INDEX = re.compile(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(4) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def checksum(self):
+        return hashlib.sha256(self.read().encode("utf-8")).hexdigest()
+
+    def transactional(self):
+        return not self.read().startswith(NO_TRANSACTION_MARKER)
+
+    def statements(self):
+        """The file split into single statements (used for no-transaction migrations)."""
+        statements = []
+        for chunk in STATEMENT_END.split(self.read()):
+            code = "\n".join(line for line in chunk.splitlines() if not line.strip().startswith("--"))
+            if code.strip():
+                statements.append(code.strip())
+        return statements
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """Returns the migrations in `directory`, ordered by version."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(directory, filename)))
+    migrations.sort(key=lambda m: m.version)
+
+    versions = [m.version for m in migrations]
+    duplicates = sorted({v for v in versions if versions.count(v) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate migration versions: {duplicates}")
+    return migrations
+
+
+def applied_migrations(cur):
+    """Returns {version: checksum} for every migration recorded in the database."""
+    cur.execute(CREATE_MIGRATIONS_TABLE)
+    cur.execute("SELECT version, checksum FROM schema_migrations")
+    return {row["version"]: row["checksum"] for row in cur.fetchall()}
+
+
+def drop_invalid_index(cur, statement):
+    """Drop the INVALID leftover of an earlier failed CREATE INDEX CONCURRENTLY, if any."""
+    match = CONCURRENT_INDEX.search(statement)
+    if not match:
+        return
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace AND NOT i.indisvalid
+    """, (match.group(1),))
+    if cur.fetchone():
+        print(f"  dropping invalid index {match.group(1)} left by an earlier attempt")
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}")
+
+
+def apply_without_transaction(conn, cur, migration):
+    conn.set_session(autocommit=True)
+    try:
+        for statement in migration.statements():
+            drop_invalid_index(cur, statement)
+            cur.execute(statement)
+    finally:
+        conn.set_session(autocommit=False)
+
+
+def migrate(target=None):
+    """Apply pending migrations (up to and including `target`). Returns the versions applied."""
+    conn = get_conn()
+    cur = conn.cursor()
+    applied_now = []
+    try:
+        applied = applied_migrations(cur)
+        conn.commit()
+
+        for migration in discover_migrations():
+            if target and migration.version > target:
+                break
+            if migration.version in applied:
+                continue
+
+            print(f"Applying {migration.version}_{migration.name}...")
+            try:
+                if migration.transactional():
+                    cur.execute(migration.read())
+                else:
+                    apply_without_transaction(conn, cur, migration)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                    (migration.version, migration.name, migration.checksum()),
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                if migration.transactional():
+                    print(f"Migration {migration.version}_{migration.name} failed; nothing from it was applied.")
+                else:
+                    print(f"Migration {migration.version}_{migration.name} failed part-way; "
+                          "it is idempotent, so re-run it once the cause is fixed.")
+                raise
+            applied_now.append(migration.version)
+    finally:
+        cur.close()
+        conn.close()
+    return applied_now
+
+
+def status():
+    """Returns a list of (version, name, state) rows, state being applied / pending / modified."""
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        applied = applied_migrations(cur)
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+    rows = []
+    for migration in discover_migrations():
+        if migration.version not in applied:
+            state = "pending"
+        elif applied[migration.version] != migration.checksum():
+            state = "modified"
+        else:
+            state = "applied"
+        rows.append((migration.version, migration.name, state))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations.")
+    subparsers = parser.add_subparsers(dest="command")
+    up = subparsers.add_parser("up", help="apply pending migrations (default)")
+    up.add_argument("--to", dest="target", help="stop after this version, e.g. 0004")
+    subparsers.add_parser("status", help="list applied and pending migrations")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        rows = status()
+        for version, name, state in rows:
+            print(f"{version}  {state:<9} {name}")
+        # Non-zero exit lets deploy scripts refuse to start on an out-of-date schema
+        return 1 if any(state != "applied" for _, _, state in rows) else 0
+
+    applied = migrate(getattr(args, "target", None))
+    print(f"Applied {len(applied)} migration(s)." if applied else "Database is up to date.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
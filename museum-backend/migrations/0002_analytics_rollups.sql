@@ -0,0 +1,21 @@
+-- Pre-aggregated rollups backing the dashboard endpoints in main.py.
+-- Maintained incrementally by the write paths (see rollups.py);
+-- run `python rollups.py` once after creating them to backfill from history.
+
+-- Visitors per (day, hour of entry). Daily totals are summed from this table.
+CREATE TABLE IF NOT EXISTS visitor_hourly_rollup (
+    visit_date DATE NOT NULL,
+    hour_of_day SMALLINT NOT NULL CHECK (hour_of_day BETWEEN 0 AND 23),
+    total_visitors INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (visit_date, hour_of_day)
+);
+
+-- Revenue and transaction count per (day, ticket type, payment method)
+CREATE TABLE IF NOT EXISTS revenue_daily_rollup (
+    transaction_date DATE NOT NULL,
+    ticket_type VARCHAR(50) NOT NULL,
+    payment_method VARCHAR(50) NOT NULL,
+    revenue NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    num_transactions INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (transaction_date, ticket_type, payment_method)
+);
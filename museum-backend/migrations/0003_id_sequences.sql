@@ -0,0 +1,25 @@
+-- Sequences backing id_allocator.py. Replaces the random.randint() primary keys.
+-- Each sequence starts above both the existing rows and the old random id range,
+-- so ids handed out from now on can never collide with legacy ones.
+
+CREATE SEQUENCE IF NOT EXISTS revenue_finance_id_seq OWNED BY revenue_finance.transaction_id;
+SELECT setval('revenue_finance_id_seq', GREATEST((SELECT COALESCE(MAX(transaction_id), 0) FROM revenue_finance), 9999));
+
+CREATE SEQUENCE IF NOT EXISTS staff_id_seq OWNED BY staff.staff_id;
+SELECT setval('staff_id_seq', GREATEST((SELECT COALESCE(MAX(staff_id), 0) FROM staff), 9999));
+
+CREATE SEQUENCE IF NOT EXISTS gallery_id_seq OWNED BY gallery.gallery_id;
+SELECT setval('gallery_id_seq', GREATEST((SELECT COALESCE(MAX(gallery_id), 0) FROM gallery), 9999));
+
+CREATE SEQUENCE IF NOT EXISTS artifact_id_seq OWNED BY artifact_information.artifact_id;
+SELECT setval('artifact_id_seq', GREATEST((SELECT COALESCE(MAX(artifact_id), 0) FROM artifact_information), 9999));
+
+CREATE SEQUENCE IF NOT EXISTS tour_id_seq OWNED BY tours.tour_id;
+SELECT setval('tour_id_seq', GREATEST((SELECT COALESCE(MAX(tour_id), 0) FROM tours), 99999));
+
+-- Inserts that omit the id (psql, scripts) draw from the same sequences
+ALTER TABLE revenue_finance ALTER COLUMN transaction_id SET DEFAULT nextval('revenue_finance_id_seq');
+ALTER TABLE staff ALTER COLUMN staff_id SET DEFAULT nextval('staff_id_seq');
+ALTER TABLE gallery ALTER COLUMN gallery_id SET DEFAULT nextval('gallery_id_seq');
+ALTER TABLE artifact_information ALTER COLUMN artifact_id SET DEFAULT nextval('artifact_id_seq');
+ALTER TABLE tours ALTER COLUMN tour_id SET DEFAULT nextval('tour_id_seq');
@@ -0,0 +1,19 @@
+-- Denormalized per-tour roster backing GET /api/tours/guide-view.
+-- One row per tour with its visitors pre-aggregated, maintained by the tour and
+-- visitor write paths (see tour_roster.py). Run `python tour_roster.py` once to fill it.
+
+CREATE TABLE IF NOT EXISTS guide_tour_roster (
+    tour_id INTEGER PRIMARY KEY REFERENCES tours(tour_id) ON DELETE CASCADE,
+    guide_id INTEGER NOT NULL,
+    tour_date DATE NOT NULL,
+    tour_time TIME,
+    visitor_group_name VARCHAR(255),
+    group_size INTEGER,
+    language VARCHAR(50),
+    status VARCHAR(50),
+    visitors JSONB,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_guide_tour_roster_guide_date
+    ON guide_tour_roster (guide_id, tour_date);
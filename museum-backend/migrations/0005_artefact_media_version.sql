@@ -0,0 +1,26 @@
+-- Version stamp for artefact_media, read by GET /api/artifacts/enriched.
+-- Any write to artefact_media bumps the counter, which tells the API to rebuild
+-- its cached enriched feed (and changes the ETag clients revalidate against).
+
+CREATE TABLE IF NOT EXISTS content_version (
+    name VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO content_version (name) VALUES ('artefact_media')
+ON CONFLICT (name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_content_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE content_version
+    SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+    WHERE name = TG_ARGV[0];
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS artefact_media_version_bump ON artefact_media;
+CREATE TRIGGER artefact_media_version_bump
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON artefact_media
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_content_version('artefact_media');
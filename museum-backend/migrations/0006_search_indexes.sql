@@ -0,0 +1,19 @@
+-- Trigram indexes for substring search. They serve both the existing
+-- `ILIKE '%term%'` filters on the list endpoints and the ranked /api/search
+-- endpoint (search_routes.py), which would otherwise always seq-scan.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_artifact_category_trgm
+    ON artifact_information USING GIN (category gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_artifact_period_trgm
+    ON artifact_information USING GIN (historical_period gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_gallery_name_trgm
+    ON gallery USING GIN (name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_staff_name_trgm
+    ON staff USING GIN (name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_visitor_name_trgm
+    ON visitor USING GIN (name gin_trgm_ops);
@@ -0,0 +1,52 @@
+-- migrate: no-transaction
+-- B-tree indexes for the filters and joins the API runs on every request.
+-- Column order follows the route queries: equality columns first, then the
+-- range / ORDER BY columns, so each lookup is a single index range scan.
+-- `python plan_check.py` verifies none of these queries falls back to a seq scan.
+--
+-- Built CONCURRENTLY so large existing tables keep taking writes meanwhile;
+-- that cannot run inside a transaction, hence the no-transaction marker above.
+
+-- Visitors: nationality filter
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_visitor_nationality
+    ON visitor (nationality);
+
+-- Finance listing / export: ordered by the keyset, optionally narrowed by payment method
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_revenue_finance_keyset
+    ON revenue_finance (transaction_date DESC, transaction_time DESC, transaction_id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_revenue_finance_method_keyset
+    ON revenue_finance (payment_method, transaction_date DESC, transaction_time DESC, transaction_id DESC);
+
+-- Tours: per-guide schedule, per-day listing filtered by status, and the
+-- (much smaller) set of tours that are still upcoming
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tours_guide_date
+    ON tours (guide_id, tour_date DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tours_date_status
+    ON tours (tour_date, status);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tours_scheduled_date
+    ON tours (tour_date) WHERE status = 'Scheduled';
+
+-- Tour attendance, joined from both sides (roster by tour, roster refresh by visitor)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attends_tour_tour
+    ON attends_tour (tour_id, visitor_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attends_tour_visitor
+    ON attends_tour (visitor_id);
+
+-- Staff: lookup by email (also how guide views resolve the guide), duplicate check
+-- on email OR contact, occupation filter
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_staff_email
+    ON staff (email);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_staff_contact
+    ON staff (contact);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_staff_occupation
+    ON staff (occupation);
+
+-- Login / signup: every auth query filters on Email, most also on Role
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_authentication_email_role
+    ON "Authentication" ("Email", "Role");
+
+-- Artifacts per gallery (listing filter and the gallery dashboard join)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_artifact_gallery
+    ON artifact_information (gallery_id);
+
+ANALYZE visitor, revenue_finance, tours, attends_tour, staff, "Authentication", artifact_information;
@@ -0,0 +1,8 @@
+-- Persistent tier of the feedback analysis cache (feedback_cache.py).
+-- One row per distinct normalized feedback text (+ prompt version), hashed.
+
+CREATE TABLE IF NOT EXISTS feedback_analysis_cache (
+    content_hash CHAR(64) PRIMARY KEY,
+    analysis JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,52 @@
+-- Postgres feedback store (feedback_store.py, FEEDBACK_STORE=postgres).
+-- Same data as the Firestore visitor_feedback collection, next to the rest of the schema.
+
+CREATE TABLE IF NOT EXISTS visitor_feedback (
+    feedback_id BIGSERIAL PRIMARY KEY,
+    visitor_id VARCHAR(255) NOT NULL,
+    feedback_text TEXT NOT NULL,
+    rating SMALLINT NOT NULL CHECK (rating BETWEEN 1 AND 5),
+    submitted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    processed BOOLEAN NOT NULL DEFAULT FALSE,
+    ai_analysis JSONB,
+    analyzed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Priority as a sortable number (high=3, medium=2, low=1, none=0). IMMUTABLE so it
+-- can be indexed; queries must use this function for the index to apply.
+CREATE OR REPLACE FUNCTION feedback_priority_rank(analysis JSONB) RETURNS SMALLINT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT (CASE lower(analysis->>'priority')
+        WHEN 'high' THEN 3 WHEN 'medium' THEN 2 WHEN 'low' THEN 1 ELSE 0
+    END)::SMALLINT
+$$;
+
+-- GET /api/feedback/analysis: filter on actionable, order by priority then newest
+CREATE INDEX IF NOT EXISTS idx_visitor_feedback_actionable_priority
+    ON visitor_feedback (
+        (ai_analysis->'actionable' = 'true'::jsonb),
+        feedback_priority_rank(ai_analysis) DESC,
+        submitted_at DESC,
+        feedback_id DESC
+    )
+    WHERE processed;
+
+-- Containment filters on the analysis (category, priority, sentiment, ...)
+CREATE INDEX IF NOT EXISTS idx_visitor_feedback_analysis
+    ON visitor_feedback USING GIN (ai_analysis jsonb_path_ops);
+
+-- Feedback still waiting for analysis (small, shrinks as the worker catches up)
+CREATE INDEX IF NOT EXISTS idx_visitor_feedback_unprocessed
+    ON visitor_feedback (feedback_id)
+    WHERE NOT processed;
+
+-- Per-day counters served by GET /api/feedback/trends, maintained with the analyses
+CREATE TABLE IF NOT EXISTS feedback_daily_counts (
+    day DATE NOT NULL,
+    sentiment VARCHAR(20) NOT NULL,
+    category VARCHAR(20) NOT NULL,
+    priority VARCHAR(20) NOT NULL,
+    actionable BOOLEAN NOT NULL,
+    feedback_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, sentiment, category, priority, actionable)
+);
@@ -0,0 +1,9 @@
+-- migrate: no-transaction
+-- Visitors without an entry_timestamp are not in visitor_hourly_rollup (its key
+-- needs a day and hour); /api/visitors_per_day and /api/visitors_by_hour report
+-- them as the NULL bucket, as the original queries did. This partial index keeps
+-- that count a scan of only the undated rows.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_visitor_undated
+    ON visitor (visitor_id)
+    WHERE entry_timestamp IS NULL;
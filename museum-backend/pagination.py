@@ -0,0 +1,119 @@
+"""
+Keyset (cursor) pagination and column projection for the admin list endpoints.
+
+Each list endpoint declares the columns clients may ask for and the key it is
+ordered by. Pages are fetched with `WHERE (key...) > (last seen key...)` instead
+of OFFSET, so every page costs the same no matter how deep the client scrolls.
+
+Response conventions:
+- the body stays a plain JSON list of rows (what the frontend already expects)
+- pages hold DEFAULT_PAGE_SIZE rows unless `?limit=` asks for more (up to MAX_PAGE_SIZE),
+  so no request loads a whole table into memory
+- `X-Next-Cursor` is set when more rows may follow; pass it back as `?cursor=`
+- `X-Total-Count` holds the number of rows matching the filters; it costs an extra
+  COUNT(*), so it is only sent with `include_total=true`
+"""
+import base64
+import json
+import os
+from fastapi import HTTPException, Response
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+class Keyset:
+    """Ordering key for a list endpoint, e.g. Keyset("artifact_id")."""
+
+    def __init__(self, *columns, descending=False):
+        self.columns = columns
+        self.descending = descending
+
+    def order_by(self):
+        direction = "DESC" if self.descending else "ASC"
+        return ", ".join(f"{c} {direction}" for c in self.columns)
+
+
+class Page:
+    """A built page query plus what is needed to compute its response headers."""
+
+    def __init__(self, query, params, count_query, count_params, keyset, limit, cursor):
+        self.query = query
+        self.params = params
+        self.count_query = count_query
+        self.count_params = count_params
+        self.keyset = keyset
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(row, keyset):
+    values = [row[c] for c in keyset.columns]
+    raw = json.dumps(values, default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor, keyset):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(keyset.columns):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def select_columns(fields, allowed, keyset):
+    """
+    Turns `?fields=a,b` into a validated column list.
+    Key columns are always included so the next cursor can be built.
+    """
+    if not fields:
+        return "*"
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}. Allowed: {sorted(allowed)}")
+    columns = list(keyset.columns) + [f for f in requested if f not in keyset.columns]
+    return ", ".join(columns)
+
+
+def build_page_query(table, conditions, params, keyset, columns="*", limit=None, cursor=None):
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    count_query = f"SELECT COUNT(*) AS total FROM {table}{where}"
+    count_params = tuple(params)
+
+    conditions = list(conditions)
+    params = list(params)
+    if cursor:
+        values = decode_cursor(cursor, keyset)
+        op = "<" if keyset.descending else ">"
+        placeholders = ", ".join(["%s"] * len(values))
+        conditions.append(f"({', '.join(keyset.columns)}) {op} ({placeholders})")
+        params.extend(values)
+
+    query = f"SELECT {columns} FROM {table}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {keyset.order_by()}"
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    return Page(query, tuple(params), count_query, count_params, keyset, limit, cursor)
+
+
+async def set_page_headers(response: Response, cur, page, rows, include_total=False):
+    if page.limit and len(rows) == page.limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1], page.keyset)
+    if include_total:
+        if not page.cursor and (not page.limit or len(rows) < page.limit):
+            # First page holds every matching row: no need to count them again
+            total = len(rows)
+        else:
+            await cur.execute(page.count_query, page.count_params)
+            total = (await cur.fetchone())["total"]
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
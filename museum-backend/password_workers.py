@@ -0,0 +1,98 @@
+"""
+Dedicated, bounded worker pool for bcrypt hashing / verification.
+
+bcrypt is ~250 ms of CPU per call at cost 12. Running it on the request thread
+ties up a web worker for the whole time, so login storms starve every other
+endpoint. Password work is handed to this pool instead; its size is configured
+independently of the web workers and the number of jobs allowed to queue is capped.
+
+Settings (.env):
+- PASSWORD_WORKERS: number of hashing workers (default: CPU count)
+- PASSWORD_EXECUTOR: "thread" (default, bcrypt releases the GIL) or "process"
+- PASSWORD_MAX_PENDING: max jobs running + queued before new ones are rejected
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_EXECUTOR = os.getenv("PASSWORD_EXECUTOR", "thread").lower()
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(PASSWORD_WORKERS * 16)))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when PASSWORD_MAX_PENDING jobs are already waiting; callers should answer 503."""
+
+
+class PasswordWorkerPool:
+    def __init__(self, workers, max_pending, kind="thread"):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.kind = kind
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "max_queue_depth": 0,
+            "total_seconds": 0.0,
+        }
+
+    def _get_executor(self):
+        # Created on first use so importing this module never forks worker processes
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _queue_depth(self):
+        return max(0, self._pending - self.workers)
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool and await its result."""
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._metrics["rejected"] += 1
+                raise PasswordPoolBusy("Too many password operations in progress, try again shortly")
+            self._pending += 1
+            self._metrics["submitted"] += 1
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._queue_depth())
+
+        started = time.monotonic()
+        try:
+            return await asyncio.wrap_future(executor.submit(fn, *args))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._metrics["completed"] += 1
+                self._metrics["total_seconds"] += time.monotonic() - started
+
+    def stats(self):
+        with self._lock:
+            completed = self._metrics["completed"]
+            return {
+                "executor": self.kind,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "queue_depth": self._queue_depth(),
+                "avg_latency_ms": round(self._metrics["total_seconds"] / completed * 1000, 2) if completed else None,
+                **{k: v for k, v in self._metrics.items() if k != "total_seconds"},
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_pool = PasswordWorkerPool(PASSWORD_WORKERS, PASSWORD_MAX_PENDING, PASSWORD_EXECUTOR)
@@ -0,0 +1,284 @@
+"""
+EXPLAIN-based guard against sequential scans on the API's hot queries.
+
+Copies the hot tables (with their indexes) into a scratch schema, seeds them
+with a large synthetic dataset, ANALYZEs them, then EXPLAINs the queries the
+routes run on every request with that schema first on the search_path. The
+live tables are never written to, and the scratch schema is dropped at the end.
+Any plan that reads a table with a Seq Scan is reported and the script exits
+non-zero, which makes it usable in CI right after `python migrate.py`.
+
+The SQL is imported from the route modules (their filter builders and query
+constants), so a change to a route's WHERE / ORDER BY is checked as-is.
+
+Usage:
+    python plan_check.py                 # 200k visitors / transactions
+    python plan_check.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+from database import get_conn
+from pagination import DEFAULT_PAGE_SIZE, build_page_query, encode_cursor
+from tour_roster import ROSTER_SELECT, ROSTER_UPSERT, REFRESH_TOURS_WHERE, REFRESH_VISITOR_WHERE
+from visitor_routes import VISITOR_KEYSET, VISITOR_EXISTS, visitor_filters
+from finance_routes import FINANCE_KEYSET, finance_filters
+from tour_routes import TOUR_KEYSET, TOURS_BY_GUIDE_EMAIL, tour_filters, guide_view_query
+from staff_routes import STAFF_DUPLICATE_CHECK
+from artifact_routes import ARTIFACT_KEYSET, artifact_filters
+from db_sec import LOGIN_QUERY
+
+DEFAULT_ROWS = 200000
+
+OCCUPATIONS = "ARRAY['Customer_care', 'Tour_guide', 'Security', 'Admin', 'Manager', 'Custodian']"
+TICKET_TYPES = "ARRAY['Standard', 'VIP', 'Student']"
+PAYMENT_METHODS = "ARRAY['Card', 'UPI', 'Cash', 'Online']"
+TOUR_STATUSES = "ARRAY['Scheduled', 'Completed', 'Cancelled', 'Pending']"
+LANGUAGES = "ARRAY['English', 'Hindi', 'French', 'German', 'Spanish']"
+ROLES = "ARRAY['visitor', 'admin', 'guide']"
+
+
+def _pick(array, modulus):
+    return f"({array})[1 + mod(g, {modulus})]"
+
+
+def column_types(cur, table):
+    cur.execute("""
+        SELECT attname, format_type(atttypid, atttypmod) AS type
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+    """, (table,))
+    return {row["attname"]: row["type"] for row in cur.fetchall()}
+
+
+def seed(cur, table, count, columns):
+    """
+    INSERT `count` generated rows into `table`. `columns` maps column name to an
+    SQL expression over the series counter `g`; values are cast to the column's
+    declared type, so this works whatever the exact column types are.
+    """
+    types = column_types(cur, table)
+    names = ", ".join(f'"{c}"' for c in columns)
+    values = ", ".join(f"CAST(({expr})::text AS {types[c]})" for c, expr in columns.items())
+    cur.execute(f"INSERT INTO {table} ({names}) SELECT {values} FROM generate_series(1, %s) AS g", (count,))
+
+
+def seed_fixture(cur, rows):
+    """Fill every hot table with `rows`-scaled synthetic data. Returns sample lookup values."""
+    n_galleries = max(50, rows // 1000)
+    n_staff = max(500, rows // 100)
+    n_tours = max(1000, rows // 20)
+
+    # The scratch tables start empty, so ids simply count from 1
+    seed(cur, "gallery", n_galleries, {
+        "gallery_id": "g",
+        "name": "'Fixture Gallery ' || g",
+        "floor_number": "1 + mod(g, 5)",
+        "theme": "'Theme ' || mod(g, 20)",
+        "average_visit_count": "0",
+        "total_artefacts": "0",
+    })
+    seed(cur, "staff", n_staff, {
+        "staff_id": "g",
+        "name": "'Fixture Staff ' || g",
+        "occupation": _pick(OCCUPATIONS, 6),
+        "contact": "9000000000 + g",
+        "joining_date": "DATE '2015-01-01' + mod(g, 3000)",
+        "email": "'staff' || g || '@plan-check.invalid'",
+    })
+    seed(cur, "visitor", rows, {
+        "visitor_id": "g",
+        "name": "'Fixture Visitor ' || md5(g::text)",
+        "age_group": _pick("ARRAY['Child', 'Adult', 'Senior']", 3),
+        "email": "'visitor' || g || '@plan-check.invalid'",
+        "nationality": "'Country ' || mod(g, 150)",
+        "preferred_language": _pick(LANGUAGES, 5),
+        "last_visit_date": "CURRENT_DATE - mod(g, 1000)",
+        "ticket_type": _pick(TICKET_TYPES, 3),
+        "id_proof": "'Online'",
+        "contact": "7000000000 + g",
+        "entry_timestamp": "CURRENT_TIMESTAMP - g * INTERVAL '5 minutes'",
+    })
+    seed(cur, '"Authentication"', max(1000, rows // 10), {
+        "id": "g",
+        "Name": "'Fixture User ' || g",
+        "Email": "'user' || g || '@plan-check.invalid'",
+        "Role": _pick(ROLES, 3),
+        "Password_hash": "'x'",
+    })
+    seed(cur, "revenue_finance", rows, {
+        "transaction_id": "g",
+        "visitor_id": f"1 + mod(g, {rows})",
+        "ticket_type": _pick(TICKET_TYPES, 3),
+        "amount": "100 + mod(g, 400)",
+        "payment_method": _pick(PAYMENT_METHODS, 4),
+        "discount_applied": "mod(g, 5) = 0",
+        "counter_id": "'C' || (1 + mod(g, 8))",
+        "transaction_date": "CURRENT_DATE - g / 200",
+        "transaction_time": "TIME '09:00' + mod(g, 28800) * INTERVAL '1 second'",
+    })
+    seed(cur, "tours", n_tours, {
+        "tour_id": "g",
+        "guide_id": f"1 + mod(g, {n_staff})",
+        "tour_date": "CURRENT_DATE - 365 + mod(g, 730)",
+        "tour_time": "TIME '10:00' + mod(g, 8) * INTERVAL '1 hour'",
+        "visitor_group_name": "'Fixture Group ' || g",
+        "group_size": "1 + mod(g, 30)",
+        "language": _pick(LANGUAGES, 5),
+        "status": _pick(TOUR_STATUSES, 4),
+    })
+    seed(cur, "attends_tour", rows // 4, {
+        "visitor_id": "g",
+        "tour_id": f"1 + mod(g, {n_tours})",
+    })
+    seed(cur, "artifact_information", max(1000, rows // 10), {
+        "artifact_id": "g",
+        "gallery_id": f"1 + mod(g, {n_galleries})",
+        "historical_period": "'Period ' || mod(g, 40)",
+        "category": "'Category ' || mod(g, 25)",
+        "material": "'Stone'",
+        "condition_status": "'Good'",
+        "audio_guide_id": "NULL",
+    })
+    cur.execute(ROSTER_UPSERT.format(select=ROSTER_SELECT.format(where="")))
+
+    cur.execute(
+        'ANALYZE gallery, staff, visitor, "Authentication", revenue_finance, '
+        "tours, attends_tour, artifact_information, guide_tour_roster"
+    )
+
+    # g = 1 picks OCCUPATIONS[2] / ROLES[2]: a Tour_guide and an admin
+    guide_id = 1
+    cur.execute("SELECT * FROM revenue_finance WHERE transaction_id = %s", (rows // 2,))
+    middle = cur.fetchone()
+    return {
+        "visitor_id": rows // 2,
+        "tour_id": n_tours // 2,
+        "gallery_id": n_galleries // 2,
+        "guide_id": guide_id,
+        "guide_email": f"staff{guide_id}@plan-check.invalid",
+        "auth_email": "user1@plan-check.invalid",
+        "nationality": "Country 42",
+        "today": date.today(),
+        "finance_cursor": encode_cursor(middle, FINANCE_KEYSET),
+        "finance_from": middle["transaction_date"],
+    }
+
+
+def page_query(table, filters, keyset, cursor=None):
+    page = build_page_query(table, *filters, keyset, limit=DEFAULT_PAGE_SIZE, cursor=cursor)
+    return page.query, page.params
+
+
+def checked_queries(s):
+    """(label, sql, params) for every hot route query, with sample values `s` from the fixture."""
+    return [
+        ("visitor listing by nationality",
+         *page_query("visitor", visitor_filters(None, s["nationality"]), VISITOR_KEYSET)),
+        ("visitor update lookup", VISITOR_EXISTS, (s["visitor_id"],)),
+        ("finance listing from a date",
+         *page_query("revenue_finance", finance_filters(s["finance_from"], None, None), FINANCE_KEYSET)),
+        ("finance listing by payment method",
+         *page_query("revenue_finance", finance_filters(None, None, "UPI"), FINANCE_KEYSET)),
+        ("finance listing, next page",
+         *page_query("revenue_finance", finance_filters(None, None, None), FINANCE_KEYSET, s["finance_cursor"])),
+        ("tours by date and status",
+         *page_query("tours", tour_filters(s["today"], None, "Scheduled"), TOUR_KEYSET)),
+        ("tours by guide email", TOURS_BY_GUIDE_EMAIL, (s["guide_email"],)),
+        ("guide view", *guide_view_query(s["guide_id"], "all", None)),
+        ("guide view, upcoming", *guide_view_query(s["guide_id"], "upcoming", None)),
+        ("roster refresh for a tour",
+         ROSTER_SELECT.format(where=REFRESH_TOURS_WHERE), ([s["tour_id"]],)),
+        ("roster refresh for a visitor",
+         ROSTER_SELECT.format(where=REFRESH_VISITOR_WHERE), (s["visitor_id"],)),
+        ("staff duplicate check", STAFF_DUPLICATE_CHECK, (s["guide_email"], "0000000000")),
+        ("login", LOGIN_QUERY, (s["auth_email"], "admin")),
+        ("artifacts in a gallery",
+         *page_query("artifact_information", artifact_filters(s["gallery_id"], None, None), ARTIFACT_KEYSET)),
+    ]
+
+
+def seq_scans(plan, tables):
+    """Relation names read by a Seq Scan anywhere in an EXPLAIN (FORMAT JSON) plan tree."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in tables:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child, tables))
+    return found
+
+
+CHECKED_TABLES = {
+    "visitor", "revenue_finance", "tours", "attends_tour", "staff",
+    "Authentication", "artifact_information", "guide_tour_roster",
+}
+
+
+# Copied (structure and indexes, no rows) into the scratch schema before seeding
+FIXTURE_TABLES = [
+    "gallery", "staff", "visitor", '"Authentication"', "revenue_finance",
+    "tours", "attends_tour", "artifact_information", "guide_tour_roster",
+]
+
+
+def create_scratch_schema(cur, schema):
+    """Empty copies of FIXTURE_TABLES in `schema`, which then shadows the live tables on the search_path."""
+    cur.execute("SELECT current_schema() AS schema")
+    live = cur.fetchone()["schema"]
+    cur.execute(f"CREATE SCHEMA {schema}")
+    for table in FIXTURE_TABLES:
+        cur.execute(f"CREATE TABLE {schema}.{table} (LIKE {live}.{table} INCLUDING ALL)")
+    cur.execute(f"SET search_path TO {schema}, {live}")
+
+
+def check_plans(rows=DEFAULT_ROWS):
+    """Returns a list of (label, tables) for every query that plans a seq scan."""
+    schema = f"plan_check_{os.getpid()}"
+    conn = get_conn()
+    cur = conn.cursor()
+    failures = []
+    try:
+        create_scratch_schema(cur, schema)
+        # Committed right away so no lock on the live tables is held while seeding
+        conn.commit()
+
+        print(f"Seeding fixture in schema {schema} ({rows} visitors / transactions)...")
+        sample = seed_fixture(cur, rows)
+        conn.commit()
+
+        for label, query, params in checked_queries(sample):
+            cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            plan = cur.fetchone()["QUERY PLAN"]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scanned = seq_scans(plan[0]["Plan"], CHECKED_TABLES)
+            print(f"  {'SEQ SCAN' if scanned else 'ok':<8} {label}" + (f" ({', '.join(scanned)})" if scanned else ""))
+            if scanned:
+                failures.append((label, scanned))
+    finally:
+        conn.rollback()
+        cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        cur.execute("RESET search_path")
+        conn.commit()
+        cur.close()
+        conn.close()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if a hot route query plans a sequential scan.")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="fixture size (visitors / transactions)")
+    args = parser.parse_args(argv)
+
+    failures = check_plans(args.rows)
+    if failures:
+        print(f"{len(failures)} query plan(s) use a sequential scan.")
+        return 1
+    print("No sequential scans on hot tables.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Incrementally maintained analytics rollups (tables in migrations/0002_analytics_rollups.sql).
+
+The write paths in visitor_routes / finance_routes call the async helpers below
+inside their own transaction, so a rollup row always moves together with the
+source row. `python rollups.py` rebuilds both tables from scratch (backfill or
+periodic compaction if anything ever drifts).
+
+Visitors without an entry_timestamp have no (day, hour) bucket and are skipped
+here; main.py counts them separately (undated_visitors) so the unfiltered
+dashboard totals match the original per-visitor queries.
+"""
+from database import get_conn
+
+VISITOR_HOURLY_UPSERT = """
+    INSERT INTO visitor_hourly_rollup (visit_date, hour_of_day, total_visitors)
+    SELECT DATE(entry_timestamp), EXTRACT(HOUR FROM entry_timestamp), 1
+    FROM visitor
+    WHERE visitor_id = %s AND entry_timestamp IS NOT NULL
+    ON CONFLICT (visit_date, hour_of_day)
+    DO UPDATE SET total_visitors = visitor_hourly_rollup.total_visitors + EXCLUDED.total_visitors
+"""
+
+REVENUE_DAILY_UPSERT = """
+    INSERT INTO revenue_daily_rollup (transaction_date, ticket_type, payment_method, revenue, num_transactions)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (transaction_date, ticket_type, payment_method)
+    DO UPDATE SET revenue = revenue_daily_rollup.revenue + EXCLUDED.revenue,
+                  num_transactions = revenue_daily_rollup.num_transactions + EXCLUDED.num_transactions
+"""
+
+
+async def record_visitor(cur, visitor_id):
+    """Count a newly inserted visitor row in its (day, hour) bucket."""
+    await cur.execute(VISITOR_HOURLY_UPSERT, (visitor_id,))
+
+
+async def apply_revenue_delta(cur, transaction_date, ticket_type, payment_method, amount, count):
+    """Add (or, with negative values, remove) revenue and transaction count for one bucket."""
+    await cur.execute(REVENUE_DAILY_UPSERT, (transaction_date, ticket_type, payment_method, amount, count))
+
+
+def rebuild_rollups():
+    """Recompute both rollup tables from the source tables in one transaction."""
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("TRUNCATE visitor_hourly_rollup, revenue_daily_rollup")
+        cur.execute("""
+            INSERT INTO visitor_hourly_rollup (visit_date, hour_of_day, total_visitors)
+            SELECT DATE(entry_timestamp), EXTRACT(HOUR FROM entry_timestamp), COUNT(*)
+            FROM visitor
+            WHERE entry_timestamp IS NOT NULL
+            GROUP BY 1, 2
+        """)
+        cur.execute("""
+            INSERT INTO revenue_daily_rollup (transaction_date, ticket_type, payment_method, revenue, num_transactions)
+            SELECT transaction_date, ticket_type, payment_method, SUM(amount), COUNT(*)
+            FROM revenue_finance
+            GROUP BY 1, 2, 3
+        """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    print("Rebuilding analytics rollups...")
+    rebuild_rollups()
+    print("Done.")
@@ -0,0 +1,75 @@
+import os
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from async_database import get_async_conn
+
+router = APIRouter(tags=["Search"])
+
+# Minimum pg_trgm word similarity (0..1) for a row to count as a match
+SEARCH_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", "0.3"))
+
+# type -> (table, id column, label expression, searched columns)
+# Every searched column has a trigram GIN index (migrations/0006_search_indexes.sql), which the
+# `<%` operator below can use.
+SEARCH_SOURCES = {
+    "artifact": ("artifact_information", "artifact_id",
+                 # concat_ws skips NULLs: "category (period)", or whichever of the two is set
+                 "concat_ws(' ', category, '(' || historical_period || ')')", ["category", "historical_period"]),
+    "gallery": ("gallery", "gallery_id", "name", ["name"]),
+    "staff": ("staff", "staff_id", "name", ["name"]),
+    "visitor": ("visitor", "visitor_id", "name", ["name"]),
+}
+
+
+def _source_query(search_type, limit):
+    table, id_column, label, columns = SEARCH_SOURCES[search_type]
+    score = "GREATEST(" + ", ".join(f"word_similarity(%s, {c})" for c in columns) + ")"
+    match = " OR ".join(f"%s <%% {c}" for c in columns)
+    query = f"""
+        (SELECT '{search_type}' AS type, {id_column} AS id, {label} AS label, {score} AS score
+         FROM {table}
+         WHERE {match}
+         ORDER BY score DESC
+         LIMIT {int(limit)})
+    """
+    # q is bound once per score term and once per match term
+    return query, 2 * len(columns)
+
+
+@router.get("/api/search", status_code=200)
+async def search(
+    q: str = Query(..., min_length=2, description="Search text"),
+    types: Optional[str] = Query(None, description="Comma-separated subset of: artifact, gallery, staff, visitor"),
+    limit: int = Query(10, ge=1, le=50, description="Max results per type")
+):
+    """
+    Ranked type-ahead search across artifacts, galleries, staff and visitors.
+    Results from all requested types are merged and ordered by similarity score.
+    """
+    requested = [t.strip() for t in types.split(",")] if types else list(SEARCH_SOURCES)
+    unknown = [t for t in requested if t not in SEARCH_SOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown types: {unknown}. Allowed: {list(SEARCH_SOURCES)}")
+
+    parts = []
+    params = []
+    for search_type in dict.fromkeys(requested):
+        query, n_params = _source_query(search_type, limit)
+        parts.append(query)
+        params.extend([q] * n_params)
+    query = " UNION ALL ".join(parts) + " ORDER BY score DESC"
+
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                (str(SEARCH_SIMILARITY_THRESHOLD),)
+            )
+            await cur.execute(query, tuple(params))
+            rows = await cur.fetchall()
+            return rows
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
@@ -0,0 +1,124 @@
+"""
+Stateless signed session tokens (JWT, HS256) issued at login.
+
+A token carries the user's id, role, email and (for guides) staff_id, so
+authenticated requests can be checked with one HMAC comparison instead of a
+database lookup. Send it as `Authorization: Bearer <token>`.
+
+Settings (.env):
+- SESSION_SECRET: HMAC key, required. Every worker and host must share it so a
+  token issued by one is accepted by the others; the API refuses to start without
+  it (checked by main.py's lifespan, so CLIs importing route modules still work).
+- SESSION_TTL_SECONDS: token lifetime (default 8 hours)
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Optional
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+SESSION_SECRET = os.getenv("SESSION_SECRET")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(8 * 3600)))
+
+_HEADER = {"alg": "HS256", "typ": "JWT"}
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def require_session_secret():
+    """Raises unless SESSION_SECRET is set; called at startup so tokens are never signed with a missing key."""
+    if not SESSION_SECRET:
+        raise RuntimeError(
+            "SESSION_SECRET is not set. Add a long random value to .env, e.g. "
+            "python -c \"import secrets; print(secrets.token_urlsafe(32))\""
+        )
+
+
+def _sign(signing_input):
+    require_session_secret()
+    return hmac.new(SESSION_SECRET.encode("utf-8"), signing_input.encode("ascii"), hashlib.sha256).digest()
+
+
+def issue_token(user_id, role, email=None, staff_id=None):
+    now = int(time.time())
+    claims = {
+        "sub": str(user_id),
+        "role": role,
+        "email": email,
+        "staff_id": staff_id,
+        "iat": now,
+        "exp": now + SESSION_TTL_SECONDS,
+    }
+    header = _b64encode(json.dumps(_HEADER, separators=(",", ":")).encode("utf-8"))
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    signing_input = f"{header}.{payload}"
+    return f"{signing_input}.{_b64encode(_sign(signing_input))}"
+
+
+def verify_token(token):
+    """Returns the token's claims, or raises InvalidToken."""
+    try:
+        header, payload, signature = token.split(".")
+        expected = _sign(f"{header}.{payload}")
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            raise InvalidToken("Bad signature")
+        if json.loads(_b64decode(header)) != _HEADER:
+            raise InvalidToken("Unsupported token header")
+        claims = json.loads(_b64decode(payload))
+    except InvalidToken:
+        raise
+    except (ValueError, UnicodeError):
+        raise InvalidToken("Malformed token")
+
+    if claims.get("exp", 0) < time.time():
+        raise InvalidToken("Token expired")
+    return claims
+
+
+def _unauthorized(detail):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def get_current_session(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> dict:
+    """FastAPI dependency: claims of the bearer token; 401 if missing or invalid."""
+    if credentials is None:
+        raise _unauthorized("Not authenticated")
+    try:
+        return verify_token(credentials.credentials)
+    except InvalidToken as e:
+        raise _unauthorized(str(e))
+
+
+def require_role(*roles):
+    """Dependency factory, e.g. `Depends(require_role("admin"))`."""
+    def dependency(session: dict = Depends(get_current_session)) -> dict:
+        if session.get("role") not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient role")
+        return session
+    return dependency
+
+
+# Route-level guard for the admin dashboard's endpoints: `@router.post(..., dependencies=ADMIN_ONLY)`
+ADMIN_ONLY = [Depends(require_role("admin"))]
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel, EmailStr, Field, validator
 from datetime import date
-from database import get_conn
+from async_database import get_async_conn
+from id_allocator import next_id
+from pagination import Keyset, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_page_query, select_columns, set_page_headers
 import re
 from typing import Optional
+from session_tokens import ADMIN_ONLY
 
 router = APIRouter(tags=["Staff"])
 
@@ -48,125 +51,131 @@ class StaffCreate(BaseModel):
     def lower_email(cls, v):
         return v.lower()
 
+# --- Pagination ---
+STAFF_COLUMNS = {"staff_id", "name", "occupation", "contact", "joining_date", "email"}
+STAFF_KEYSET = Keyset("staff_id")
+
+STAFF_DUPLICATE_CHECK = "SELECT staff_id FROM staff WHERE email = %s OR contact = %s"
+
 # --- Routes ---
 
-@router.post("/api/staff", status_code=201)
-def create_staff(staff: StaffCreate):
-    conn = get_conn()
-    cur = conn.cursor()
-    
-    import random
-    random_id = random.randint(1000, 9999)
-
-    try:
-        # Check for duplicates
-        cur.execute("SELECT staff_id FROM staff WHERE email = %s OR contact = %s", (staff.email, staff.contact))
-        if cur.fetchone():
-            raise HTTPException(status_code=400, detail="Staff with this email or contact already exists.")
-
-        cur.execute("""
-            INSERT INTO staff (
-                staff_id, name, occupation, contact, joining_date, email
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s
-            ) RETURNING staff_id;
-        """, (
-            random_id,
-            staff.name,
-            staff.occupation,
-            staff.contact,
-            staff.joining_date,
-            staff.email
-        ))
+@router.post("/api/staff", status_code=201, dependencies=ADMIN_ONLY)
+async def create_staff(staff: StaffCreate):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+
+        try:
+            # Check for duplicates
+            await cur.execute(STAFF_DUPLICATE_CHECK, (staff.email, staff.contact))
+            if await cur.fetchone():
+                raise HTTPException(status_code=400, detail="Staff with this email or contact already exists.")
+
+            staff_id = await next_id(cur, "staff")
+            await cur.execute("""
+                INSERT INTO staff (
+                    staff_id, name, occupation, contact, joining_date, email
+                ) VALUES (
+                    %s, %s, %s, %s, %s, %s
+                ) RETURNING staff_id;
+            """, (
+                staff_id,
+                staff.name,
+                staff.occupation,
+                staff.contact,
+                staff.joining_date,
+                staff.email
+            ))
         
-        new_id = cur.fetchone()['staff_id']
-        conn.commit()
-        return {"message": "Staff registered successfully", "staff_id": new_id}
+            new_id = (await cur.fetchone())['staff_id']
+            await conn.commit()
+            return {"message": "Staff registered successfully", "staff_id": new_id}
         
-    except Exception as e:
-        conn.rollback()
-        if "duplicate key" in str(e):
-             raise HTTPException(status_code=400, detail="Staff with this email or contact already exists.")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+        except Exception as e:
+            await conn.rollback()
+            if "duplicate key" in str(e):
+                 raise HTTPException(status_code=400, detail="Staff with this email or contact already exists.")
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
 
 @router.get("/api/staff", status_code=200)
-def get_staff(
+async def get_staff(
+    response: Response,
     role: Optional[str] = None,
     name: Optional[str] = None,
-    email: Optional[str] = None
+    email: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
 ):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        query = "SELECT * FROM staff"
-        conditions = []
-        params = []
-        
-        if role:
-            conditions.append("occupation = %s")
-            params.append(role)
-        if name:
-            conditions.append("name ILIKE %s")
-            params.append(f"%{name}%")
-        if email:
-            conditions.append("email = %s")
-            params.append(email)
-            
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            conditions = []
+            params = []
         
-        query += " ORDER BY staff_id ASC"
+            if role:
+                conditions.append("occupation = %s")
+                params.append(role)
+            if name:
+                conditions.append("name ILIKE %s")
+                params.append(f"%{name}%")
+            if email:
+                conditions.append("email = %s")
+                params.append(email)
             
-        cur.execute(query, tuple(params))
-        rows = cur.fetchall()
-        return rows
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-
-@router.put("/api/staff/{staff_id}", status_code=200)
-def update_staff(staff_id: int, staff: StaffCreate):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT staff_id FROM staff WHERE staff_id = %s", (staff_id,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Staff not found")
-
-        cur.execute("""
-            UPDATE staff 
-            SET name=%s, occupation=%s, contact=%s, joining_date=%s, email=%s
-            WHERE staff_id=%s
-        """, (
-            staff.name, staff.occupation, staff.contact, staff.joining_date, staff.email, staff_id
-        ))
-        conn.commit()
-        return {"message": "Staff updated successfully"}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-
-@router.delete("/api/staff/{staff_id}", status_code=200)
-def delete_staff(staff_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("DELETE FROM staff WHERE staff_id = %s RETURNING staff_id", (staff_id,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Staff not found")
-        conn.commit()
-        return {"message": "Staff deleted successfully"}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+            page = build_page_query(
+                "staff", conditions, params, STAFF_KEYSET,
+                select_columns(fields, STAFF_COLUMNS, STAFF_KEYSET), limit, cursor
+            )
+            await cur.execute(page.query, page.params)
+            rows = await cur.fetchall()
+            await set_page_headers(response, cur, page, rows, include_total)
+            return rows
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
+
+@router.put("/api/staff/{staff_id}", status_code=200, dependencies=ADMIN_ONLY)
+async def update_staff(staff_id: int, staff: StaffCreate):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("SELECT staff_id FROM staff WHERE staff_id = %s", (staff_id,))
+            if not await cur.fetchone():
+                raise HTTPException(status_code=404, detail="Staff not found")
+
+            await cur.execute("""
+                UPDATE staff 
+                SET name=%s, occupation=%s, contact=%s, joining_date=%s, email=%s
+                WHERE staff_id=%s
+            """, (
+                staff.name, staff.occupation, staff.contact, staff.joining_date, staff.email, staff_id
+            ))
+            await conn.commit()
+            return {"message": "Staff updated successfully"}
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
+
+@router.delete("/api/staff/{staff_id}", status_code=200, dependencies=ADMIN_ONLY)
+async def delete_staff(staff_id: int):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("DELETE FROM staff WHERE staff_id = %s RETURNING staff_id", (staff_id,))
+            if not await cur.fetchone():
+                raise HTTPException(status_code=404, detail="Staff not found")
+            await conn.commit()
+            return {"message": "Staff deleted successfully"}
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
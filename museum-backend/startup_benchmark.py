@@ -0,0 +1,95 @@
+"""
+Startup cost of the API, per router module.
+
+Each module is imported in a fresh interpreter, so every number is what that
+module costs on its own (including the dependencies it pulls in), the same
+way a new uvicorn worker pays it. `main` is the whole app.
+
+Usage:
+    python startup_benchmark.py              # import time, median of 5 runs
+    python startup_benchmark.py --runs 10
+    python startup_benchmark.py --init       # also time Firestore / Gemini client init
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+ROUTER_MODULES = [
+    "auth_routes", "visitor_routes", "staff_routes", "finance_routes", "tour_routes",
+    "gallery_routes", "artifact_routes", "analytics_routes", "feedback_routes",
+    "metrics_routes", "search_routes", "main",
+]
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - started, "modules": len(sys.modules)}}))
+"""
+
+# Run after importing feedback_routes, so only the client set-up itself is measured
+INIT_PROBES = {
+    "firestore client": "import firebase_client; firebase_client.get_db()",
+    "gemini client": "import analyze_feedback; analyze_feedback.get_client()",
+}
+
+INIT_PROBE = """
+import json, time
+import feedback_routes
+started = time.perf_counter()
+{statement}
+print(json.dumps({{"seconds": time.perf_counter() - started}}))
+"""
+
+
+def run_probe(code):
+    """Runs `code` in a fresh interpreter; returns its JSON output, or {"error": ...}."""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit code {result.returncode}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(code, runs):
+    samples = []
+    for _ in range(runs):
+        sample = run_probe(code)
+        if "error" in sample:
+            return sample
+        samples.append(sample)
+    return {
+        "median_ms": round(statistics.median(s["seconds"] for s in samples) * 1000, 1),
+        "max_ms": round(max(s["seconds"] for s in samples) * 1000, 1),
+        **({"modules": samples[-1]["modules"]} if "modules" in samples[-1] else {}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure API startup cost per router module.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--init", action="store_true", help="also time Firestore / Gemini client init")
+    args = parser.parse_args(argv)
+
+    print(f"{'module':<20} {'median ms':>10} {'max ms':>10} {'modules loaded':>15}")
+    for module in ROUTER_MODULES:
+        result = measure(IMPORT_PROBE.format(module=module), args.runs)
+        if "error" in result:
+            print(f"{module:<20} failed: {result['error']}")
+        else:
+            print(f"{module:<20} {result['median_ms']:>10} {result['max_ms']:>10} {result['modules']:>15}")
+
+    if args.init:
+        print()
+        for name, statement in INIT_PROBES.items():
+            result = measure(INIT_PROBE.format(statement=statement), args.runs)
+            if "error" in result:
+                print(f"{name:<20} failed: {result['error']}")
+            else:
+                print(f"{name:<20} {result['median_ms']:>10} {result['max_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Offline tests for the local feedback pre-classifier (no network, no database)."""
+import pytest
+
+from feedback_classifier import FeedbackPreClassifier
+
+
+@pytest.fixture
+def classifier():
+    return FeedbackPreClassifier(min_confidence=0.75, enabled=True)
+
+
+@pytest.mark.parametrize("text, category", [
+    ("Loved the audio guide, the narration was excellent!", "audio"),
+    ("Our guide was friendly and helpful.", "staff"),
+    ("Amazing exhibits and beautiful paintings.", "content"),
+    ("What a wonderful day, great experience.", "general"),
+])
+def test_clear_positive_feedback_is_answered_locally(classifier, text, category):
+    result = classifier.classify(text)
+    assert result.local
+    assert result.sentiment == "positive"
+    assert result.category == category
+
+    analysis = classifier.try_local(text)
+    assert analysis["category"] == category
+    assert analysis["actionable"] is False
+    assert analysis["analyzed_by"] == "local-rules"
+
+
+def test_visit_metadata_is_ignored(classifier):
+    result = classifier.classify("Great visit! [Visited Artifacts: Audio Guide Headphones]")
+    assert result.category == "general"
+
+
+@pytest.mark.parametrize("text, reason", [
+    ("The staff were rude.", "negative terms"),
+    ("Great museum but the cafe was closed.", "negative terms"),
+    ("Lovely galleries, please add more benches.", "request, contrast or negation"),
+    ("The paintings were not great.", "request, contrast or negation"),
+    ("Is the gallery open on Mondays?", "question"),
+    ("We visited on Sunday.", "no sentiment terms"),
+])
+def test_anything_but_clear_praise_is_escalated(classifier, text, reason):
+    result = classifier.classify(text)
+    assert not result.local
+    assert result.reason == reason
+    assert classifier.try_local(text) is None
+
+
+def test_category_tie_is_escalated(classifier):
+    # One audio term and one content term: no single category wins
+    result = classifier.classify("Excellent headphones and wonderful paintings.")
+    assert result.category is None
+    assert not result.local
+    assert result.reason == "ambiguous category"
+
+
+def test_longer_category_term_wins_over_its_prefix(classifier):
+    assert classifier.category("the audio guide") == "audio"
+    assert classifier.category("the tour guide") == "staff"
+
+
+@pytest.mark.parametrize("min_confidence, local", [(0.75, True), (0.8, False)])
+def test_confidence_threshold(min_confidence, local):
+    # One positive term scores 0.75
+    classifier = FeedbackPreClassifier(min_confidence=min_confidence, enabled=True)
+    result = classifier.classify("Nice exhibits.")
+    assert result.confidence == 0.75
+    assert result.local is local
+    if not local:
+        assert result.reason == "low confidence"
+
+
+def test_offload_ratio_follows_the_threshold():
+    texts = ["Nice exhibits.", "Amazing, beautiful exhibits.", "The staff were rude.", "Is it open today?"]
+
+    lenient = FeedbackPreClassifier(min_confidence=0.75, enabled=True)
+    strict = FeedbackPreClassifier(min_confidence=0.8, enabled=True)
+    for text in texts:
+        lenient.try_local(text)
+        strict.try_local(text)
+
+    assert lenient.stats()["offload_ratio"] == 0.5
+    assert strict.stats()["offload_ratio"] == 0.25
+    assert strict.stats()["escalated"] == {"low confidence": 1, "negative terms": 1, "question": 1}
+
+
+def test_disabled_classifier_sends_everything_to_the_model():
+    classifier = FeedbackPreClassifier(enabled=False)
+    assert classifier.try_local("Amazing, beautiful exhibits.") is None
+    assert classifier.stats()["seen"] == 0
+    assert classifier.stats()["offload_ratio"] is None
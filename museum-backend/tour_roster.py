@@ -0,0 +1,92 @@
+"""
+Maintenance of guide_tour_roster (migrations/0004_guide_tour_roster.sql), the precomputed
+per-tour visitor roster served by /api/tours/guide-view.
+
+Write paths call refresh_tours() / refresh_tours_for_visitor() inside their own
+transaction; `python tour_roster.py` rebuilds the whole table.
+"""
+from database import get_conn
+
+ROSTER_SELECT = """
+    SELECT
+        t.tour_id,
+        t.guide_id,
+        t.tour_date,
+        t.tour_time,
+        t.visitor_group_name,
+        t.group_size,
+        t.language,
+        t.status,
+        jsonb_agg(
+            jsonb_build_object(
+                'visitor_id', v.visitor_id,
+                'name', v.name,
+                'nationality', v.nationality,
+                'preferred_language', v.preferred_language,
+                'contact', v.contact
+            ) ORDER BY v.visitor_id
+        ) FILTER (WHERE v.visitor_id IS NOT NULL) AS visitors
+    FROM tours t
+    LEFT JOIN attends_tour at ON t.tour_id = at.tour_id
+    LEFT JOIN visitor v ON at.visitor_id = v.visitor_id
+    {where}
+    GROUP BY t.tour_id, t.guide_id, t.tour_date, t.tour_time,
+             t.visitor_group_name, t.group_size, t.language, t.status
+"""
+
+ROSTER_UPSERT = """
+    INSERT INTO guide_tour_roster (
+        tour_id, guide_id, tour_date, tour_time, visitor_group_name,
+        group_size, language, status, visitors
+    )
+    {select}
+    ON CONFLICT (tour_id) DO UPDATE SET
+        guide_id = EXCLUDED.guide_id,
+        tour_date = EXCLUDED.tour_date,
+        tour_time = EXCLUDED.tour_time,
+        visitor_group_name = EXCLUDED.visitor_group_name,
+        group_size = EXCLUDED.group_size,
+        language = EXCLUDED.language,
+        status = EXCLUDED.status,
+        visitors = EXCLUDED.visitors,
+        refreshed_at = CURRENT_TIMESTAMP
+"""
+
+
+REFRESH_TOURS_WHERE = "WHERE t.tour_id = ANY(%s)"
+REFRESH_VISITOR_WHERE = "WHERE t.tour_id IN (SELECT tour_id FROM attends_tour WHERE visitor_id = %s)"
+
+
+async def refresh_tours(cur, tour_ids):
+    """Recompute the roster rows of the given tours."""
+    if not tour_ids:
+        return
+    select = ROSTER_SELECT.format(where=REFRESH_TOURS_WHERE)
+    await cur.execute(ROSTER_UPSERT.format(select=select), (list(tour_ids),))
+
+
+async def refresh_tours_for_visitor(cur, visitor_id):
+    """Recompute every roster row that embeds this visitor (after a profile edit)."""
+    select = ROSTER_SELECT.format(where=REFRESH_VISITOR_WHERE)
+    await cur.execute(ROSTER_UPSERT.format(select=select), (visitor_id,))
+
+
+def rebuild_roster():
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("TRUNCATE guide_tour_roster")
+        cur.execute(ROSTER_UPSERT.format(select=ROSTER_SELECT.format(where="")))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    print("Rebuilding guide_tour_roster...")
+    rebuild_roster()
+    print("Done.")
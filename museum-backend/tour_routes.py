@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from pydantic import BaseModel, Field, validator
 from datetime import date, time
 from typing import List, Optional
-from database import get_conn
-import random
+from async_database import get_async_conn
+from id_allocator import next_id
+from session_tokens import require_role, ADMIN_ONLY
+from tour_roster import refresh_tours
+import os
+from pagination import Keyset, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_page_query, select_columns, set_page_headers
 
 router = APIRouter(tags=["Tours"])
 
+# Also write the roster to the tours.visitor_ids INTEGER[] column (added by migrations/0001_update_tours_schema.sql)
+TOURS_STORE_VISITOR_IDS = os.getenv("TOURS_STORE_VISITOR_IDS", "false").lower() in ("1", "true", "yes")
+
 # --- Pydantic Schema ---
 class TourCreate(BaseModel):
     guide_id: int = Field(..., description="ID of the Guide (Staff)")  # ✅ CHANGED to guide_id: int
@@ -31,164 +38,208 @@ class TourCreate(BaseModel):
              raise ValueError("At least one Visitor ID must be provided")
         return v
 
+# --- Pagination ---
+TOUR_COLUMNS = {
+    "tour_id", "guide_id", "tour_date", "tour_time", "visitor_group_name",
+    "group_size", "language", "status", "visitor_ids", "created_at",
+}
+TOUR_KEYSET = Keyset("tour_id")
+
+
+def tour_filters(date, guide_id, status):
+    """WHERE conditions of the tour listing."""
+    conditions = []
+    params = []
+    if date:
+        conditions.append("tour_date = %s")
+        params.append(date)
+    if guide_id:
+        conditions.append("guide_id = %s")
+        params.append(guide_id)
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    return conditions, params
+
+
+TOURS_BY_GUIDE_EMAIL = """
+    SELECT t.* FROM tours t
+    JOIN staff s ON t.guide_id = s.staff_id
+    WHERE s.email = %s AND s.occupation = 'Tour_guide'
+    ORDER BY t.tour_date DESC
+"""
+
+
+def guide_view_query(guide_id, window, limit):
+    """Roster query of /api/tours/guide-view for the guide with staff_id `guide_id`: (sql, params)."""
+    conditions = ["guide_id = %s"]
+    params = [guide_id]
+
+    order = "tour_date DESC"
+    if window == "upcoming":
+        conditions.append("tour_date >= CURRENT_DATE")
+        order = "tour_date ASC"
+    elif window == "past":
+        conditions.append("tour_date < CURRENT_DATE")
+
+    query = f"""
+        SELECT tour_id, guide_id, tour_date, tour_time, visitor_group_name,
+               group_size, language, status, visitors
+        FROM guide_tour_roster
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {order}, tour_id
+    """
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, tuple(params)
+
 # --- Routes ---
 
 @router.get("/api/tours", status_code=200)
-def get_tours(
+async def get_tours(
+    response: Response,
     date: Optional[date] = None,
     guide_id: Optional[int] = None,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
 ):
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        query = "SELECT * FROM tours"
-        conditions = []
-        params = []
-        
-        if date:
-            conditions.append("tour_date = %s")
-            params.append(date)
-        if guide_id:
-            conditions.append("guide_id = %s")
-            params.append(guide_id)
-        if status:
-            conditions.append("status = %s")
-            params.append(status)
-            
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-            
-        cur.execute(query, tuple(params))
-        rows = cur.fetchall()
-        return rows
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            conditions, params = tour_filters(date, guide_id, status)
+            page = build_page_query(
+                "tours", conditions, params, TOUR_KEYSET,
+                select_columns(fields, TOUR_COLUMNS, TOUR_KEYSET), limit, cursor
+            )
+            await cur.execute(page.query, page.params)
+            rows = await cur.fetchall()
+            await set_page_headers(response, cur, page, rows, include_total)
+            return rows
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
 @router.get("/api/tours/by-guide-email", status_code=200)
-def get_tours_by_guide_email(email: str):
+async def get_tours_by_guide_email(email: str):
     """Fetch tours assigned to a specific guide by their email."""
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        query = """
-            SELECT t.* FROM tours t
-            JOIN staff s ON t.guide_id = s.staff_id
-            WHERE s.email = %s AND s.occupation = 'Tour_guide'
-            ORDER BY t.tour_date DESC
-        """
-        cur.execute(query, (email,))
-        rows = cur.fetchall()
-        return rows
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute(TOURS_BY_GUIDE_EMAIL, (email,))
+            rows = await cur.fetchall()
+            return rows
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
 @router.get("/api/tours/guide-view", status_code=200)
-def get_guide_tours_with_visitors(email: str):
+async def get_guide_tours_with_visitors(
+    window: str = Query("all", pattern="^(all|upcoming|past)$"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    session: dict = Depends(require_role("guide"))
+):
     """
     GUIDE DASHBOARD ENDPOINT - Fetch tours with full visitor details
     
     Query Flow:
-    1. Find staff by email + occupation = 'Tour_guide'
-    2. Find all tours for that guide_id
-    3. For each tour, fetch visitors from attends_tour + visitor table
-    4. Return tours with nested visitor details
+    1. Identify the guide: staff_id from the bearer token (a guide session is required)
+    2. Read that guide's tours from guide_tour_roster, where each row already
+       carries its nested visitor list (kept fresh by the tour/visitor write paths)
+    3. Optionally restrict to a date window:
+       - upcoming: tour_date >= today, soonest first
+       - past: tour_date < today, most recent first
+       - all (default): every tour, most recent first
     """
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        query = """
-            SELECT 
-                t.tour_id,
-                t.guide_id,
-                t.tour_date,
-                t.tour_time,
-                t.visitor_group_name,
-                t.group_size,
-                t.language,
-                t.status,
-                json_agg(
-                    json_build_object(
-                        'visitor_id', v.visitor_id,
-                        'name', v.name,
-                        'nationality', v.nationality,
-                        'preferred_language', v.preferred_language,
-                        'contact', v.contact
-                    ) ORDER BY v.visitor_id
-                ) FILTER (WHERE v.visitor_id IS NOT NULL) as visitors
-            FROM tours t
-            LEFT JOIN attends_tour at ON t.tour_id = at.tour_id
-            LEFT JOIN visitor v ON at.visitor_id = v.visitor_id
-            JOIN staff s ON t.guide_id = s.staff_id
-            WHERE s.email = %s AND s.occupation = 'Tour_guide'
-            GROUP BY t.tour_id, t.guide_id, t.tour_date, t.tour_time, 
-                     t.visitor_group_name, t.group_size, t.language, t.status
-            ORDER BY t.tour_date DESC
-        """
-        cur.execute(query, (email,))
-        rows = cur.fetchall()
-        return rows
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
-
-@router.post("/api/tours", status_code=201)
-def create_tour(tour: TourCreate):
-    conn = get_conn()
-    cur = conn.cursor()
+    guide_id = session.get("staff_id")
+    if guide_id is None:
+        raise HTTPException(status_code=404, detail="No tour guide staff record matches this account")
+
+    query, params = guide_view_query(guide_id, window, limit)
+
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute(query, params)
+            rows = await cur.fetchall()
+            return rows
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
+
+@router.post("/api/tours", status_code=201, dependencies=ADMIN_ONLY)
+async def create_tour(tour: TourCreate):
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
     
-    try:
-        # STEP 1: Validate guide_id exists and is a tour guide
-        cur.execute(
-            "SELECT staff_id FROM staff WHERE staff_id = %s AND occupation = 'Tour_guide'",
-            (tour.guide_id,)
-        )
-        staff_result = cur.fetchone()
+        try:
+            # STEP 1: Validate guide_id exists and is a tour guide
+            await cur.execute(
+                "SELECT staff_id FROM staff WHERE staff_id = %s AND occupation = 'Tour_guide'",
+                (tour.guide_id,)
+            )
+            staff_result = await cur.fetchone()
         
-        if not staff_result:
-            raise HTTPException(status_code=404, detail=f"No tour guide found with ID: {tour.guide_id}")
+            if not staff_result:
+                raise HTTPException(status_code=404, detail=f"No tour guide found with ID: {tour.guide_id}")
         
-        guide_id = tour.guide_id
+            guide_id = tour.guide_id
+
+            # STEP 2: Validate the whole roster in one query (duplicates collapsed, order kept)
+            visitor_ids = list(dict.fromkeys(tour.visitor_ids))
+            await cur.execute(
+                "SELECT visitor_id FROM visitor WHERE visitor_id = ANY(%s)",
+                (visitor_ids,)
+            )
+            known = {row['visitor_id'] for row in await cur.fetchall()}
+            missing = [vid for vid in visitor_ids if vid not in known]
+            if missing:
+                raise HTTPException(status_code=400, detail=f"Unknown visitor IDs: {missing}")
         
-        # STEP 2: Generate random tour_id
-        tour_id = random.randint(10000, 99999)
+            # STEP 3: Allocate tour_id from its sequence
+            tour_id = await next_id(cur, "tour")
         
-        # STEP 3: Insert into tours table
-        cur.execute("""
-            INSERT INTO tours (
-                tour_id, guide_id, tour_date, tour_time, visitor_group_name,
-                group_size, language, status
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING tour_id;
-        """, (
-            tour_id, guide_id, tour.tour_date, tour.tour_time,
-            tour.visitor_group_name, tour.group_size, tour.language, tour.status
-        ))
+            # STEP 4: Insert into tours table (optionally keeping the roster in tours.visitor_ids too)
+            columns = "tour_id, guide_id, tour_date, tour_time, visitor_group_name, group_size, language, status"
+            values = [
+                tour_id, guide_id, tour.tour_date, tour.tour_time,
+                tour.visitor_group_name, tour.group_size, tour.language, tour.status
+            ]
+            if TOURS_STORE_VISITOR_IDS:
+                columns += ", visitor_ids"
+                values.append(visitor_ids)
+            placeholders = ", ".join(["%s"] * len(values))
+            await cur.execute(f"""
+                INSERT INTO tours ({columns})
+                VALUES ({placeholders})
+                RETURNING tour_id;
+            """, tuple(values))
         
-        new_tour_id = cur.fetchone()['tour_id']
+            new_tour_id = (await cur.fetchone())['tour_id']
         
-        # STEP 4: Insert into attends_tour table (ONE row per visitor)
-        for visitor_id in tour.visitor_ids:
-            cur.execute("""
+            # STEP 5: Insert the whole roster into attends_tour with one set-based statement
+            await cur.execute("""
                 INSERT INTO attends_tour (visitor_id, tour_id)
-                VALUES (%s, %s)
-            """, (visitor_id, new_tour_id))
+                SELECT unnest(%s::int[]), %s
+            """, (visitor_ids, new_tour_id))
+
+            # STEP 6: Precompute the guide dashboard row for this tour
+            await refresh_tours(cur, [new_tour_id])
         
-        conn.commit()
-        return {"message": "Tour scheduled successfully", "tour_id": new_tour_id}
+            await conn.commit()
+            return {"message": "Tour scheduled successfully", "tour_id": new_tour_id}
         
-    except HTTPException:
-        conn.rollback()
-        raise
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+        except HTTPException:
+            await conn.rollback()
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
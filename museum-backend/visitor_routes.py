@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from pydantic import BaseModel, EmailStr, Field, validator
 from datetime import date
-from database import get_conn
-from db_sec import hash_password, verify_password
+from async_database import get_async_conn
+from analytics_cache import invalidate, VISITOR
+from rollups import record_visitor
+from tour_roster import refresh_tours_for_visitor
+from export import export_response
+from pagination import Keyset, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_page_query, select_columns, set_page_headers
+from db_sec import hash_password_async, verify_password_async, schedule_rehash_if_needed
+from password_workers import PasswordPoolBusy
+from session_tokens import issue_token, ADMIN_ONLY
 from typing import Optional
 
 router = APIRouter(tags=["Visitors"])
@@ -51,31 +58,63 @@ class VisitorCreate(BaseModel):
             raise ValueError("Last visit date cannot be in the future")
         return v
 
+# --- Pagination ---
+VISITOR_COLUMNS = {
+    "visitor_id", "name", "age_group", "email", "nationality", "preferred_language",
+    "last_visit_date", "ticket_type", "id_proof", "contact", "entry_timestamp",
+}
+VISITOR_KEYSET = Keyset("visitor_id")
+
+VISITOR_EXISTS = "SELECT visitor_id FROM visitor WHERE visitor_id = %s"
+
+def visitor_filters(name, nationality):
+    """WHERE conditions shared by the visitor listing and its export."""
+    conditions = []
+    params = []
+
+    if name:
+        conditions.append("name ILIKE %s")
+        params.append(f"%{name}%")
+    if nationality:
+        conditions.append("nationality = %s")
+        params.append(nationality)
+    return conditions, params
+
 # --- Routes ---
 
 @router.post("/api/visitors", status_code=201)
-def signup_visitor(visitor: VisitorSignup):
+async def signup_visitor(visitor: VisitorSignup):
     """Visitor self-registration - only Authentication table"""
-    conn = get_conn()
-    cur = conn.cursor()
     try:
         # Check if email already exists
-        cur.execute('SELECT id FROM "Authentication" WHERE "Email" = %s', (visitor.email.lower(),))
-        if cur.fetchone():
+        async with get_async_conn() as conn:
+            cur = conn.cursor()
+            await cur.execute('SELECT id FROM "Authentication" WHERE "Email" = %s', (visitor.email.lower(),))
+            exists = await cur.fetchone()
+            await cur.close()
+        if exists:
             raise HTTPException(status_code=400, detail="Email already registered")
 
-        # Hash password
-        hashed_password = hash_password(visitor.password)
+        # Hash password on the password worker pool (no DB connection held meanwhile)
+        hashed_password = await hash_password_async(visitor.password)
 
         # Insert into Authentication table ONLY
-        cur.execute("""
-            INSERT INTO "Authentication" ("Name", "Email", "Role", "Password_hash")
-            VALUES (%s, %s, %s, %s)
-            RETURNING id
-        """, (visitor.name, visitor.email.lower(), 'visitor', hashed_password))
-        
-        auth_id = cur.fetchone()['id']
-        conn.commit()
+        async with get_async_conn() as conn:
+            cur = conn.cursor()
+            try:
+                await cur.execute("""
+                    INSERT INTO "Authentication" ("Name", "Email", "Role", "Password_hash")
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING id
+                """, (visitor.name, visitor.email.lower(), 'visitor', hashed_password))
+                
+                auth_id = (await cur.fetchone())['id']
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            finally:
+                await cur.close()
         
         return {
             "message": "Visitor registered successfully",
@@ -85,144 +124,162 @@ def signup_visitor(visitor: VisitorSignup):
         }
     except HTTPException:
         raise
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
 
 @router.post("/api/visitors/login", status_code=200)
-def login_visitor(login_data: VisitorLogin):
+async def login_visitor(login_data: VisitorLogin):
     """Visitor login - check Authentication table"""
-    conn = get_conn()
-    cur = conn.cursor()
     try:
         # Check Authentication table for visitor role
-        cur.execute("""
-            SELECT "Name", "Email", "Password_hash" FROM "Authentication"
-            WHERE "Email" = %s AND "Role" = 'visitor'
-        """, (login_data.email.lower(),))
-        auth = cur.fetchone()
+        async with get_async_conn() as conn:
+            cur = conn.cursor()
+            await cur.execute("""
+                SELECT id, "Name", "Email", "Password_hash" FROM "Authentication"
+                WHERE "Email" = %s AND "Role" = 'visitor'
+            """, (login_data.email.lower(),))
+            auth = await cur.fetchone()
+            await cur.close()
         
         if not auth:
             raise HTTPException(status_code=401, detail="Invalid credentials")
 
-        if not verify_password(login_data.password, auth["Password_hash"]):
+        if not await verify_password_async(login_data.password, auth["Password_hash"]):
             raise HTTPException(status_code=401, detail="Invalid credentials")
+        schedule_rehash_if_needed(auth["id"], login_data.password, auth["Password_hash"])
 
         return {
             "message": "Login successful",
             "name": auth["Name"],
             "email": auth["Email"],
-            "role": "visitor"
+            "role": "visitor",
+            "token": issue_token(auth["id"], "visitor", auth["Email"]),
+            "token_type": "bearer"
         }
     except HTTPException:
         raise
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
 
-@router.post("/api/admin/visitors", status_code=201)
-def create_visitor_record(visitor: VisitorCreate):
+@router.post("/api/admin/visitors", status_code=201, dependencies=ADMIN_ONLY)
+async def create_visitor_record(visitor: VisitorCreate):
     """Admin creates visitor record in visitor table"""
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        # Check if email exists in Authentication
-        cur.execute('SELECT id FROM "Authentication" WHERE "Email" = %s AND "Role" = \'visitor\'', 
-                    (visitor.email.lower(),))
-        if not cur.fetchone():
-            raise HTTPException(status_code=400, detail="Visitor must signup first")
-
-        # Insert visitor profile
-        cur.execute("""
-            INSERT INTO visitor (
-                name, age_group, email, nationality, preferred_language,
-                last_visit_date, ticket_type, id_proof, contact
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s
-            ) RETURNING visitor_id;
-        """, (
-            visitor.name,
-            visitor.age_group,
-            visitor.email.lower(),
-            visitor.nationality,
-            visitor.preferred_language,
-            visitor.last_visit_date,
-            visitor.ticket_type,
-            visitor.id_proof,
-            visitor.contact
-        ))
-
-        new_id = cur.fetchone()['visitor_id']
-        conn.commit()
-        return {"visitor_id": new_id, "message": "Visitor record created successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            # Check if email exists in Authentication
+            await cur.execute('SELECT id FROM "Authentication" WHERE "Email" = %s AND "Role" = \'visitor\'', 
+                        (visitor.email.lower(),))
+            if not await cur.fetchone():
+                raise HTTPException(status_code=400, detail="Visitor must signup first")
+
+            # Insert visitor profile
+            await cur.execute("""
+                INSERT INTO visitor (
+                    name, age_group, email, nationality, preferred_language,
+                    last_visit_date, ticket_type, id_proof, contact
+                ) VALUES (
+                    %s, %s, %s, %s, %s, %s, %s, %s, %s
+                ) RETURNING visitor_id;
+            """, (
+                visitor.name,
+                visitor.age_group,
+                visitor.email.lower(),
+                visitor.nationality,
+                visitor.preferred_language,
+                visitor.last_visit_date,
+                visitor.ticket_type,
+                visitor.id_proof,
+                visitor.contact
+            ))
+
+            new_id = (await cur.fetchone())['visitor_id']
+            await record_visitor(cur, new_id)
+            await conn.commit()
+            invalidate(VISITOR)
+            return {"visitor_id": new_id, "message": "Visitor record created successfully"}
+        except HTTPException:
+            raise
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            await cur.close()
 
 @router.get("/api/visitors", status_code=200)
-def get_visitors(name: Optional[str] = None, nationality: Optional[str] = None):
+async def get_visitors(
+    response: Response,
+    name: Optional[str] = None,
+    nationality: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
+):
     """Admin view all visitor records"""
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        query = "SELECT * FROM visitor"
-        conditions = []
-        params = []
-        
-        if name:
-            conditions.append("name ILIKE %s")
-            params.append(f"%{name}%")
-        if nationality:
-            conditions.append("nationality = %s")
-            params.append(nationality)
-            
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-            
-        cur.execute(query, tuple(params))
-        rows = cur.fetchall()
-        return rows
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            conditions, params = visitor_filters(name, nationality)
+            page = build_page_query(
+                "visitor", conditions, params, VISITOR_KEYSET,
+                select_columns(fields, VISITOR_COLUMNS, VISITOR_KEYSET), limit, cursor
+            )
+            await cur.execute(page.query, page.params)
+            rows = await cur.fetchall()
+            await set_page_headers(response, cur, page, rows, include_total)
+            return rows
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()
 
-@router.put("/api/visitors/{visitor_id}", status_code=200)
-def update_visitor(visitor_id: int, visitor: VisitorCreate):
+@router.get("/api/visitors/export", status_code=200, dependencies=ADMIN_ONLY)
+async def export_visitors(
+    format: str = "ndjson",
+    name: Optional[str] = None,
+    nationality: Optional[str] = None
+):
+    """Streams every matching visitor record as NDJSON or CSV (same filters as GET /api/visitors)."""
+    conditions, params = visitor_filters(name, nationality)
+    query = "SELECT * FROM visitor"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {VISITOR_KEYSET.order_by()}"
+    return await export_response("visitors", query, tuple(params), format)
+
+@router.put("/api/visitors/{visitor_id}", status_code=200, dependencies=ADMIN_ONLY)
+async def update_visitor(visitor_id: int, visitor: VisitorCreate):
     """Admin update visitor record"""
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT visitor_id FROM visitor WHERE visitor_id = %s", (visitor_id,))
-        if not cur.fetchone():
-            raise HTTPException(status_code=404, detail="Visitor not found")
-
-        cur.execute("""
-            UPDATE visitor 
-            SET name=%s, age_group=%s, email=%s, nationality=%s, preferred_language=%s, 
-                last_visit_date=%s, ticket_type=%s, id_proof=%s, contact=%s
-            WHERE visitor_id=%s
-        """, (
-            visitor.name, visitor.age_group, visitor.email.lower(), visitor.nationality, 
-            visitor.preferred_language, visitor.last_visit_date, visitor.ticket_type, 
-            visitor.id_proof, visitor.contact, visitor_id
-        ))
-        conn.commit()
-        return {"message": "Visitor updated successfully"}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
\ No newline at end of file
+    async with get_async_conn() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute(VISITOR_EXISTS, (visitor_id,))
+            if not await cur.fetchone():
+                raise HTTPException(status_code=404, detail="Visitor not found")
+
+            await cur.execute("""
+                UPDATE visitor 
+                SET name=%s, age_group=%s, email=%s, nationality=%s, preferred_language=%s, 
+                    last_visit_date=%s, ticket_type=%s, id_proof=%s, contact=%s
+                WHERE visitor_id=%s
+            """, (
+                visitor.name, visitor.age_group, visitor.email.lower(), visitor.nationality, 
+                visitor.preferred_language, visitor.last_visit_date, visitor.ticket_type, 
+                visitor.id_proof, visitor.contact, visitor_id
+            ))
+            await refresh_tours_for_visitor(cur, visitor_id)
+            await conn.commit()
+            invalidate(VISITOR)
+            return {"message": "Visitor updated successfully"}
+        except Exception as e:
+            await conn.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            await cur.close()